@@ -0,0 +1,4 @@
+from tinytask.backends import allow_headless_pynput
+
+# button and key names resolve through pynput; nothing here injects input
+allow_headless_pynput()
@@ -0,0 +1,29 @@
+import pytest
+
+from tinytask.backends import RecordingSink
+from tinytask.bench import gen_dense_mouse, gen_typing
+from tinytask.cache import CompiledMacro
+from tinytask.playback import PLAYBACK_MAX_SPEED, playback
+
+@pytest.mark.parametrize("generate", [gen_dense_mouse, gen_typing])
+def test_sink_replay_matches(generate):
+    macro = CompiledMacro(generate(300))
+    sink = RecordingSink()
+    stats = playback(macro, speed=PLAYBACK_MAX_SPEED, max_idle_ms=0, loops=2, backend=sink)
+    assert stats is not None
+
+    report = sink.compare(macro.ops, PLAYBACK_MAX_SPEED, loops=2)
+    assert report["mismatches"] == 0
+    assert report["emitted"] == report["expected"] == 2 * len(macro.ops)
+    assert not sink.held
+
+def test_sink_reports_wrong_events():
+    macro = CompiledMacro(gen_dense_mouse(50))
+    sink = RecordingSink()
+    playback(macro, speed=PLAYBACK_MAX_SPEED, max_idle_ms=0, loops=1, backend=sink)
+    t_ns, op, x, y, target = sink.emitted[10]
+    sink.emitted[10] = (t_ns, op, x + 1, y, target)
+
+    report = sink.compare(macro.ops, PLAYBACK_MAX_SPEED)
+    assert report["mismatches"] == 1
+    assert report["first_mismatch"] == 10
@@ -0,0 +1,70 @@
+import pytest
+
+from tinytask.decode import OP_KEY, OP_MOVE, OP_PRESS, OP_RELEASE, OP_TYPE, decode_events
+from tinytask.events import REC_KEY, REC_MOVE, REC_PRESS, EventBuffer, MacroFormatError
+from tinytask.macrofile import read_macro_file
+
+def test_decodes_every_kind():
+    from pynput.keyboard import Key, KeyCode
+    from pynput.mouse import Button
+
+    buf = EventBuffer.from_events([
+        ["move", 1, 2, None, None, 1.0],
+        ["click", 1, 2, "Button.right", True, 1.5],
+        ["click", 1, 2, "Button.right", False, 1.75],
+        ["key", "Key.enter", 0, None, None, 2.0],
+        ["key", "'x'", 0, None, None, 2.5],
+        ["key", "<65>", 0, None, None, 3.0],
+    ])
+    assert decode_events(buf) == [
+        (0, OP_MOVE, 1, 2, None),
+        (500_000_000, OP_PRESS, 1, 2, Button.right),
+        (750_000_000, OP_RELEASE, 1, 2, Button.right),
+        (1_000_000_000, OP_KEY, None, None, Key.enter),
+        (1_500_000_000, OP_TYPE, None, None, "x"),
+        (2_000_000_000, OP_KEY, None, None, KeyCode.from_vk(65)),
+    ]
+
+@pytest.mark.parametrize("event", [
+    ["move", 1, 2, None, None],                      # 5 fields
+    ["move", "1", 2, None, None, 0.0],               # position is not a number
+    ["move", 1, 2, None, None, "now"],               # timestamp is not a number
+    ["click", 1, 2, "Button.left", "yes", 0.0],      # pressed is not a bool
+    ["click", 1, 2, 7, True, 0.0],                   # button is not a name
+    ["key", "", 0, None, None, 0.0],                 # empty key
+    ["scroll", 1, 2, None, None, 0.0],               # unknown action
+    "move 1 2",
+])
+def test_malformed_events_are_rejected(event):
+    with pytest.raises(MacroFormatError):
+        EventBuffer.from_events([["move", 0, 0, None, None, 0.0], event])
+
+@pytest.mark.parametrize("event", [
+    ["click", 1, 2, "Button.thumb", True, 0.0],
+    ["click", 1, 2, "left", True, 0.0],
+    ["key", "Key.nokey", 0, None, None, 0.0],
+    ["key", "__import__('os')", 0, None, None, 0.0],
+    ["key", "''", 0, None, None, 0.0],
+])
+def test_unknown_names_fail_decoding(event):
+    buf = EventBuffer.from_events([["move", 0, 0, None, None, 0.0], event])
+    with pytest.raises(MacroFormatError, match="event 1"):
+        decode_events(buf)
+
+def test_invalid_records_fail_decoding():
+    buf = EventBuffer()
+    buf.append(REC_MOVE, 0, 0, -1, 0)
+    buf.append(REC_PRESS, 0, 0, 5, 1)     # no such name
+    with pytest.raises(MacroFormatError, match="invalid record"):
+        decode_events(buf)
+    buf = EventBuffer()
+    buf.append(REC_KEY + 1, 0, 0, buf.intern("'a'"), 0)
+    with pytest.raises(MacroFormatError, match="invalid record"):
+        decode_events(buf)
+
+@pytest.mark.parametrize("text", ["not json", '{"events": []}', '[["move", 1]]'])
+def test_malformed_json_files(tmp_path, text):
+    file = tmp_path / "bad.macro"
+    file.write_text(text)
+    with pytest.raises(MacroFormatError):
+        read_macro_file(str(file))
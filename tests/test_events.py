@@ -0,0 +1,51 @@
+import pytest
+
+from tinytask.events import REC_KEY, REC_MOVE, EventBuffer
+
+def chunked_buffer(chunks=3, rows=7):
+    # several small chunks, so slices have to cross chunk boundaries
+    buf = EventBuffer()
+    key = buf.intern("'a'")
+    for c in range(chunks):
+        start = c * rows
+        part = EventBuffer()
+        for i in range(start, start + rows):
+            part.append(REC_KEY if i % 5 == 4 else REC_MOVE, i, -i, key if i % 5 == 4 else -1, i * 1000)
+        buf.append_columns(*next(part.chunks()))
+    return buf
+
+def test_slices_match_list_slices():
+    buf = chunked_buffer()
+    events = list(buf)
+    assert len(buf) == 21
+    for start in range(-3, 23):
+        for stop in range(-3, 23):
+            part = buf[start:stop]
+            assert list(part) == events[start:stop]
+            assert part.names == buf.names
+
+def test_slice_keeps_markers_in_range():
+    buf = chunked_buffer()
+    buf.add_marker("before", -1)
+    buf.add_marker("inside", 8000)
+    buf.add_marker("edge", 12000)
+    buf.add_marker("after", 13000)
+    assert buf[8:13].markers == {"inside": 8000, "edge": 12000}
+    assert buf[5:5].markers == {}
+
+def test_slice_is_a_copy():
+    buf = chunked_buffer()
+    part = buf[3:10]
+    part.append(REC_MOVE, 0, 0, -1, 99_000)
+    part.intern("Key.enter")
+    assert len(buf) == 21
+    assert "Key.enter" not in buf.names
+
+def test_indexing_and_bad_slices():
+    buf = chunked_buffer()
+    assert buf[-1] == (REC_MOVE, 20, -20, -1, 20_000)
+    assert buf[9] == (REC_KEY, 9, -9, 0, 9000)
+    with pytest.raises(IndexError):
+        buf[21]
+    with pytest.raises(ValueError):
+        buf[::2]
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from tinytask import state
+from tinytask.backends import RecordingSink
+from tinytask.bench import gen_dense_mouse
+from tinytask.cache import CompiledMacro
+from tinytask.events import REC_MOVE, EventBuffer
+from tinytask.playback import PLAYBACK_MAX_SPEED, PlaybackExecutor, playback_executor
+
+FAST = {"speed": PLAYBACK_MAX_SPEED, "max_idle_ms": 0, "loops": 1}
+
+def long_macro():
+    # two moves a minute apart: plays until it is cancelled
+    buf = EventBuffer()
+    buf.append(REC_MOVE, 0, 0, -1, 0)
+    buf.append(REC_MOVE, 9, 9, -1, 60_000_000_000)
+    return CompiledMacro(buf)
+
+@pytest.fixture
+def executor():
+    executor = PlaybackExecutor(max_queue=2)
+    yield executor
+    executor.cancel_all()
+    while executor.current is not None:
+        time.sleep(0.01)
+
+def submit_running(executor, policy="queue"):
+    job = executor.submit(long_macro(), policy, backend=RecordingSink(), speed=1.0, max_idle_ms=0, loops=1)
+    while job.status == "pending":
+        time.sleep(0.01)
+    return job
+
+def test_queue_plays_in_order(executor):
+    first = submit_running(executor)
+    second = executor.submit(CompiledMacro(gen_dense_mouse(20)), "queue", backend=RecordingSink(), **FAST)
+    assert (first.status, second.status) == ("running", "pending")
+
+    executor.cancel(first)
+    assert first.wait(10) and second.wait(10)
+    assert (first.status, second.status) == ("cancelled", "done")
+
+def test_queue_is_bounded(executor):
+    first = submit_running(executor)
+    queued = [executor.submit(long_macro(), "queue", backend=RecordingSink()) for _ in range(3)]
+    assert [job.status for job in queued] == ["pending", "pending", "rejected"]
+
+    executor.cancel_all()
+    for job in [first] + queued:
+        assert job.wait(10)
+    assert [job.status for job in [first] + queued] == ["cancelled", "cancelled", "cancelled", "rejected"]
+
+def test_replace_cancels_everything_before(executor):
+    first = submit_running(executor)
+    queued = executor.submit(long_macro(), "queue", backend=RecordingSink())
+    sink = RecordingSink()
+    latest = executor.submit(CompiledMacro(gen_dense_mouse(20)), "replace", backend=sink, **FAST)
+
+    assert latest.wait(10)
+    assert (first.status, queued.status, latest.status) == ("cancelled", "cancelled", "done")
+    assert len(sink.emitted) == 20
+
+def test_reject_while_busy(executor):
+    first = submit_running(executor)
+    refused = executor.submit(CompiledMacro(gen_dense_mouse(20)), "reject", backend=RecordingSink(), **FAST)
+    assert refused.finished.is_set() and refused.status == "rejected"
+    assert first.status == "running"
+
+    executor.cancel(first)
+    assert first.wait(10)
+    accepted = executor.submit(CompiledMacro(gen_dense_mouse(20)), "reject", backend=RecordingSink(), **FAST)
+    assert accepted.wait(10) and accepted.status == "done"
+
+def test_invalid_jobs_are_refused(executor):
+    with pytest.raises(ValueError):
+        executor.submit(CompiledMacro(EventBuffer()))
+    with pytest.raises(ValueError):
+        executor.submit(long_macro(), "sometimes")
+    with pytest.raises(ValueError):
+        executor.submit(long_macro(), speed=0)
+
+class BrokenSink(RecordingSink):
+    def move(self, x, y, target):
+        raise OSError("display went away")
+
+def test_failed_playback_clears_state():
+    macro = CompiledMacro(gen_dense_mouse(20))
+    job = playback_executor.submit(macro, "queue", backend=BrokenSink(), speed=PLAYBACK_MAX_SPEED,
+                                   max_idle_ms=0, loops=1)
+    assert job.wait(10)
+    assert job.status == "failed"
+    assert isinstance(job.error, OSError)
+    assert not state.playing
@@ -0,0 +1,36 @@
+import os
+import threading
+
+from tinytask.bench import gen_dense_mouse
+from tinytask.filejobs import FileJob
+from tinytask.macrofile import read_macro_file, write_macro_file
+
+def test_concurrent_saves_of_one_file(tmp_path):
+    file = str(tmp_path / "same.macro")
+    bufs = [gen_dense_mouse(40_000, seed=seed) for seed in (1, 2, 3)]
+    threads = [threading.Thread(target=write_macro_file, args=(file, buf)) for buf in bufs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    saved = list(read_macro_file(file))
+    assert any(saved == list(buf) for buf in bufs)
+    assert os.listdir(tmp_path) == ["same.macro"]
+
+def test_cancelled_save_keeps_the_old_file(tmp_path):
+    file = str(tmp_path / "keep.macro")
+    old = gen_dense_mouse(100)
+    write_macro_file(file, old)
+
+    started = threading.Event()
+    job = FileJob("Saving", write_macro_file, file, gen_dense_mouse(200_000))
+    job.add_progress_callback(lambda job: started.set())
+    job.start()
+    started.wait(10)
+    job.cancel()
+    assert job.wait(10)
+
+    assert job.status == "cancelled"
+    assert list(read_macro_file(file)) == list(old)
+    assert os.listdir(tmp_path) == ["keep.macro"]
@@ -0,0 +1,56 @@
+import pytest
+
+from tinytask.bench import gen_dense_mouse, gen_idle_gaps
+from tinytask.events import REC_MOVE
+from tinytask.filters import filter_moves
+
+MODES = {
+    "time": {"interval_ms": 10},
+    "distance": {"distance_px": 5},
+    "rdp": {"epsilon_px": 2.0},
+}
+
+def move_runs(rows):
+    # [first move, last move] of every run of moves, plus everything else
+    runs, others, run = [], [], []
+    for row in rows:
+        if row[0] == REC_MOVE:
+            run.append(row)
+            continue
+        others.append(row)
+        if run:
+            runs.append((run[0], run[-1]))
+            run = []
+    if run:
+        runs.append((run[0], run[-1]))
+    return runs, others
+
+@pytest.mark.parametrize("mode", MODES)
+@pytest.mark.parametrize("generate", [gen_dense_mouse, gen_idle_gaps])
+def test_first_and_last_move_of_each_run_kept(mode, generate):
+    buf = generate(5000)
+    buf.add_marker("m", buf[100][4])
+    filtered, dropped = filter_moves(buf, mode, **MODES[mode])
+
+    assert dropped > 0
+    assert len(filtered) == len(buf) - dropped
+    assert filtered.markers == buf.markers
+
+    runs, others = move_runs(list(buf))
+    kept = list(filtered)
+    assert move_runs(kept)[1] == others
+    kept_set = set(kept)
+    for first, last in runs:
+        assert first in kept_set and last in kept_set
+    assert kept == sorted(kept, key=lambda row: row[4])
+
+def test_short_runs_are_untouched():
+    buf = gen_dense_mouse(2)
+    for mode, options in MODES.items():
+        filtered, dropped = filter_moves(buf, mode, **options)
+        assert dropped == 0
+        assert list(filtered) == list(buf)
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        filter_moves(gen_dense_mouse(10), "fast")
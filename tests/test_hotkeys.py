@@ -0,0 +1,114 @@
+import sys
+
+import pytest
+
+from tinytask import hotkeys
+
+class FakeKeyboard:
+    # the parts of the keyboard module hotkeys.py uses
+    def __init__(self):
+        self.hotkeys = {}
+        self.next_handle = 0
+        self.fail = set()
+
+    def add_hotkey(self, key, callback, args=()):
+        if key in self.fail:
+            raise ValueError(f"cannot hook {key}")
+        self.next_handle += 1
+        self.hotkeys[self.next_handle] = key
+        return self.next_handle
+
+    def remove_hotkey(self, handle):
+        del self.hotkeys[handle]
+
+    def bound(self):
+        return sorted(self.hotkeys.values())
+
+@pytest.fixture
+def keyboard(monkeypatch):
+    fake = FakeKeyboard()
+    monkeypatch.setitem(sys.modules, "keyboard", fake)
+    monkeypatch.setattr(hotkeys, "registered_hotkeys", {})
+    monkeypatch.setattr(hotkeys, "hotkey_targets", {})
+    monkeypatch.setattr(hotkeys, "global_shortcuts", [])
+    monkeypatch.setattr(hotkeys, "marker_hotkey", None)
+    monkeypatch.setattr(hotkeys, "warm_macro_cache", lambda files: None)
+    monkeypatch.delenv(hotkeys.MARKER_HOTKEY_ENV, raising=False)
+    return fake
+
+def test_marker_hotkey_bound_when_free(keyboard):
+    assert hotkeys.register_recording_hotkeys() == []
+    assert keyboard.bound() == ["ctrl+1", "ctrl+2", "ctrl+3"]
+    _, problems = hotkeys.plan_hotkeys([{"shortcut": "Ctrl+3", "file": "a.macro"}])
+    assert problems == ["'Ctrl+3' is taken by the recording hotkeys"]
+
+def test_marker_hotkey_yields_to_saved_shortcut(keyboard):
+    hotkeys.global_shortcuts = [{"shortcut": "ctrl+3", "file": "farm.macro"}]
+    hotkeys.apply_shortcuts(hotkeys.global_shortcuts, strict=False)
+    problems = hotkeys.register_recording_hotkeys()
+
+    assert len(problems) == 1 and "'ctrl+3' not bound" in problems[0]
+    assert hotkeys.marker_hotkey is None
+    assert keyboard.bound() == ["ctrl+1", "ctrl+2", "ctrl+3"]
+    assert hotkeys.hotkey_targets["ctrl+3"].endswith("farm.macro")
+
+def test_marker_hotkey_from_environment(keyboard, monkeypatch):
+    monkeypatch.setenv(hotkeys.MARKER_HOTKEY_ENV, "Alt+M")
+    assert hotkeys.register_recording_hotkeys() == []
+    assert keyboard.bound() == ["alt+m", "ctrl+1", "ctrl+2"]
+
+    keyboard.hotkeys.clear()
+    monkeypatch.setattr(hotkeys, "marker_hotkey", None)
+    monkeypatch.setenv(hotkeys.MARKER_HOTKEY_ENV, "off")
+    assert hotkeys.register_recording_hotkeys() == []
+    assert keyboard.bound() == ["ctrl+1", "ctrl+2"]
+
+@pytest.mark.parametrize("shortcut, normalized", [
+    ("Alt + Ctrl+A", "ctrl+alt+a"),
+    ("shift+Control+F5", "ctrl+shift+f5"),
+    ("Win+Option+Page  Up", "alt+windows+page up"),
+    ("Cmd+K, Ctrl+C", "windows+k, ctrl+c"),
+])
+def test_normalize_shortcut(shortcut, normalized):
+    assert hotkeys.normalize_shortcut(shortcut) == normalized
+
+@pytest.mark.parametrize("shortcut", ["ctrl+", "+a", "ctrl+a,,b"])
+def test_invalid_shortcuts(shortcut):
+    with pytest.raises(ValueError, match="invalid shortcut"):
+        hotkeys.normalize_shortcut(shortcut)
+
+def shortcut_list(**files):
+    return [{"shortcut": key.replace("_", "+"), "file": file} for key, file in files.items()]
+
+def test_apply_only_touches_the_difference(keyboard):
+    assert hotkeys.apply_shortcuts(shortcut_list(ctrl_a="a.macro", ctrl_b="b.macro")) == \
+           (["ctrl+a", "ctrl+b"], [], [])
+    kept = hotkeys.registered_hotkeys["ctrl+a"]
+
+    added, removed, retargeted = hotkeys.apply_shortcuts(
+        shortcut_list(Alt_Ctrl_C="c.macro", ctrl_a="new.macro"))
+    assert (added, removed, retargeted) == (["ctrl+alt+c"], ["ctrl+b"], ["ctrl+a"])
+    assert hotkeys.registered_hotkeys["ctrl+a"] == kept
+    assert hotkeys.hotkey_targets["ctrl+a"].endswith("new.macro")
+    assert keyboard.bound() == ["ctrl+a", "ctrl+alt+c"]
+
+def test_strict_apply_rolls_back(keyboard):
+    hotkeys.apply_shortcuts(shortcut_list(ctrl_a="a.macro"))
+    before = (dict(hotkeys.registered_hotkeys), dict(hotkeys.hotkey_targets))
+
+    keyboard.fail.add("ctrl+d")
+    with pytest.raises(ValueError, match="could not register 'ctrl\\+d'"):
+        hotkeys.apply_shortcuts(shortcut_list(ctrl_b="b.macro", ctrl_c="c.macro", ctrl_d="d.macro"))
+    with pytest.raises(ValueError, match="assigned twice"):
+        hotkeys.apply_shortcuts(shortcut_list(ctrl_b="b.macro") + shortcut_list(Ctrl_B="c.macro"))
+    assert (hotkeys.registered_hotkeys, hotkeys.hotkey_targets) == before
+    assert keyboard.bound() == ["ctrl+a"]
+
+def test_lenient_apply_skips_bad_entries(keyboard, capsys):
+    keyboard.fail.add("ctrl+d")
+    entries = shortcut_list(ctrl_b="b.macro", ctrl_d="d.macro") + [{"shortcut": "ctrl+1", "file": "x.macro"}, "junk"]
+    assert hotkeys.apply_shortcuts(entries, strict=False) == (["ctrl+b"], [], [])
+    assert keyboard.bound() == ["ctrl+b"]
+    out = capsys.readouterr().out
+    assert "Failed to register hotkey 'ctrl+d'" in out
+    assert "taken by the recording hotkeys" in out and "invalid entry 'junk'" in out
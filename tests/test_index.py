@@ -0,0 +1,53 @@
+import pytest
+
+from tinytask.bench import gen_dense_mouse
+from tinytask.cache import CompiledMacro
+from tinytask.index import MacroIndex, format_position, parse_position
+
+@pytest.fixture
+def macro():
+    buf = gen_dense_mouse(1000)
+    buf.add_marker("middle", buf[500][4])
+    return CompiledMacro(buf)
+
+def test_state_at_matches_a_full_replay(macro):
+    # the first click is ops 399 and 400, so a checkpoint falls while it is held
+    index = MacroIndex(macro.ops, interval=8)
+    assert any(held for _, held in index.checkpoints)
+    for i in range(len(macro.ops) + 1):
+        held = set()
+        position = MacroIndex._roll(macro.ops, 0, i, None, held)
+        assert index.state_at(i) == (position, frozenset(held))
+
+def test_locate(macro):
+    index = macro.index()
+    offsets = [op[0] for op in macro.ops]
+    assert index.locate(0) == 0
+    assert index.locate(offsets[-1] + 1) == len(offsets)
+    for i in (1, 250, 999):
+        assert index.locate(offsets[i]) == offsets.index(offsets[i])
+        assert offsets[index.locate(offsets[i] - 1)] >= offsets[i] - 1
+    assert index.locate("middle") == offsets.index(macro.markers["middle"])
+    with pytest.raises(ValueError, match="no marker"):
+        index.locate("end")
+
+def test_empty_index():
+    assert MacroIndex([]).state_at(0) == (None, frozenset())
+
+@pytest.mark.parametrize("text, offset_ns", [
+    ("95.5", 95_500_000_000),
+    ("1:35.5", 95_500_000_000),
+    ("1:01:35.5", 3_695_500_000_000),
+    (" 0 ", 0),
+])
+def test_parse_position(text, offset_ns):
+    assert parse_position(text) == offset_ns
+
+def test_marker_names_are_not_positions():
+    assert parse_position("intro") == "intro"
+    assert parse_position("1:2:3:4") == "1:2:3:4"
+
+def test_format_position():
+    assert format_position(95_500_000_000) == "1:35.500"
+    assert format_position(3_695_500_000_000) == "1:01:35.500"
+    assert parse_position(format_position(3_695_500_000_000)) == 3_695_500_000_000
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from tinytask import journal
+from tinytask.events import REC_MOVE, REC_PRESS
+from tinytask.journal import RecordingJournal, lock_journal, new_journal_path, recover_journals
+from tinytask.macrofile import read_macro_file
+
+@pytest.fixture
+def folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "journal"))
+    return tmp_path
+
+def write_events(rec, n):
+    for i in range(n):
+        rec.write(REC_MOVE, i, 2 * i, None, i * 1_000_000)
+    rec.write(REC_PRESS, 1, 2, "Button.left", n * 1_000_000)
+
+def test_running_journal_is_locked_and_skipped(folder):
+    rec = RecordingJournal(new_journal_path(), 0)
+    write_events(rec, 100)
+    rec.sync()
+    try:
+        with open(rec.path, "rb") as f:
+            assert not lock_journal(f)
+        assert recover_journals(str(folder)) == []
+        assert os.path.exists(rec.path)
+    finally:
+        rec.discard()
+    assert not os.path.exists(rec.path)
+
+def test_interrupted_journal_is_recovered(folder, capsys):
+    rec = RecordingJournal(new_journal_path(), 0)
+    write_events(rec, 100)
+    rec.add_marker("half", 50_000_000)
+    rec.close()   # the process went away without saving
+
+    recovered = recover_journals(str(folder))
+    assert [os.path.basename(path) for path in recovered] == \
+           [os.path.basename(rec.path).replace("recording-", "recovered-")[:-len(".journal")] + ".macro"]
+    buf = read_macro_file(recovered[0])
+    assert len(buf) == 101
+    assert buf.markers == {"half": 50_000_000}
+    assert not os.path.exists(rec.path)
+    assert "101 events)" in capsys.readouterr().out
+
+def test_torn_journal_keeps_complete_blocks(folder, capsys):
+    rec = RecordingJournal(new_journal_path(), 0)
+    write_events(rec, 100)
+    rec.close()
+    with open(rec.path, "ab") as f:
+        f.write(b"EVTS\x07")   # a block cut off mid-header
+
+    recovered = recover_journals(str(folder))
+    assert len(read_macro_file(recovered[0])) == 101
+    assert "cut at the last complete block" in capsys.readouterr().out
+
+def test_empty_journal_is_removed(folder):
+    rec = RecordingJournal(new_journal_path(), 0)
+    rec.close()
+    assert recover_journals(str(folder)) == []
+    assert os.listdir(journal.JOURNAL_DIR) == []
+    assert sorted(os.listdir(folder)) == ["journal"]
@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+from tinytask.bench import gen_dense_mouse
+from tinytask.events import REC_KEY, REC_MOVE, REC_PRESS, EventBuffer, MacroFormatError
+from tinytask.macrofile import (CHUNK_EVENTS, MAX_DELTA_US, convert_macro, is_binary_macro, read_macro_file,
+                                read_macro_prefix, write_macro_file)
+
+LEGACY_EVENTS = [
+    ["move", 10, 20, None, None, 1.0],
+    ["click", 10, 20, "Button.left", True, 1.25],
+    ["click", 12, 21, "Button.left", False, 1.5],
+    ["key", "'a'", 0, None, None, 2.0],
+    ["key", "Key.enter", 0, None, None, 2.125],
+    ["move", 300, 400, None, None, 3.5],
+]
+
+def rows(buf):
+    return [(code, x, y, buf.name(sid), t_ns) for code, x, y, sid, t_ns in buf]
+
+def test_json_converts_to_binary(tmp_path):
+    src, dst = str(tmp_path / "old.macro"), str(tmp_path / "new.macro")
+    with open(src, "w") as f:
+        json.dump(LEGACY_EVENTS, f)
+
+    legacy = read_macro_file(src)
+    assert convert_macro(src, dst) == len(LEGACY_EVENTS)
+    assert not is_binary_macro(src)
+    assert is_binary_macro(dst)
+    assert rows(read_macro_file(dst)) == rows(legacy)
+    assert rows(legacy)[3] == (REC_KEY, 0, 0, "'a'", 2_000_000_000)
+
+def test_gaps_larger_than_i32_us(tmp_path):
+    file = str(tmp_path / "gaps.macro")
+    buf = EventBuffer()
+    left = buf.intern("Button.left")
+    t = 5_000_000_000
+    for gap_us in (1, MAX_DELTA_US, MAX_DELTA_US + 1, 10 * MAX_DELTA_US, 3):
+        t += gap_us * 1000
+        buf.append(REC_MOVE, 1, 2, -1, t)
+    buf.append(REC_PRESS, 1, 2, left, t + 1000)
+
+    for compress in (True, False):
+        write_macro_file(file, buf, compress=compress)
+        assert rows(read_macro_file(file)) == rows(buf)
+
+def test_markers_round_trip(tmp_path):
+    file = str(tmp_path / "markers.macro")
+    buf = gen_dense_mouse(CHUNK_EVENTS + 500)
+    buf.add_marker("start", buf[0][4])
+    buf.add_marker("middle", buf[CHUNK_EVENTS + 7][4])
+    buf.add_marker("end", buf[-1][4])
+
+    write_macro_file(file, buf)
+    loaded = read_macro_file(file)
+    assert loaded.markers == buf.markers
+    assert rows(loaded) == rows(buf)
+
+def test_prefix_of_truncated_file(tmp_path):
+    file = str(tmp_path / "cut.macro")
+    buf = gen_dense_mouse(2 * CHUNK_EVENTS + 100)
+    write_macro_file(file, buf, compress=False)
+    with open(file, "r+b") as f:
+        f.truncate(os.path.getsize(file) - 1000)
+
+    with pytest.raises(MacroFormatError):
+        read_macro_file(file)
+    prefix, complete = read_macro_prefix(file)
+    assert not complete
+    assert len(prefix) == 2 * CHUNK_EVENTS
+    assert rows(prefix) == rows(buf[:2 * CHUNK_EVENTS])
+
+    write_macro_file(file, buf)
+    prefix, complete = read_macro_prefix(file)
+    assert complete
+    assert len(prefix) == len(buf)
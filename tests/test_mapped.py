@@ -0,0 +1,72 @@
+import mmap
+import os
+
+import pytest
+
+from tinytask.bench import gen_dense_mouse
+from tinytask.cache import CompiledMacro
+from tinytask.decode import OP_RELEASE
+from tinytask.events import MacroFormatError
+from tinytask.macrofile import CHUNK_EVENTS, read_macro_file, write_macro_file
+from tinytask.mapped import MappedEvents, MappedMacro
+
+@pytest.fixture
+def macros(tmp_path):
+    # the same file compiled in memory and memory mapped
+    file = str(tmp_path / "index.macro")
+    buf = gen_dense_mouse(3 * CHUNK_EVENTS + 1234)
+    buf.add_marker("first", buf[0][4])
+    buf.add_marker("block edge", buf[CHUNK_EVENTS][4])
+    buf.add_marker("late", buf[2 * CHUNK_EVENTS + 999][4])
+    write_macro_file(file, buf)
+    compiled = CompiledMacro(read_macro_file(file), file)
+    mapped = MappedMacro(file)
+    yield compiled, mapped
+    mapped.close()
+
+def test_locate_agrees(macros):
+    compiled, mapped = macros
+    expected, actual = compiled.index(), mapped.index()
+    assert mapped.markers == compiled.markers
+    for name in compiled.markers:
+        assert actual.locate(name) == expected.locate(name)
+
+    last = compiled.ops[-1][0]
+    for offset in list(range(-5, last + 5_000_000, 997_331)) + [0, last, last + 1]:
+        assert actual.locate(offset) == expected.locate(offset), offset
+    with pytest.raises(ValueError):
+        actual.locate("missing")
+
+def test_state_at_agrees(macros):
+    compiled, mapped = macros
+    expected, actual = compiled.index(), mapped.index()
+    n = len(compiled.ops)
+    edges = [CHUNK_EVENTS * b + d for b in range(4) for d in (-1, 0, 1)]
+    # later blocks first, so checkpoints are rolled forward on demand
+    for index in [n - 1, n] + list(range(n - 2, 0, -4099)) + edges:
+        if 0 <= index <= n:
+            assert actual.state_at(index) == expected.state_at(index), index
+
+    # just before a release, in a later block, its button is still held
+    releases = [i for i, op in enumerate(compiled.ops) if op[1] == OP_RELEASE]
+    release = next(i for i in releases if i > 2 * CHUNK_EVENTS)
+    assert expected.state_at(release)[1]
+    assert actual.state_at(release) == expected.state_at(release)
+
+def test_corrupt_file_is_unmapped(tmp_path, monkeypatch):
+    file = str(tmp_path / "cut.macro")
+    write_macro_file(file, gen_dense_mouse(2 * CHUNK_EVENTS))
+    with open(file, "r+b") as f:
+        f.truncate(os.path.getsize(file) - 100)
+
+    maps = []
+    real_mmap = mmap.mmap
+
+    def tracked(*args, **kwargs):
+        maps.append(real_mmap(*args, **kwargs))
+        return maps[-1]
+
+    monkeypatch.setattr(mmap, "mmap", tracked)
+    with pytest.raises(MacroFormatError):
+        MappedEvents(file)
+    assert len(maps) == 1 and maps[0].closed
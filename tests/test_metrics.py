@@ -0,0 +1,33 @@
+import socket
+
+import pytest
+
+from tinytask import metrics
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+def fetch(path):
+    with socket.socket(socket.AF_UNIX) as s:
+        s.connect(path)
+        s.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+        return b"".join(iter(lambda: s.recv(65536), b""))
+
+def test_stale_socket_is_replaced(tmp_path):
+    path = str(tmp_path / "metrics.sock")
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    metrics.start_metrics_server("unix:" + path)
+    try:
+        assert b"200 OK" in fetch(path)
+    finally:
+        metrics.stop_metrics_server()
+
+def test_ordinary_file_is_not_removed(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(ValueError):
+        metrics.start_metrics_server(f"unix:{path}")
+    assert path.read_text() == "keep me"
+    assert metrics.metrics_server is None
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from tinytask import journal, recorder, state
+from tinytask.cli import main
+from tinytask.events import REC_MOVE, REC_PRESS
+from tinytask.filejobs import FileJob
+from tinytask.inputhub import input_hub
+from tinytask.macrofile import read_macro_file
+from tinytask.playback import emergency_stop_listener
+
+@pytest.fixture
+def hub(tmp_path, monkeypatch):
+    # events are fed straight into the hub instead of through OS hooks
+    monkeypatch.setattr(journal, "JOURNAL_DIR", str(tmp_path / "journal"))
+    monkeypatch.setattr(input_hub, "_ensure_listeners", lambda kind: None)
+    yield input_hub
+    recorder.discard_journal()
+    input_hub.stop()
+
+def feed(hub, moves):
+    # waits for the recording to start, like a user moving the mouse
+    while recorder.session is None:
+        time.sleep(0.01)
+    for i in range(moves):
+        hub._on_move(i, 2 * i)
+    hub._on_click(5, 6, "Button.left", True)
+
+def test_record_stop_and_save(hub, tmp_path):
+    file = str(tmp_path / "recorded.macro")
+    feeder = threading.Thread(target=feed, args=(hub, 500))
+    feeder.start()
+    assert main(["record", file, "--duration", "0.5"]) == 0
+    feeder.join()
+
+    saved = read_macro_file(file)
+    assert len(saved) == 501
+    assert saved[0][:3] == (REC_MOVE, 0, 0)
+    assert saved[-1][:3] == (REC_PRESS, 5, 6)
+    assert recorder.last_journal is None
+
+def test_recording_ready_once_loaded(hub):
+    recorder.start_recording()
+    feed(hub, 50)
+    job = recorder.stop_recording()
+    assert job.wait(10)
+    assert not recorder.recording_loading()
+    assert len(state.events) == 51
+
+def test_wait_returns_after_done_callbacks():
+    seen = []
+
+    def slow(job):
+        time.sleep(0.2)
+        seen.append(job.result)
+
+    job = FileJob("Testing", lambda progress=None: 42)
+    job.add_done_callback(slow)
+    job.start()
+    assert job.wait(10)
+    assert seen == [42]
+    job.add_done_callback(lambda job: seen.append("late"))
+    assert seen == [42, "late"]
+
+def test_esc_stops_recording_off_the_hook_thread(hub, monkeypatch):
+    from pynput.keyboard import Key
+
+    close = recorder.RecordingSession.close
+
+    def slow_close(session):
+        time.sleep(0.5)   # a slow disk syncing the journal
+        close(session)
+
+    monkeypatch.setattr(recorder.RecordingSession, "close", slow_close)
+    recorder.start_recording()
+    feed(hub, 10)
+    previous = recorder.loading_job
+    start = time.perf_counter()
+    emergency_stop_listener(Key.esc)
+    emergency_stop_listener(Key.esc)
+    assert time.perf_counter() - start < 0.25
+    assert not state.recording
+
+    while recorder.loading_job is previous:
+        time.sleep(0.01)
+    assert recorder.loading_job.wait(10)
+    assert recorder.session is None
+    assert len(state.events) == 11
@@ -0,0 +1,56 @@
+import threading
+import time
+
+from tinytask.scheduler import PlaybackControl, lateness_stats
+
+def later(seconds, action):
+    timer = threading.Timer(seconds, action)
+    timer.start()
+    return timer
+
+def test_wait_until_returns_the_deadline():
+    control = PlaybackControl()
+    deadline = time.perf_counter_ns() + 20_000_000
+    assert control.wait_until(deadline) == deadline
+    assert time.perf_counter_ns() >= deadline
+
+def test_stop_wakes_a_long_wait():
+    control = PlaybackControl()
+    later(0.05, control.request_stop).join()
+    assert control.wait_until(time.perf_counter_ns() + 60_000_000_000) is None
+
+    control = PlaybackControl()
+    started = time.perf_counter()
+    later(0.05, control.request_stop)
+    assert control.wait_until(time.perf_counter_ns() + 60_000_000_000) is None
+    assert time.perf_counter() - started < 5
+
+    control.halted()
+    assert control.last_stop_latency_ms is not None
+
+def test_pause_shifts_the_deadline():
+    control = PlaybackControl()
+    control.pause()
+    deadline = time.perf_counter_ns() + 10_000_000
+    later(0.1, control.resume)
+    adjusted = control.wait_until(deadline)
+    assert adjusted == deadline + control.pause_shift_ns
+    assert control.pause_shift_ns >= 90_000_000
+    assert time.perf_counter_ns() >= adjusted
+
+def test_stop_while_paused():
+    control = PlaybackControl()
+    control.pause()
+    later(0.05, control.request_stop)
+    assert control.wait_until(time.perf_counter_ns()) is None
+
+    control.reset()
+    assert not control.stop_requested and not control.paused
+    assert control.pause_shift_ns == 0 and control.stop_requested_ns is None
+    deadline = time.perf_counter_ns() + 1_000_000
+    assert control.wait_until(deadline) == deadline
+
+def test_lateness_stats():
+    assert lateness_stats([])["events"] == 0
+    stats = lateness_stats([i * 1_000_000 for i in range(100)])
+    assert (stats["events"], stats["p50_ms"], stats["p99_ms"], stats["max_ms"]) == (100, 50.0, 99.0, 99.0)
@@ -0,0 +1,75 @@
+import pytest
+
+from tinytask.bench import gen_dense_mouse
+from tinytask.cli import main
+from tinytask.decode import OP_MOVE, OP_PRESS, OP_RELEASE, decode_events
+from tinytask.macrofile import write_macro_file
+from tinytask.transforms import Transform, parse_ints, parse_size
+
+@pytest.fixture
+def ops():
+    return decode_events(gen_dense_mouse(1000))
+
+def test_geometry_stages(ops):
+    base = ops[0][0]
+    moved = list(Transform().map_screen((1000, 1000), (2000, 500)).offset(3, -4)(ops, base))
+    assert [op[:2] for op in moved] == [op[:2] for op in ops]
+    for (_, _, x, y, _), (_, _, mx, my, _) in zip(ops, moved):
+        assert (mx, my) == (round(x * 2.0) + 3, round(y * 0.5) - 4)
+
+    clipped = list(Transform().clip(400, 450, 500, 550)(ops, base))
+    assert all(400 <= x <= 500 and 450 <= y <= 550 for _, _, x, y, _ in clipped)
+
+def test_only_and_time_scale(ops):
+    base = ops[0][0]
+    clicks = list(Transform().only(["clicks"]).time_scale(2.0)(ops, base))
+    assert clicks and all(op in (OP_PRESS, OP_RELEASE) for _, op, _, _, _ in clicks)
+    originals = [o for o in ops if o[1] in (OP_PRESS, OP_RELEASE)]
+    assert [t - base for t, *_ in clicks] == [2 * (t - base) for t, *_ in originals]
+    assert Transform().time_scale(2.0).source_offset(base + 2000, base) == base + 1000
+
+def test_jitter_is_seeded_per_pass(ops):
+    base = ops[0][0]
+    transform = Transform().jitter(3, 2, seed=7)
+    first, second = (list(transform(ops, base, i)) for i in range(2))
+    assert first == list(transform(ops, base, 0))
+    assert first != second
+    assert list(Transform().jitter(3, 2)(ops, base)) != list(Transform().jitter(3, 2)(ops, base))
+
+    for played in (first, second):
+        offsets = [t for t, *_ in played]
+        assert offsets == sorted(offsets) and offsets[0] >= base
+        # clicks keep their position, moves stay within px
+        for original, (_, op, x, y, _) in zip(ops, played):
+            if op == OP_MOVE:
+                assert abs(x - original[2]) <= 3 and abs(y - original[3]) <= 3
+            else:
+                assert (x, y) == original[2:4]
+
+def test_timeline_lays_passes_end_to_end(ops):
+    base = ops[0][0]
+    transform = Transform().jitter(0, 1, seed=1)
+    timeline = transform.timeline(ops, base, 3)
+    first, second = list(transform(ops, base, 0)), list(transform(ops, base, 1))
+    assert len(timeline) == 3 * len(ops)
+    assert timeline[:len(ops)] == first
+    shift = first[-1][0] - base
+    assert timeline[len(ops)][0] == second[0][0] + shift
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        Transform().only(["scrolls"])
+    with pytest.raises(ValueError):
+        Transform().clip(10, 0, 0, 10)
+    with pytest.raises(ValueError):
+        Transform().time_scale(0)
+    with pytest.raises(ValueError):
+        parse_size("1920by1080")
+    assert parse_ints("1,2", 2, "offset") == (1, 2)
+
+def test_jittered_loops_pass_the_sink_check(tmp_path, capsys):
+    file = str(tmp_path / "jitter.macro")
+    write_macro_file(file, gen_dense_mouse(200))
+    assert main(["play", file, "--backend", "sink", "--speed", "50", "--loops", "3",
+                 "--jitter", "2,1"]) == 0
+    assert "🎲 Jitter seed" in capsys.readouterr().out
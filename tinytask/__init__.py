@@ -0,0 +1,6 @@
+# TinyTask core: recording, the macro file format and playback, importable
+# without side effects.  pynput, keyboard and PyQt5 are only imported when
+# something actually records, plays or opens the window.
+
+from .events import EventBuffer, MacroFormatError, REC_MOVE, REC_PRESS, REC_RELEASE, REC_KEY
+from .macrofile import read_macro_file, write_macro_file, convert_macro, convert_macro_dir, is_binary_macro
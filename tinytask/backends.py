@@ -0,0 +1,282 @@
+import os
+import sys
+import time
+
+from .decode import OP_MOVE, OP_PRESS, OP_RELEASE, OP_KEY, OP_TYPE
+from .scheduler import lateness_stats
+
+############################################
+# INPUT BACKENDS
+############################################
+
+# Playback never touches an input library directly, it calls the backend's
+# dispatch table, indexed by OP_* code like the decoded ops.  Every entry
+# takes (x, y, target) where target is what decode_events resolved: a pynput
+# Button, Key or KeyCode, or the text to type.
+#   "pynput"  pynput controllers, works everywhere pynput does
+#   "xtest"   XTest requests sent straight to the X server through
+#             python-xlib, no per-event display sync like pynput does
+#   "sink"    nothing is injected, the emitted stream is kept in memory with
+#             timestamps so a replay can be checked against its macro on a
+#             box without a display
+# Backends are created on first use and shared, so pynput or the X
+# connection is only set up once per process.
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+class Backend:
+    name = None
+    emergency_stop = True   # listen for ESC through the input hub while playing
+
+    def __init__(self):
+        self.held = set()   # buttons pressed by playback and not yet released
+
+    def dispatch(self):
+        return (self.move, self.press, self.release, self.tap_key, self.type_text)
+
+    def restore(self, position, held):
+        # put the cursor and buttons where a macro expects them before
+        # playing from the middle of it
+        for button in self.held - held:
+            self.button_up(button)
+            self.held.discard(button)
+        if position is not None:
+            self.move(*position, None)
+            for button in held - self.held:
+                self.press(*position, button)
+
+    def release_held(self):
+        for button in list(self.held):
+            self.button_up(button)
+            print(f"↩ Released held {button}")
+        self.held.clear()
+
+    def close(self):
+        pass
+
+class PynputBackend(Backend):
+    name = "pynput"
+
+    def __init__(self):
+        super().__init__()
+        from pynput.keyboard import Controller as KeyController
+        from pynput.mouse import Controller as MouseController
+
+        self.mouse = MouseController()
+        self.keyboard = KeyController()
+
+    def move(self, x, y, target):
+        self.mouse.position = (x, y)
+
+    def press(self, x, y, target):
+        self.mouse.position = (x, y)
+        self.mouse.press(target)
+        self.held.add(target)
+
+    def release(self, x, y, target):
+        self.mouse.position = (x, y)
+        self.mouse.release(target)
+        self.held.discard(target)
+
+    def button_up(self, button):
+        self.mouse.release(button)
+
+    def tap_key(self, x, y, target):
+        self.keyboard.press(target)
+        self.keyboard.release(target)
+
+    def type_text(self, x, y, target):
+        self.keyboard.type(target)
+
+# X button numbers for pynput's Button names
+X_BUTTONS = {"left": 1, "middle": 2, "right": 3, "scroll_up": 4, "scroll_down": 5,
+             "scroll_left": 6, "scroll_right": 7}
+
+class XTestBackend(Backend):
+    name = "xtest"
+
+    def __init__(self):
+        super().__init__()
+        try:
+            from Xlib import X, XK, display, error
+            from Xlib.ext import xtest
+        except ImportError:
+            raise BackendUnavailable("the xtest backend needs python-xlib (pip install python-xlib)") from None
+
+        try:
+            self.display = display.Display()
+        except error.DisplayError as e:
+            raise BackendUnavailable(f"no X display: {e}") from None
+        if not self.display.has_extension("XTEST"):
+            self.display.close()
+            raise BackendUnavailable("the X server has no XTEST extension")
+
+        self.X = X
+        self.fake_input = xtest.fake_input
+        self.shift = self.display.keysym_to_keycode(XK.XK_Shift_L)
+        self.buttons = {}
+        self.keycodes = {}   # keysym -> (keycode, shift needed)
+
+    def _button(self, target):
+        number = self.buttons.get(target)
+        if number is None:
+            name = target.name
+            number = X_BUTTONS.get(name) or int(name[len("button"):])
+            self.buttons[target] = number
+        return number
+
+    def _keycode(self, keysym):
+        entry = self.keycodes.get(keysym)
+        if entry is None:
+            # index 1 of a keycode's keysym list is its shifted symbol
+            found = list(self.display.keysym_to_keycodes(keysym))
+            keycode, index = found[0] if found else (0, 0)
+            entry = self.keycodes[keysym] = (keycode, index & 1)
+        return entry
+
+    def _tap(self, keysym):
+        keycode, shifted = self._keycode(keysym)
+        if not keycode:
+            print(f"⚠ No keycode for keysym {keysym:#x}, skipped")
+            return
+        fake, X = self.fake_input, self.X
+        if shifted:
+            fake(self.display, X.KeyPress, self.shift)
+        fake(self.display, X.KeyPress, keycode)
+        fake(self.display, X.KeyRelease, keycode)
+        if shifted:
+            fake(self.display, X.KeyRelease, self.shift)
+        self.display.flush()
+
+    def move(self, x, y, target):
+        self.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.display.flush()
+
+    def press(self, x, y, target):
+        self.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.fake_input(self.display, self.X.ButtonPress, self._button(target))
+        self.display.flush()
+        self.held.add(target)
+
+    def release(self, x, y, target):
+        self.fake_input(self.display, self.X.MotionNotify, x=x, y=y)
+        self.fake_input(self.display, self.X.ButtonRelease, self._button(target))
+        self.display.flush()
+        self.held.discard(target)
+
+    def button_up(self, button):
+        self.fake_input(self.display, self.X.ButtonRelease, self._button(button))
+        self.display.flush()
+
+    def tap_key(self, x, y, target):
+        # on X11, pynput's Key values and KeyCode.from_vk both carry the keysym
+        self._tap(getattr(target, "value", target).vk)
+
+    def type_text(self, x, y, target):
+        for char in target:
+            # Latin-1 keysyms are the code point, the rest are 0x01000000 + it
+            code = ord(char)
+            self._tap(code if code < 0x100 else 0x01000000 | code)
+
+    def close(self):
+        self.display.close()
+
+class RecordingSink(Backend):
+    name = "sink"
+    emergency_stop = False
+
+    def __init__(self):
+        super().__init__()
+        self.emitted = []   # (t_ns, op, x, y, target)
+        self.restores = []  # (position, held) for every restore()
+
+    def reset(self):
+        self.emitted = []
+        self.restores = []
+        self.held.clear()
+
+    def restore(self, position, held):
+        # kept apart from `emitted` so compare() only sees the macro's own events
+        self.restores.append((position, held))
+        self.held = set(held)
+
+    def move(self, x, y, target):
+        self.emitted.append((time.perf_counter_ns(), OP_MOVE, x, y, target))
+
+    def press(self, x, y, target):
+        self.emitted.append((time.perf_counter_ns(), OP_PRESS, x, y, target))
+        self.held.add(target)
+
+    def release(self, x, y, target):
+        self.emitted.append((time.perf_counter_ns(), OP_RELEASE, x, y, target))
+        self.held.discard(target)
+
+    def button_up(self, button):
+        pass
+
+    def tap_key(self, x, y, target):
+        self.emitted.append((time.perf_counter_ns(), OP_KEY, x, y, target))
+
+    def type_text(self, x, y, target):
+        self.emitted.append((time.perf_counter_ns(), OP_TYPE, x, y, target))
+
+    def compare(self, ops, speed=1.0, loops=1, base=None):
+        # Checks the emitted stream against the decoded ops it was played
+        # from, `loops` times over (0 = however many passes were emitted).
+        # Timing error is each event's distance from its offset in the macro,
+        # measured from the first emitted event.  Idle gap clamping is not
+        # modelled, compare against runs played without it.  base is where a
+        # pass starts if ops were filtered and no longer begin there.
+        emitted = self.emitted
+        mismatches = []
+        errors = []
+        if ops and emitted:
+            n, first = len(ops), ops[0][0]
+            pass_ns = ops[-1][0] - (first if base is None else base)
+            t0 = emitted[0][0]
+            for i, (t_ns, op, x, y, target) in enumerate(emitted):
+                offset_ns, want_op, want_x, want_y, want_target = ops[i % n]
+                if (op, x, y, target) != (want_op, want_x, want_y, want_target):
+                    mismatches.append(i)
+                expected_ns = (offset_ns - first + (i // n) * pass_ns) / speed
+                errors.append(abs(t_ns - t0 - expected_ns))
+
+        report = lateness_stats(errors)
+        expected = len(ops) * loops if loops else len(emitted)
+        report.update(expected=expected, emitted=len(emitted), mismatches=len(mismatches),
+                      first_mismatch=mismatches[0] if mismatches else None)
+        return report
+
+BACKENDS = {
+    "pynput": PynputBackend,
+    "xtest": XTestBackend,
+    "sink": RecordingSink,
+}
+
+backends = {}
+
+def check_backend(backend):
+    if not isinstance(backend, Backend) and backend not in BACKENDS:
+        raise ValueError(f"unknown input backend {backend!r}, expected one of {', '.join(BACKENDS)}")
+
+def get_backend(backend):
+    # a name gives the shared instance, an instance (e.g. a private sink) is used as is
+    if isinstance(backend, Backend):
+        return backend
+    check_backend(backend)
+    if backend not in backends:
+        backends[backend] = BACKENDS[backend]()
+    return backends[backend]
+
+def allow_headless_pynput():
+    # Button and key names resolve through pynput, which needs a display on
+    # Linux unless it is told to use its dummy backend.  Only safe when
+    # nothing will be injected or listened to, e.g. replaying into a sink.
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        os.environ.setdefault("PYNPUT_BACKEND", "dummy")
+
+def print_sink_report(report):
+    print(f"🧪 Sink | {report['emitted']}/{report['expected']} events | "
+          f"{report['mismatches']} out of order or wrong | timing error "
+          f"p50 {report['p50_ms']:.3f} ms | p99 {report['p99_ms']:.3f} ms | max {report['max_ms']:.3f} ms")
@@ -0,0 +1,366 @@
+import gc
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from .events import EventBuffer, REC_MOVE, REC_PRESS, REC_RELEASE, REC_KEY
+
+############################################
+# SYNTHETIC MACROS
+############################################
+
+# Deterministic generators (fixed seed) so every run benchmarks the same data.
+#   dense_mouse  1 kHz mouse path with a click every few hundred moves
+#   typing       bursts of key presses, 30-150 ms apart, short pauses between
+#   idle_gaps    short mouse runs separated by multi-second idle gaps
+
+KEY_NAMES = [repr(c) for c in "abcdefghijklmnopqrstuvwxyz0123456789"] + ["Key.space", "Key.enter", "Key.backspace"]
+
+def gen_dense_mouse(n, seed=1):
+    rnd = random.Random(seed)
+    buf = EventBuffer()
+    left = buf.intern("Button.left")
+    t, x, y = 0, 500.0, 500.0
+    i = 0
+    while i < n:
+        if i % 400 == 399 and i + 1 < n:
+            buf.append(REC_PRESS, int(x), int(y), left, t)
+            t += 60_000_000
+            buf.append(REC_RELEASE, int(x), int(y), left, t)
+            i += 2
+            continue
+        angle = i / 50.0
+        x = min(max(x + 4 * math.cos(angle) + rnd.uniform(-1, 1), 0), 3839)
+        y = min(max(y + 4 * math.sin(angle) + rnd.uniform(-1, 1), 0), 2159)
+        buf.append(REC_MOVE, int(x), int(y), -1, t)
+        t += 1_000_000
+        i += 1
+    return buf
+
+def gen_typing(n, seed=2):
+    rnd = random.Random(seed)
+    buf = EventBuffer()
+    sids = [buf.intern(name) for name in KEY_NAMES]
+    t = 0
+    for i in range(n):
+        buf.append(REC_KEY, 0, 0, rnd.choice(sids), t)
+        t += rnd.randint(30, 150) * 1_000_000
+        if i % 40 == 39:
+            t += rnd.randint(500, 2000) * 1_000_000
+    return buf
+
+def gen_idle_gaps(n, seed=3):
+    rnd = random.Random(seed)
+    buf = EventBuffer()
+    left = buf.intern("Button.left")
+    t, x, y = 0, 800, 600
+    for i in range(n):
+        if i % 500 == 499:
+            t += rnd.randint(2, 8) * 1_000_000_000
+            code, sid = (REC_PRESS, left) if i % 1000 == 499 else (REC_RELEASE, left)
+        else:
+            x, y = x + rnd.randint(-3, 3), y + rnd.randint(-3, 3)
+            code, sid = REC_MOVE, -1
+        buf.append(code, x, y, sid, t)
+        t += 2_000_000
+    return buf
+
+GENERATORS = {
+    "dense_mouse": gen_dense_mouse,
+    "typing": gen_typing,
+    "idle_gaps": gen_idle_gaps,
+}
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+############################################
+# MEASUREMENTS
+############################################
+
+# Metric names end in their unit.  *_per_s is better when higher, everything
+# else (_ns, _ms, _s, _bytes) when lower; compare_results() relies on it.
+# Every measurement is repeated and the runs combined with combine_runs():
+# the best run for timings and sizes, since noise only ever makes them
+# worse, and the median for lateness and replay error, which are noise.
+
+BENCH_REPEATS = 5
+PLAYBACK_REPEATS = 3   # each replay takes about two seconds
+MEDIAN_METRICS = ("lateness_", "sink_error_")
+WORST_METRICS = ("sink_mismatches", "sink_missing")
+
+def combine_runs(runs):
+    combined = {}
+    for metric in runs[0]:
+        values = sorted(run[metric] for run in runs)
+        if metric in WORST_METRICS or metric.endswith("_per_s"):
+            combined[metric] = values[-1]
+        elif metric.startswith(MEDIAN_METRICS):
+            combined[metric] = values[len(values) // 2]
+        else:
+            combined[metric] = values[0]
+    return combined
+
+def _repeated(repeats, func, *args):
+    return combine_runs([func(*args) for _ in range(max(repeats, 1))])
+
+def calibrate(repeats=BENCH_REPEATS):
+    # a fixed pure Python workload; how long it takes tracks how fast the
+    # machine is right now (shared CI hosts and laptops drift a lot)
+    best = None
+    for _ in range(max(repeats, 1)):
+        start = time.perf_counter_ns()
+        sum(i * i for i in range(200_000))
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def _timed(func, *args):
+    start = time.perf_counter_ns()
+    result = func(*args)
+    return result, time.perf_counter_ns() - start
+
+def _peak_bytes(func, *args):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def bench_callbacks(folder, calls=50_000):
+    from .recorder import RING_CAPACITY, RecordingSession
+
+    calls = min(calls, RING_CAPACITY - 1)
+    session = RecordingSession(os.path.join(folder, "bench.journal"))
+    on_move = session.on_mouse_move
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        on_move(i, i)
+    move_ns = (time.perf_counter_ns() - start) / calls
+
+    _, drain_ns = _timed(session._drain, True)
+
+    on_press = session.on_key_press
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        on_press("a")
+    press_ns = (time.perf_counter_ns() - start) / calls
+    session.close()
+    session.journal.discard()
+
+    return {
+        "on_mouse_move_ns": move_ns,
+        "on_key_press_ns": press_ns,
+        "drain_per_event_ns": drain_ns / calls,
+    }
+
+def bench_storage(buf, folder):
+    from .cache import CompiledMacro
+    from .decode import decode_events
+    from .macrofile import read_macro_file, write_macro_file
+
+    file = os.path.join(folder, "bench.macro")
+    n = len(buf)
+
+    _, save_ns = _timed(write_macro_file, file, buf)
+    size = os.path.getsize(file)
+    loaded, read_ns = _timed(read_macro_file, file)
+    if len(loaded) != n:
+        raise RuntimeError(f"round trip lost events: {len(loaded)} of {n}")
+    _, decode_ns = _timed(decode_events, loaded)
+    _, load_ns = _timed(lambda: CompiledMacro(read_macro_file(file), file))
+
+    results = {
+        "file_bytes": size,
+        "bytes_per_event": size / n,
+        "save_events_per_s": n / (save_ns / 1e9),
+        "save_mb_per_s": size / 1e6 / (save_ns / 1e9),
+        "read_events_per_s": n / (read_ns / 1e9),
+        "decode_ms": decode_ns / 1e6,
+        "load_ms": load_ns / 1e6,   # read + decode, what load_macro() pays on a cache miss
+        "save_peak_bytes": _peak_bytes(write_macro_file, file, buf),
+        "load_peak_bytes": _peak_bytes(lambda: CompiledMacro(read_macro_file(file), file)),
+    }
+    os.remove(file)
+    return results
+
+def bench_playback(buf, target_s=2.0):
+    from .backends import RecordingSink
+    from .cache import CompiledMacro
+    from .playback import PLAYBACK_MAX_SPEED, playback
+
+    macro = CompiledMacro(buf)
+    duration_s = macro.ops[-1][0] / 1e9
+    speed = min(PLAYBACK_MAX_SPEED, max(1.0, duration_s / target_s))
+    sink = RecordingSink()
+    stats = playback(macro, speed=speed, max_idle_ms=0, loops=1, backend=sink)
+    report = sink.compare(macro.ops, speed)
+    return {
+        "speed": speed,
+        "wall_s": duration_s / speed,
+        "lateness_p50_ms": stats["p50_ms"],
+        "lateness_p99_ms": stats["p99_ms"],
+        "lateness_max_ms": stats["max_ms"],
+        "sink_error_p50_ms": report["p50_ms"],
+        "sink_error_p99_ms": report["p99_ms"],
+        "sink_error_max_ms": report["max_ms"],
+        "sink_mismatches": report["mismatches"],
+        "sink_missing": report["expected"] - report["emitted"],
+    }
+
+def run_benchmarks(sizes=(1_000, 10_000, 100_000), scenarios=tuple(GENERATORS),
+                   playback_max=20_000, playback_max_s=10.0, repeats=BENCH_REPEATS):
+    from .backends import allow_headless_pynput
+    from .decode import decode_events
+
+    allow_headless_pynput()
+    # pay pynput's import and the first name lookups before anything is timed
+    for scenario in scenarios:
+        decode_events(GENERATORS[scenario](1_000))
+
+    calibration_ns = calibrate(repeats)
+    folder = tempfile.mkdtemp(prefix="tinytask-bench-")
+    try:
+        # half the callback runs now and half at the end, so one stall of
+        # the machine (or its disk) cannot land on every one of them
+        callback_runs = [bench_callbacks(folder) for _ in range((repeats + 1) // 2)]
+        results = {"callbacks": None}
+        for scenario in scenarios:
+            for n in sizes:
+                buf, gen_ns = _timed(GENERATORS[scenario], n)
+                name = f"{scenario}/{n}"
+                print(f"⏱ {name}")
+                entry = {"generate_ms": gen_ns / 1e6}
+                entry.update(_repeated(repeats, bench_storage, buf, folder))
+                duration_s = (buf[-1][4] - buf[0][4]) / 1e9
+                if n <= playback_max and duration_s / 100 <= playback_max_s:
+                    entry.update(_repeated(min(repeats, PLAYBACK_REPEATS), bench_playback, buf))
+                results[name] = entry
+                del buf
+                gc.collect()
+        callback_runs += [bench_callbacks(folder) for _ in range(repeats // 2)]
+        results["callbacks"] = combine_runs(callback_runs)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    calibration_ns = min(calibration_ns, calibrate(repeats))
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sizes": list(sizes),
+            "repeats": repeats,
+            "calibration_ns": calibration_ns,
+        },
+        "results": results,
+    }
+
+############################################
+# BASELINE COMPARISON
+############################################
+
+# Informational numbers that are neither better nor worse when they change;
+# a single worst sample (*_max_ms) is too random to gate on, p99 covers it
+UNRANKED = ("speed", "wall_s", "generate_ms", "lateness_max_ms", "sink_error_max_ms")
+# A change has to be this large in absolute terms as well as over the
+# threshold: +40% of a 300 ns callback or a 0.2 ms lateness is scheduler noise.
+# Throughput is held to the _ms floor through how long its run took.
+# Lateness follows the OS scheduler and timer, so it gets a wider margin.
+ABSOLUTE_FLOORS = {"_ns": 250, "_ms": 1.0}
+LATENESS_FLOOR_MS = 5.0
+
+def absolute_floor(metric):
+    if metric.startswith(MEDIAN_METRICS):
+        return LATENESS_FLOOR_MS
+    for suffix, floor in ABSOLUTE_FLOORS.items():
+        if metric.endswith(suffix):
+            return floor
+    return 0
+
+def _throughput_ms(name, metrics, metric, rate):
+    # the run behind a *_per_s metric moved the scenario's events or, for
+    # MB/s, its file
+    amount = metrics["file_bytes"] / 1e6 if metric.endswith("_mb_per_s") else int(name.rsplit("/", 1)[1])
+    return amount / rate * 1000 if rate else math.inf
+
+def compare_results(results, baseline, threshold=0.2):
+    # returns (metric, baseline, current, change) for everything that got
+    # worse by more than `threshold`; mismatches regress on any increase.
+    # CPU timings are first rescaled by how much faster or slower the
+    # machine ran the calibration workload than when the baseline was taken.
+    slowdown = 1.0
+    now_ns, base_ns = results["meta"].get("calibration_ns"), baseline.get("meta", {}).get("calibration_ns")
+    if now_ns and base_ns:
+        slowdown = now_ns / base_ns
+    regressions = []
+    for name, metrics in results["results"].items():
+        base_metrics = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            base = base_metrics.get(metric)
+            if base is None or metric in UNRANKED:
+                continue
+            if metric in ("sink_mismatches", "sink_missing"):
+                if value > base:
+                    regressions.append((f"{name}.{metric}", base, value, math.inf))
+                continue
+            if not base:
+                continue
+            if not metric.startswith(MEDIAN_METRICS):   # lateness is wall clock, not CPU
+                if metric.endswith("_per_s"):
+                    value *= slowdown
+                elif metric.endswith(("_ns", "_ms", "_s")):
+                    value /= slowdown
+            if metric.endswith("_per_s"):
+                change = (base - value) / base
+                lost = (_throughput_ms(name, metrics, metric, value)
+                        - _throughput_ms(name, metrics, metric, base))
+                floor = absolute_floor("_ms")
+            else:
+                change = (value - base) / base
+                lost, floor = value - base, absolute_floor(metric)
+            if change > threshold and lost > floor:
+                regressions.append((f"{name}.{metric}", base, value, change))
+    return regressions
+
+def print_results(results):
+    for name, metrics in results["results"].items():
+        print(f"📊 {name}")
+        for metric, value in metrics.items():
+            print(f"   {metric:<22} {value:,.3f}" if isinstance(value, float) else f"   {metric:<22} {value:,}")
+
+def main(sizes, scenarios, output=None, baseline=None, save_baseline=None, threshold=0.2, playback_max=20_000,
+         repeats=BENCH_REPEATS):
+    results = run_benchmarks(sizes, scenarios, playback_max, repeats=repeats)
+    print_results(results)
+
+    for file in (output, save_baseline):
+        if file:
+            with open(file, "w") as f:
+                json.dump(results, f, indent=2)
+            print("💾 Saved results:", file)
+
+    if baseline:
+        with open(baseline) as f:
+            baseline_results = json.load(f)
+        base_ns = baseline_results.get("meta", {}).get("calibration_ns")
+        if base_ns:
+            print(f"⚖ This machine runs at {base_ns / results['meta']['calibration_ns']:.2f}x the baseline's speed")
+        regressions = compare_results(results, baseline_results, threshold)
+        for metric, base, value, change in regressions:
+            print(f"❌ {metric}: {base:,.3f} → {value:,.3f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"✅ No regressions over {threshold:.0%} against {baseline}")
+    return 0
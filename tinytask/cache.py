@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import OrderedDict
+
+from . import state
+from .decode import decode_events
+from .index import MacroIndex
+from .macrofile import is_binary_macro, read_macro_file
+from .mapped import MAPPED_MIN_EVENTS, MappedMacro, count_events
+from .metrics import registry
+
+############################################
+# COMPILED MACRO CACHE
+############################################
+
+# Hotkeys replay the same few files over and over, so each file is read,
+# parsed and compiled once and kept in memory until its mtime or size changes.
+# Entries are evicted least-recently-used once the cache holds more than
+# MACRO_CACHE_MAX_EVENTS decoded events in total.  Binary files with
+# MAPPED_MIN_EVENTS or more are memory mapped instead, see MEMORY MAPPED
+# MACROS.
+MACRO_CACHE_MAX_EVENTS = 2_000_000
+
+class CompiledMacro:
+    def __init__(self, events, path=None):
+        self.path = path
+        self.events = events
+        self.count = len(events)
+        self.resident_events = self.count
+        self.ops = decode_events(events)
+        base_ns = events[0][4] if self.count else 0
+        self.markers = {name: t_ns - base_ns for name, t_ns in events.markers.items()}
+        self._index = None
+        self._index_lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def index(self):
+        with self._index_lock:
+            if self._index is None:
+                self._index = MacroIndex(self.ops, self.markers)
+            return self._index
+
+    # same interface as MappedMacro; nothing here holds the file open
+    def retain(self):
+        return True
+
+    def release(self):
+        pass
+
+    def close(self):
+        pass
+
+class MacroCache:
+    def __init__(self, max_events=MACRO_CACHE_MAX_EVENTS):
+        self.max_events = max_events
+        self.entries = OrderedDict()   # path -> (mtime_ns, size, CompiledMacro)
+        self.total_events = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, path, progress=None):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        # parse outside the lock so a slow file never blocks cache hits
+        macro = open_macro(path, progress)
+
+        with self.lock:
+            self._drop(path)
+            self.entries[path] = (st.st_mtime_ns, st.st_size, macro)
+            self.total_events += macro.resident_events
+            while self.total_events > self.max_events and len(self.entries) > 1:
+                self._drop(next(iter(self.entries)))
+        return macro
+
+    def invalidate(self, path):
+        with self.lock:
+            self._drop(os.path.abspath(path))
+
+    def clear(self):
+        with self.lock:
+            for path in list(self.entries):
+                self._drop(path)
+
+    def _drop(self, path):
+        # a dropped mapped macro lets go of its file, see MEMORY MAPPED MACROS
+        entry = self.entries.pop(path, None)
+        if entry:
+            self.total_events -= entry[2].resident_events
+            entry[2].close()
+
+def open_macro(path, progress=None):
+    if is_binary_macro(path) and count_events(path) >= MAPPED_MIN_EVENTS:
+        return MappedMacro(path)
+    return CompiledMacro(read_macro_file(path, progress), path)
+
+macro_cache = MacroCache()
+
+registry.counter_func("tinytask_macro_cache_hits_total", "Macro loads served from the compiled cache.",
+                      lambda: macro_cache.hits)
+registry.counter_func("tinytask_macro_cache_misses_total", "Macro loads that had to read and decode the file.",
+                      lambda: macro_cache.misses)
+registry.gauge_func("tinytask_macro_cache_events", "Decoded events held by the compiled macro cache.",
+                    lambda: macro_cache.total_events)
+
+def current_macro():
+    # reuse the last compile while `events` is the same, unchanged buffer
+    macro, events = state.loaded_macro, state.events
+    if macro is None or macro.events is not events or len(macro) != len(events):
+        macro = state.loaded_macro = CompiledMacro(events)
+    return macro
+
+def retain_macro(macro):
+    # a mapped macro closed since it was looked up (evicted, or its file was
+    # replaced) is opened again from disk; release() it when done
+    while not macro.retain():
+        macro = macro_cache.get(macro.path)
+    return macro
+
+def warm_macro_cache(files):
+    for file in files:
+        try:
+            macro_cache.get(file).index()
+        except (OSError, ValueError) as e:
+            print(f"⚠ Could not pre-load {file}: {e}")
+
+def load_macro(file, progress=None):
+    state.loaded_macro = macro_cache.get(file, progress)
+    state.events = state.loaded_macro.events
+    print("📂 Loaded macro:", file)
@@ -0,0 +1,311 @@
+import argparse
+import json
+import os
+import random
+import time
+
+from .backends import BACKENDS
+from .filters import MOVE_FILTER_MODES
+
+############################################
+# COMMAND LINE
+############################################
+
+# python -m tinytask play|record|recover|convert|info|library
+# Only the modules a command needs are imported, and pynput is only loaded
+# once a command actually touches the mouse or keyboard, so `info` and
+# `convert` start without any input backend installed.
+
+def build_transform(args):
+    from .transforms import Transform, parse_ints, parse_size
+
+    transform = Transform()
+    if args.only:
+        transform.only(kind.strip() for kind in args.only.split(","))
+    if args.map_screen:
+        src, sep, dst = args.map_screen.partition(":")
+        if not sep:
+            raise ValueError(f"invalid --map-screen {args.map_screen!r}, expected e.g. 1920x1080:2560x1440")
+        transform.map_screen(parse_size(src), parse_size(dst))
+    if args.offset:
+        transform.offset(*parse_ints(args.offset, 2, "offset"))
+    if args.clip:
+        transform.clip(*parse_ints(args.clip, 4, "clip region"))
+    if args.time_scale is not None:
+        transform.time_scale(args.time_scale)
+    if args.jitter:
+        # each pass draws its own noise from the seed, so the sink check can
+        # rebuild exactly what was played; printed so a run can be repeated
+        seed = args.seed
+        if seed is None:
+            seed = random.randrange(2**32)
+            print(f"🎲 Jitter seed {seed}")
+        px, _, ms = args.jitter.partition(",")
+        transform.jitter(*parse_ints(px + "," + (ms or "0"), 2, "jitter"), seed=seed)
+    return transform or None
+
+def cmd_play(args):
+    from .backends import RecordingSink, allow_headless_pynput, print_sink_report
+
+    if args.backend == "sink":
+        allow_headless_pynput()
+    from .cache import macro_cache
+    from .index import parse_position
+    from .playback import resolve_segment, start_playback, stop_playback
+    from .tracing import PlaybackTrace
+
+    try:
+        macro = macro_cache.get(args.file)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"❌ Cannot play {args.file}: {e}")
+        return 1
+
+    options = {}
+    if args.speed is not None:
+        options["speed"] = args.speed
+    if args.max_idle is not None:
+        options["max_idle_ms"] = args.max_idle
+    if args.loops is not None:
+        options["loops"] = args.loops
+    if args.start:
+        options["start"] = parse_position(args.start)
+    if args.end:
+        options["end"] = parse_position(args.end)
+    try:
+        transform = build_transform(args)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    if transform is not None:
+        options["transform"] = transform
+    sink = None
+    if args.backend == "sink":
+        sink = options["backend"] = RecordingSink()
+    elif args.backend:
+        options["backend"] = args.backend
+    trace = None
+    if args.trace:
+        trace = options["trace"] = PlaybackTrace()
+
+    job = start_playback(macro, **options)
+    if job is None:
+        return 1
+    try:
+        while not job.wait(0.1):
+            pass
+    except KeyboardInterrupt:
+        stop_playback()
+        job.wait()
+
+    if trace is not None and trace.start_ns is not None:
+        trace.write_chrome(args.trace)
+        print("🔬 Trace written:", args.trace)
+    if sink is not None:
+        lo, hi = resolve_segment(macro, options.get("start"), options.get("end"))
+        expected = macro.ops[lo:hi]
+        base = expected[0][0]
+        loops = job.options["loops"]
+        if transform is not None:
+            # every pass was jittered differently, so compare against all of them
+            per_pass = len(list(transform(expected, base))) or 1
+            passes = loops or -(-len(sink.emitted) // per_pass)
+            expected = transform.timeline(expected, base, passes)
+            loops = 1 if loops else 0
+        report = sink.compare(expected, job.options["speed"], loops, base)
+        print_sink_report(report)
+        if report["mismatches"] or report["emitted"] != report["expected"]:
+            return 1
+    return 0 if job.status == "done" else 1
+
+def cmd_record(args):
+    from .filters import record_filter
+    from .macrofile import write_macro_file
+    from .recorder import discard_journal, start_recording, stop_recording
+
+    if args.filter:
+        record_filter["mode"] = args.filter
+
+    start_recording()
+    print("🎙️ Recording" + (f" for {args.duration:g} s" if args.duration else "") + ", Ctrl+C to stop")
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    job = stop_recording()
+    if job is None or not job.wait() or job.status != "done":
+        return 1
+
+    # the loaded recording itself, not whatever state.events holds by now
+    _, events = job.result
+    write_macro_file(args.file, events)
+    discard_journal()
+    print("💾 Saved macro:", args.file)
+    return 0
+
+def cmd_recover(args):
+    from .config import DOWNLOAD_DIR
+    from .journal import recover_journals
+
+    recovered = recover_journals(args.output or DOWNLOAD_DIR)
+    print(f"🩹 {len(recovered)} recording(s) recovered")
+    return 0
+
+def cmd_convert(args):
+    from .macrofile import convert_macro, convert_macro_dir
+
+    try:
+        if os.path.isdir(args.path):
+            converted = convert_macro_dir(args.path)
+            print(f"🔁 {converted} recording(s) converted")
+        else:
+            count = convert_macro(args.path, args.output)
+            print(f"🔁 Converted {args.path} ({count} events)")
+    except (OSError, ValueError) as e:
+        print(f"❌ Conversion failed: {e}")
+        return 1
+    return 0
+
+def macro_info(file):
+    from .library import macro_stats
+
+    info = {"file": os.path.abspath(file)}
+    info.update(macro_stats(file))
+    return info
+
+def cmd_info(args):
+    from .index import format_position
+
+    try:
+        info = macro_info(args.file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot read {args.file}: {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps(info, indent=2))
+    else:
+        print(f"📄 {info['file']}")
+        print(f"   format   {info['format']}, {info['size_bytes']} bytes")
+        print(f"   events   {info['events']} ({info['moves']} moves, {info['presses']} presses, "
+              f"{info['releases']} releases, {info['keys']} keys)")
+        print(f"   duration {info['duration_s']:.3f} s")
+        if info["min_x"] is not None:
+            print(f"   area     ({info['min_x']}, {info['min_y']}) - ({info['max_x']}, {info['max_y']})")
+        print(f"   sha256   {info['sha256']}")
+        for name, seconds in info["markers"].items():
+            print(f"   marker   {format_position(round(seconds * 1e9))}  {name}")
+    return 0
+
+def cmd_library(args):
+    import sqlite3
+    from .config import DOWNLOAD_DIR, ensure_download_dir
+    from .index import format_position
+    from .library import macro_library
+
+    try:
+        if not args.no_scan:
+            ensure_download_dir()
+            macro_library.scan(DOWNLOAD_DIR)
+        entries = macro_library.query(args.search, args.sort, args.limit)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"❌ Library unavailable: {e}")
+        return 1
+
+    if args.json:
+        print(json.dumps(entries, indent=2))
+        return 0
+    for entry in entries:
+        if entry["error"]:
+            print(f"⚠ {entry['name']}: {entry['error']}")
+            continue
+        last = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_run"])) if entry["last_run"] else "never"
+        print(f"{entry['name']:<40} {format_position(round((entry['duration_s'] or 0) * 1e9)):>12} "
+              f"{entry['events'] or 0:>10,} events {entry['runs']:>5} runs  last {last}")
+    print(f"📚 {len(entries)} macro(s)")
+    return 0
+
+def cmd_bench(args):
+    from . import bench
+
+    sizes = [bench.parse_size(size) for size in args.sizes.split(",")]
+    scenarios = args.scenario or tuple(bench.GENERATORS)
+    return bench.main(sizes, scenarios, args.output, args.baseline, args.save_baseline,
+                      args.threshold, args.playback_max, args.repeat)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tinytask", description="Record and replay mouse and keyboard macros.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    play = commands.add_parser("play", help="play a .macro file")
+    play.add_argument("file")
+    play.add_argument("--speed", type=float, help="playback speed multiplier")
+    play.add_argument("--max-idle", type=int, metavar="MS", help="clamp idle gaps to MS milliseconds")
+    play.add_argument("--loops", type=int, help="number of passes, 0 = until stopped")
+    play.add_argument("--backend", choices=tuple(BACKENDS),
+                      help="input backend; sink replays into memory and reports ordering and timing error")
+    play.add_argument("--start", metavar="POS", help="start at a time (95.5, 1:35.5, 1:01:35) or a marker name")
+    play.add_argument("--end", metavar="POS", help="stop before this time or marker")
+    play.add_argument("--trace", metavar="FILE", help="write a Chrome/Perfetto trace of the replay to FILE")
+    play.add_argument("--only", metavar="KINDS", help="only replay these events: moves,clicks,keys")
+    play.add_argument("--map-screen", metavar="FROM:TO", help="rescale coordinates, e.g. 1920x1080:2560x1440")
+    play.add_argument("--offset", metavar="DX,DY", help="shift every mouse event by DX,DY pixels")
+    play.add_argument("--clip", metavar="X0,Y0,X1,Y1", help="keep the mouse inside this region")
+    play.add_argument("--time-scale", type=float, metavar="F", help="stretch the timeline by F (0.5 = twice as fast)")
+    play.add_argument("--jitter", metavar="PX[,MS]", help="random move offsets of up to PX pixels and MS ms timing noise")
+    play.add_argument("--seed", type=int, help="seed for --jitter, to repeat a run's jitter; every loop gets its own (default: random, printed)")
+    play.set_defaults(func=cmd_play)
+
+    record = commands.add_parser("record", help="record into a .macro file")
+    record.add_argument("file")
+    record.add_argument("--duration", type=float, metavar="SECONDS", help="stop after SECONDS (default: Ctrl+C)")
+    record.add_argument("--filter", choices=MOVE_FILTER_MODES, help="mouse move filter")
+    record.set_defaults(func=cmd_record)
+
+    recover = commands.add_parser("recover", help="turn journals of interrupted recordings into .macro files")
+    recover.add_argument("-o", "--output", metavar="FOLDER", help="write recovered macros here (default: the download folder)")
+    recover.set_defaults(func=cmd_recover)
+
+    convert = commands.add_parser("convert", help="convert JSON recordings to the binary format")
+    convert.add_argument("path", help="a .macro file or a folder of them")
+    convert.add_argument("-o", "--output", help="write a single converted file here instead of in place")
+    convert.set_defaults(func=cmd_convert)
+
+    info = commands.add_parser("info", help="show what a .macro file contains")
+    info.add_argument("file")
+    info.add_argument("--json", action="store_true", help="print machine readable JSON")
+    info.set_defaults(func=cmd_info)
+
+    library = commands.add_parser("library", help="list and search the indexed macros in the download folder")
+    library.add_argument("--search", metavar="TEXT", help="only macros whose name contains TEXT")
+    library.add_argument("--sort", default="name", choices=("name", "duration", "events", "size", "runs", "last_run"))
+    library.add_argument("--limit", type=int, help="show at most this many")
+    library.add_argument("--no-scan", action="store_true", help="do not pick up changed files first")
+    library.add_argument("--json", action="store_true", help="print machine readable JSON")
+    library.set_defaults(func=cmd_library)
+
+    bench = commands.add_parser("bench", help="benchmark recording, storage and replay on synthetic macros")
+    bench.add_argument("--sizes", default="1k,10k,100k", help="comma separated event counts, e.g. 1k,100k,10m")
+    bench.add_argument("--scenario", action="append", choices=("dense_mouse", "typing", "idle_gaps"),
+                       help="generator to run, repeatable (default: all)")
+    bench.add_argument("-o", "--output", help="write results as JSON")
+    bench.add_argument("--baseline", help="compare against a results JSON, exit 1 on regressions")
+    bench.add_argument("--save-baseline", metavar="FILE", help="also write the results as a new baseline")
+    bench.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before a regression (0.2 = 20%%)")
+    bench.add_argument("--playback-max", type=int, default=20_000, metavar="EVENTS",
+                       help="largest size that is also replayed into the sink")
+    bench.add_argument("--repeat", type=int, default=5, metavar="N",
+                       help="runs per measurement, the best (or median) is kept; replays run at most 3 times")
+    bench.set_defaults(func=cmd_bench)
+
+    return parser
+
+def main(argv=None):
+    from .metrics import start_metrics_from_env
+
+    args = build_parser().parse_args(argv)
+    start_metrics_from_env()
+    return args.func(args)
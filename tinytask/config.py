@@ -0,0 +1,14 @@
+import os
+
+############################################
+# PATHS
+############################################
+
+DOWNLOAD_DIR = os.path.join(os.path.expanduser("~"), "Downloads", "mouse_click")
+SHORTCUT_FILE = os.path.join(DOWNLOAD_DIR, "shortcuts.json")
+JOURNAL_DIR = os.path.join(DOWNLOAD_DIR, "journal")
+LIBRARY_FILE = os.path.join(DOWNLOAD_DIR, "library.sqlite3")
+
+def ensure_download_dir():
+    if not os.path.exists(DOWNLOAD_DIR):
+        os.makedirs(DOWNLOAD_DIR)
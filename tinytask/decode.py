@@ -0,0 +1,93 @@
+import ast
+
+from .events import MacroFormatError, REC_MOVE, REC_PRESS, REC_KEY
+
+############################################
+# EVENT DECODING
+############################################
+
+# Stored events are decoded once at load time into (offset_ns, op, x, y,
+# target) tuples with pynput objects already resolved.  The replay loop only
+# indexes DISPATCH by op code, so it never parses, evals or catches anything.
+# Anything that cannot be replayed is rejected here with MacroFormatError.
+
+OP_MOVE = 0
+OP_PRESS = 1
+OP_RELEASE = 2
+OP_KEY = 3
+OP_TYPE = 4
+
+def resolve_button(name):
+    from pynput.mouse import Button
+
+    if not isinstance(name, str) or not name.startswith("Button."):
+        raise MacroFormatError(f"unknown mouse button {name!r}")
+    try:
+        return Button[name[len("Button."):]]
+    except KeyError:
+        raise MacroFormatError(f"unknown mouse button {name!r}") from None
+
+def resolve_key(name):
+    # str(key) gives "Key.enter" for special keys, "'a'" for characters and
+    # "<65>" for bare virtual key codes
+    from pynput.keyboard import Key, KeyCode
+
+    if not isinstance(name, str) or not name:
+        raise MacroFormatError(f"invalid key {name!r}")
+
+    if name.startswith("Key."):
+        try:
+            return OP_KEY, Key[name[len("Key."):]]
+        except KeyError:
+            raise MacroFormatError(f"unknown key {name!r}") from None
+
+    if name.startswith("<") and name.endswith(">") and name[1:-1].isdigit():
+        return OP_KEY, KeyCode.from_vk(int(name[1:-1]))
+
+    try:
+        char = ast.literal_eval(name)
+    except (ValueError, SyntaxError):
+        raise MacroFormatError(f"invalid key {name!r}") from None
+    if not isinstance(char, str) or not char:
+        raise MacroFormatError(f"invalid key {name!r}")
+    return OP_TYPE, char
+
+def resolve_name(code, name):
+    if code == REC_KEY:
+        return resolve_key(name)
+    return None, resolve_button(name)
+
+def decode_events(buf):
+    if not len(buf):
+        return []
+    return decode_rows(buf, buf.names, buf[0][4], {})
+
+def decode_rows(rows, names, base_ns, resolved, first_index=0):
+    # rows are (code, x, y, sid, t_ns); button/key names are resolved once
+    # per distinct name through `resolved`, which can be shared between calls
+    ops = []
+    for index, (code, x, y, sid, t_ns) in enumerate(rows, first_index):
+        offset_ns = t_ns - base_ns
+
+        if code == REC_MOVE:
+            ops.append((offset_ns, OP_MOVE, x, y, None))
+            continue
+
+        if not REC_PRESS <= code <= REC_KEY or not 0 <= sid < len(names):
+            raise MacroFormatError(f"event {index}: invalid record ({code}, {sid})")
+
+        target = resolved.get((code, sid))
+        if target is None:
+            try:
+                target = resolve_name(code, names[sid])
+            except MacroFormatError as e:
+                raise MacroFormatError(f"event {index}: {e}") from None
+            resolved[(code, sid)] = target
+
+        if code == REC_KEY:
+            op, key = target
+            ops.append((offset_ns, op, None, None, key))
+        else:
+            op = OP_PRESS if code == REC_PRESS else OP_RELEASE
+            ops.append((offset_ns, op, x, y, target[1]))
+    return ops
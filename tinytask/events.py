@@ -0,0 +1,161 @@
+from array import array
+from bisect import bisect_right
+
+############################################
+# EVENT BUFFER
+############################################
+
+# Events are stored column-wise in typed arrays instead of one tuple per
+# event: an i8 action code, i32 x/y, an i16 id into the interned button/key
+# name table and an i64 timestamp in ns.  That is 19 bytes per event.
+# Columns grow in chunks of CHUNK_ROWS so a long recording never has to copy
+# one huge array when it grows.  Named markers are kept beside the columns as
+# name -> t_ns, on the same clock as the events.
+
+class MacroFormatError(ValueError):
+    pass
+
+REC_MOVE = 0
+REC_PRESS = 1
+REC_RELEASE = 2
+REC_KEY = 3
+
+CHUNK_ROWS = 65536
+MAX_STRINGS = 32767
+
+def _new_columns():
+    return (array("b"), array("i"), array("i"), array("h"), array("q"))
+
+class EventBuffer:
+    # rows are (code, x, y, name_id, t_ns); name_id is -1 for mouse moves
+
+    def __init__(self):
+        self.names = []
+        self._ids = {}
+        self._chunks = []
+        self._starts = []
+        self._length = 0
+        self.markers = {}
+
+    def __len__(self):
+        return self._length
+
+    def intern(self, name):
+        sid = self._ids.get(name)
+        if sid is None:
+            sid = len(self.names)
+            if sid > MAX_STRINGS:
+                raise MacroFormatError("too many distinct buttons and keys")
+            self.names.append(name)
+            self._ids[name] = sid
+        return sid
+
+    def add_marker(self, name, t_ns):
+        self.markers[name] = t_ns
+
+    def name(self, sid):
+        return self.names[sid] if sid >= 0 else None
+
+    def _last_chunk(self):
+        if not self._chunks or len(self._chunks[-1][0]) >= CHUNK_ROWS:
+            self._starts.append(self._length)
+            self._chunks.append(_new_columns())
+        return self._chunks[-1]
+
+    def append(self, code, x, y, sid, t_ns):
+        codes, xs, ys, sids, times = self._last_chunk()
+        codes.append(code)
+        xs.append(x)
+        ys.append(y)
+        sids.append(sid)
+        times.append(t_ns)
+        self._length += 1
+
+    def append_columns(self, codes, xs, ys, sids, times):
+        # adopt whole column arrays (e.g. a block read from disk) as one chunk
+        if codes:
+            self._starts.append(self._length)
+            self._chunks.append((codes, xs, ys, sids, times))
+            self._length += len(codes)
+
+    def append_event(self, event, index=None):
+        # legacy JSON layout: (action, x, y, button, pressed, t) with key
+        # events keeping the key name in the x slot
+        where = f"event {len(self) if index is None else index}"
+        if not isinstance(event, (list, tuple)) or len(event) != 6:
+            raise MacroFormatError(f"{where}: expected 6 fields, got {event!r}")
+
+        action, x, y, a, b, t = event
+        if not _is_number(t):
+            raise MacroFormatError(f"{where}: invalid timestamp {t!r}")
+        t_ns = round(t * 1e9)
+
+        if action == "key":
+            if not isinstance(x, str) or not x:
+                raise MacroFormatError(f"{where}: invalid key {x!r}")
+            self.append(REC_KEY, 0, 0, self.intern(x), t_ns)
+            return
+
+        if not _is_number(x) or not _is_number(y):
+            raise MacroFormatError(f"{where}: invalid position ({x!r}, {y!r})")
+
+        if action == "move":
+            self.append(REC_MOVE, round(x), round(y), -1, t_ns)
+        elif action == "click":
+            if not isinstance(b, bool):
+                raise MacroFormatError(f"{where}: invalid pressed flag {b!r}")
+            if not isinstance(a, str):
+                raise MacroFormatError(f"{where}: invalid mouse button {a!r}")
+            self.append(REC_PRESS if b else REC_RELEASE, round(x), round(y), self.intern(a), t_ns)
+        else:
+            raise MacroFormatError(f"{where}: unknown action {action!r}")
+
+    @classmethod
+    def from_events(cls, events):
+        buf = cls()
+        for i, event in enumerate(events):
+            buf.append_event(event, i)
+        return buf
+
+    def chunks(self):
+        return iter(self._chunks)
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield from zip(*chunk)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                raise ValueError("EventBuffer slices must be contiguous")
+            return self._slice(start, stop)
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("event index out of range")
+        ci = bisect_right(self._starts, index) - 1
+        i = index - self._starts[ci]
+        return tuple(column[i] for column in self._chunks[ci])
+
+    def _slice(self, start, stop):
+        out = EventBuffer()
+        out.names = list(self.names)
+        out._ids = dict(self._ids)
+        if start >= stop:
+            return out
+        first, last = self[start][4], self[stop - 1][4]
+        out.markers = {name: t for name, t in self.markers.items() if first <= t <= last}
+
+        ci = bisect_right(self._starts, start) - 1
+        while ci < len(self._chunks) and self._starts[ci] < stop:
+            first = self._starts[ci]
+            lo = max(start - first, 0)
+            hi = min(stop - first, len(self._chunks[ci][0]))
+            out.append_columns(*(column[lo:hi] for column in self._chunks[ci]))
+            ci += 1
+        return out
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
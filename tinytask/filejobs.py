@@ -0,0 +1,85 @@
+import threading
+
+############################################
+# FILE JOBS
+############################################
+
+# Saving, loading and converting big macros runs on a worker thread so the
+# window and the hotkeys stay responsive.  The job's function gets a
+# `progress(done, total)` keyword that macrofile calls once per chunk; it
+# raises JobCancelled once cancel() was requested, which unwinds the
+# function at the next chunk (saves leave only a removed temp file behind).
+# Done callbacks run on the worker thread; the window relays them to the Qt
+# thread with a signal.  wait() returns only after they all ran, so whoever
+# waits sees what they did (e.g. the recording a load put into state).
+
+class JobCancelled(Exception):
+    pass
+
+class FileJob:
+    def __init__(self, label, func, *args):
+        self.label = label
+        self.func = func
+        self.args = args
+        self.status = "pending"   # -> running -> done | cancelled | failed
+        self.result = None
+        self.error = None
+        self.done = 0
+        self.total = 0
+        self.cancel_requested = False
+        self.finished = threading.Event()
+        self.callbacks = []       # None once the job finished
+        self.progress_callbacks = []
+        self.lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name="file-job", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self.cancel_requested = True
+
+    def progress(self, done, total):
+        if self.cancel_requested:
+            raise JobCancelled()
+        self.done, self.total = done, total
+        for callback in self.progress_callbacks:
+            callback(self)
+
+    def add_progress_callback(self, callback):
+        self.progress_callbacks.append(callback)
+
+    def add_done_callback(self, callback):
+        with self.lock:
+            if self.callbacks is not None:
+                self.callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def _run(self):
+        self.status = "running"
+        try:
+            self.result = self.func(*self.args, progress=self.progress)
+            status = "done"
+        except JobCancelled:
+            print(f"✖ {self.label} cancelled")
+            status = "cancelled"
+        except Exception as e:
+            self.error = e
+            print(f"❌ {self.label} failed: {e}")
+            status = "failed"
+        self._finish(status)
+
+    def _finish(self, status):
+        with self.lock:
+            self.status = status
+            callbacks, self.callbacks = self.callbacks, None
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"❌ {self.label} callback failed: {e}")
+        self.finished.set()
@@ -0,0 +1,120 @@
+import math
+
+from .events import EventBuffer, REC_MOVE
+
+############################################
+# MOUSE MOVE FILTER
+############################################
+
+# Mice report moves at 125-1000 Hz and every one of them costs a sleep and a
+# cursor write on replay.  When a recording stops, runs of moves between
+# clicks/keys are thinned with one of these modes:
+#   "time"      keep at most one move per interval_ms
+#   "distance"  keep a move once it is distance_px away from the last kept one
+#   "rdp"       Ramer-Douglas-Peucker, drop points within epsilon_px of the path
+# The first and last move of every run are always kept, so the cursor is in
+# the same place around every click and key press.
+
+MOVE_FILTER_MODES = ("none", "time", "distance", "rdp")
+
+record_filter = {
+    "mode": "none",
+    "interval_ms": 10,
+    "distance_px": 3,
+    "epsilon_px": 1.0,
+}
+
+def _keep_by_time(run, keep, interval_ns):
+    last_t = run[0][3]
+    for i, x, y, t in run[1:-1]:
+        if t - last_t >= interval_ns:
+            keep[i] = 1
+            last_t = t
+
+def _keep_by_distance(run, keep, distance_px):
+    limit = distance_px * distance_px
+    _, last_x, last_y, _ = run[0]
+    for i, x, y, t in run[1:-1]:
+        if (x - last_x) ** 2 + (y - last_y) ** 2 >= limit:
+            keep[i] = 1
+            last_x, last_y = x, y
+
+def _keep_by_rdp(run, keep, epsilon_px):
+    stack = [(0, len(run) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+
+        _, x1, y1, _ = run[lo]
+        _, x2, y2, _ = run[hi]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+
+        worst, worst_dist = None, epsilon_px
+        for j in range(lo + 1, hi):
+            _, x, y, _ = run[j]
+            if length:
+                dist = abs(dy * (x - x1) - dx * (y - y1)) / length
+            else:
+                dist = math.hypot(x - x1, y - y1)
+            if dist > worst_dist:
+                worst, worst_dist = j, dist
+
+        if worst is not None:
+            keep[run[worst][0]] = 1
+            stack.append((lo, worst))
+            stack.append((worst, hi))
+
+def filter_moves(buf, mode, interval_ms=10, distance_px=3, epsilon_px=1.0):
+    # returns (filtered buffer, number of moves dropped)
+    if mode == "none":
+        return buf, 0
+    if mode not in MOVE_FILTER_MODES:
+        raise ValueError(f"unknown move filter {mode!r}")
+
+    keep = bytearray(len(buf))
+
+    def close_run(run):
+        keep[run[0][0]] = 1
+        keep[run[-1][0]] = 1
+        if len(run) < 3:
+            return
+        if mode == "time":
+            _keep_by_time(run, keep, interval_ms * 1_000_000)
+        elif mode == "distance":
+            _keep_by_distance(run, keep, distance_px)
+        else:
+            _keep_by_rdp(run, keep, epsilon_px)
+
+    run = []
+    for i, (code, x, y, sid, t_ns) in enumerate(buf):
+        if code == REC_MOVE:
+            run.append((i, x, y, t_ns))
+            continue
+        keep[i] = 1
+        if run:
+            close_run(run)
+            run = []
+    if run:
+        close_run(run)
+
+    out = EventBuffer()
+    out.names = list(buf.names)
+    out._ids = dict(buf._ids)
+    out.markers = dict(buf.markers)
+    for row, kept in zip(buf, keep):
+        if kept:
+            out.append(*row)
+    return out, len(buf) - len(out)
+
+def apply_record_filter(buf):
+    mode = record_filter["mode"]
+    if mode == "none":
+        return buf
+
+    moves = sum(1 for row in buf if row[0] == REC_MOVE)
+    filtered, dropped = filter_moves(buf, mode, record_filter["interval_ms"],
+                                     record_filter["distance_px"], record_filter["epsilon_px"])
+    print(f"🧹 Move filter '{mode}' dropped {dropped} of {moves} moves")
+    return filtered
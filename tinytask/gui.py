@@ -0,0 +1,843 @@
+import os
+import sqlite3
+import sys
+import time
+
+from PyQt5.QtWidgets import *
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QObject, QSortFilterProxyModel, Qt, pyqtSignal
+
+from . import hotkeys, state
+from .cache import load_macro, macro_cache
+from .config import DOWNLOAD_DIR, ensure_download_dir
+from .filejobs import FileJob
+from .filters import record_filter
+from .hotkeys import apply_shortcuts, plan_hotkeys, register_all_hotkeys, register_recording_hotkeys, save_shortcut_config
+from .inputhub import input_hub, print_diagnostics
+from .journal import recover_journals
+from .library import SORT_KEYS, macro_library
+from .macrofile import convert_macro_dir, write_macro_file
+from .mapped import MappedEvents
+from .metrics import start_metrics_from_env
+from .playback import (PLAYBACK_MAX_SPEED, PLAYBACK_MIN_SPEED, PLAYBACK_POLICIES, check_playback_options,
+                       playback_options, start_playback, stop_playback, toggle_pause_playback)
+from .recorder import close_recording, discard_journal, recording_loading, start_recording, stop_recording
+from .scheduler import playback_control
+from .watcher import start_watcher
+
+############################################
+# SAVE & LOAD MACRO
+############################################
+
+class FileJobSignals(QObject):
+    # emitted from the job's worker thread, delivered on the Qt thread
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(object)
+
+def run_file_job(parent, job, on_done=None):
+    # shows a cancellable progress dialog if the job takes a while;
+    # on_done(job) runs on the Qt thread once the job succeeded
+    signals = FileJobSignals(parent)
+    dialog = QProgressDialog(job.label + "...", "Cancel", 0, 0, parent)
+    dialog.setMinimumDuration(300)
+    dialog.setAutoReset(False)
+    dialog.canceled.connect(job.cancel)
+
+    def on_progress(permille):
+        dialog.setMaximum(1000)
+        dialog.setValue(permille)
+
+    def on_finished(job):
+        dialog.canceled.disconnect(job.cancel)
+        dialog.close()
+        dialog.deleteLater()
+        signals.deleteLater()
+        if job.status == "failed":
+            QMessageBox.warning(parent, "Error", f"{job.label} failed:\n{job.error}")
+        elif job.status == "done" and on_done is not None:
+            on_done(job)
+
+    signals.progress.connect(on_progress)
+    signals.finished.connect(on_finished)
+    job.add_progress_callback(lambda job: signals.progress.emit(job.done * 1000 // job.total if job.total else 0))
+    job.add_done_callback(signals.finished.emit)
+    return job.start()
+
+def save_macro(parent):
+    if recording_loading():
+        QMessageBox.information(parent, "Please wait", "The recording is still being loaded.")
+        return
+    if not state.events:
+        QMessageBox.warning(parent, "Warning", "Nothing to save!")
+        return
+
+    file, _ = QFileDialog.getSaveFileName(parent, "Save Recording", DOWNLOAD_DIR, "Macro Files (*.macro)")
+    if not file:
+        return
+
+    events = state.events
+    if isinstance(events, MappedEvents) and os.path.abspath(events.path) == os.path.abspath(file):
+        # a mapped macro is read-only, so it is already saved there
+        print("💾 Already saved:", file)
+        return
+    # a cached (mapped) copy of the file being replaced has to let go of it
+    macro_cache.invalidate(file)
+
+    def saved(job):
+        # unless another recording has replaced it in the meantime
+        if state.events is events:
+            discard_journal(file)
+        print("💾 Saved macro:", file)
+
+    run_file_job(parent, FileJob("Saving", write_macro_file, file, events), saved)
+
+############################################
+# SHORTCUT MANAGER UI
+############################################
+
+class ShortcutModel(QAbstractTableModel):
+    # the manager's working copy of the shortcut list; the view only asks
+    # for the rows it shows, and nothing is applied until Save Changes
+    COLUMNS = ("Shortcut", "Recording", "Last run")
+
+    def __init__(self, entries, last_runs, parent=None):
+        super().__init__(parent)
+        self.entries = list(entries)
+        self.last_runs = last_runs   # macro path -> time of its last playback
+        self.dirty = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        flags = super().flags(index)
+        return flags | Qt.ItemIsEditable if index.column() < 2 else flags
+
+    def last_run(self, entry):
+        return self.last_runs.get(os.path.abspath(os.path.join(DOWNLOAD_DIR, entry["file"])))
+
+    def data(self, index, role=Qt.DisplayRole):
+        entry = self.entries[index.row()]
+        if index.column() == 2:
+            last = self.last_run(entry)
+            if role == Qt.DisplayRole and last:
+                return time.strftime("%Y-%m-%d %H:%M", time.localtime(last))
+            return None
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return entry["shortcut" if index.column() == 0 else "file"]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # one key per row and a plain list sort, instead of a data() round
+        # trip for every comparison; column -1 keeps the current order
+        if column < 0:
+            return
+        if column == 2:
+            key = lambda row: self.last_run(self.entries[row]) or 0.0
+        else:
+            field = "shortcut" if column == 0 else "file"
+            key = lambda row: self.entries[row][field].lower()
+        self.layoutAboutToBeChanged.emit()
+        rows = sorted(range(len(self.entries)), key=key, reverse=order == Qt.DescendingOrder)
+        moved = [0] * len(rows)
+        for new, row in enumerate(rows):
+            moved[row] = new
+        self.entries = [self.entries[row] for row in rows]
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(persistent, [self.index(moved[index.row()], index.column())
+                                                    for index in persistent])
+        self.layoutChanged.emit()
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or index.column() >= 2:
+            return False
+        entry = dict(self.entries[index.row()])
+        entry["shortcut" if index.column() == 0 else "file"] = value.strip()
+        self.entries[index.row()] = entry
+        self.dirty = True
+        self.dataChanged.emit(index, index.siblingAtColumn(2))
+        return True
+
+    def append_entry(self, entry):
+        row = len(self.entries)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.entries.append(entry)
+        self.endInsertRows()
+        self.dirty = True
+
+    def remove_rows(self, rows):
+        # one signal per run of adjacent rows, bottom up so rows stay valid
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            first = last = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.entries[first:last + 1]
+            self.endRemoveRows()
+            self.dirty = True
+
+class ShortcutFilter(QSortFilterProxyModel):
+    # filters on the entries directly and leaves sorting to ShortcutModel
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.text = ""
+
+    def set_text(self, text):
+        self.text = text.strip().lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        if not self.text:
+            return True
+        entry = self.sourceModel().entries[row]
+        return self.text in entry["shortcut"].lower() or self.text in entry["file"].lower()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+class ShortcutManager(QDialog):
+    def __init__(self):
+        super().__init__()
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Dialog)
+        self.activateWindow()
+        self.raise_()
+        self.setWindowTitle("Manage Shortcuts")
+        self.resize(620, 420)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        try:
+            last_runs = macro_library.last_runs()
+        except sqlite3.Error:
+            last_runs = {}
+        self.model = ShortcutModel(hotkeys.global_shortcuts, last_runs, self)
+        self.proxy = ShortcutFilter(self)
+        self.proxy.setSourceModel(self.model)
+
+        # Filter
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Filter by shortcut or recording...")
+        self.search.textChanged.connect(self.proxy.set_text)
+        layout.addWidget(self.search)
+
+        # Table; fixed row heights so only the visible rows are ever measured
+        self.table = QTableView()
+        self.table.setModel(self.proxy)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(1, 280)
+        self.table.setSortingEnabled(True)
+        layout.addWidget(self.table)
+
+        self.status = QLabel()
+        layout.addWidget(self.status)
+        # the model's own row signals come last, once both counts are settled
+        for signal in (self.proxy.rowsInserted, self.proxy.rowsRemoved, self.proxy.layoutChanged,
+                       self.model.rowsInserted, self.model.rowsRemoved):
+            signal.connect(self.update_status)
+        self.update_status()
+
+        # Buttons
+        btn_row = QHBoxLayout()
+        btn_add = QPushButton("Add Shortcut")
+        btn_delete = QPushButton("Delete Selected")
+        btn_save = QPushButton("Save Changes")
+
+        btn_add.clicked.connect(self.add_shortcut)
+        btn_delete.clicked.connect(self.delete_shortcut)
+        btn_save.clicked.connect(self.save_changes)
+
+        btn_row.addWidget(btn_add)
+        btn_row.addWidget(btn_delete)
+        btn_row.addWidget(btn_save)
+
+        layout.addLayout(btn_row)
+
+    def update_status(self):
+        shown, total = self.proxy.rowCount(), self.model.rowCount()
+        self.status.setText(f"{total} shortcut(s)" if shown == total else f"Showing {shown} of {total} shortcut(s)")
+
+    def add_shortcut(self):
+        dlg = AddShortcutDialog(self.model)
+        dlg.show()
+        dlg.activateWindow()
+        dlg.raise_()
+        dlg.exec_()
+
+
+    def delete_shortcut(self):
+        rows = [self.proxy.mapToSource(index).row() for index in self.table.selectionModel().selectedRows()]
+        self.model.remove_rows(rows)
+
+    def save_changes(self):
+        new_list = list(self.model.entries)
+
+        # only what changed is re-registered; nothing is if the list is invalid
+        try:
+            apply_shortcuts(new_list)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", f"Shortcuts not saved:\n{e}")
+            return
+        hotkeys.global_shortcuts = new_list
+        self.model.dirty = False
+
+        save_shortcut_config()
+
+        QMessageBox.information(self, "Saved", "Shortcuts updated!")
+
+    def reject(self):
+        # Esc and the close button (through QDialog.closeEvent) both end up here
+        if self.model.dirty and QMessageBox.question(
+                self, "Unsaved Changes", "Discard the changes to your shortcuts?") != QMessageBox.Yes:
+            return
+        super().reject()
+
+
+############################################
+# DIALOG TO ADD A SHORTCUT
+############################################
+class AddShortcutDialog(QDialog):
+    # with a ShortcutModel the new shortcut is only added to it, and the
+    # manager applies it together with its other changes
+    def __init__(self, model=None):
+        super().__init__()
+        self.model = model
+
+        self.setWindowTitle("Add Shortcut")
+        self.setFixedSize(420, 230)
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Dialog)
+        self.setModal(True)
+        self.activateWindow()
+        self.raise_()
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(20, 15, 20, 15)
+        layout.setSpacing(12)
+        self.setLayout(layout)
+
+        title = QLabel("Create New Shortcut")
+        title.setStyleSheet("font-size: 16px; font-weight: bold; margin-bottom: 5px;")
+        layout.addWidget(title)
+
+        layout.addSpacing(5)
+
+        # ---------- Shortcut capture field ----------
+        shortcut_label = QLabel("Press keys for shortcut:")
+        shortcut_label.setStyleSheet("font-size: 13px;")
+        layout.addWidget(shortcut_label)
+
+        self.keybox = QLineEdit()
+        self.keybox.setPlaceholderText("Click here and press shortcut keys...")
+        self.keybox.setReadOnly(True)
+        self.keybox.setFixedHeight(32)
+        self.keybox.setStyleSheet("""
+            QLineEdit {
+                font-size: 14px;
+                padding-left: 8px;
+                border: 1px solid #999;
+                border-radius: 6px;
+            }
+        """)
+        layout.addWidget(self.keybox)
+        self.keybox.installEventFilter(self)
+
+        # ---------- File selection ----------
+        file_label = QLabel("Select macro file:")
+        file_label.setStyleSheet("font-size: 13px; margin-top: 8px;")
+        layout.addWidget(file_label)
+
+        file_row = QHBoxLayout()
+        self.file_display = QLineEdit()
+        self.file_display.setReadOnly(True)
+        self.file_display.setFixedHeight(32)
+        self.file_display.setStyleSheet("""
+            QLineEdit {
+                font-size: 13px;
+                padding-left: 8px;
+                border: 1px solid #999;
+                border-radius: 6px;
+            }
+        """)
+
+        btn_choose = QPushButton("Browse")
+        btn_choose.setFixedHeight(32)
+        btn_choose.setStyleSheet("""
+            QPushButton {
+                background-color: #0078D7;
+                color: white;
+                font-size: 13px;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background-color: #005EA6;
+            }
+        """)
+        btn_choose.clicked.connect(self.select_file)
+
+        btn_library = QPushButton("Library")
+        btn_library.setFixedHeight(32)
+        btn_library.clicked.connect(self.select_from_library)
+
+        file_row.addWidget(self.file_display)
+        file_row.addWidget(btn_choose)
+        file_row.addWidget(btn_library)
+        layout.addLayout(file_row)
+
+        # ---------- Save button ----------
+        btn_save = QPushButton("Save Shortcut")
+        btn_save.setFixedHeight(36)
+        btn_save.setStyleSheet("""
+            QPushButton {
+                background-color: #28A745;
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background-color: #218838;
+            }
+        """)
+        btn_save.clicked.connect(self.save)
+        layout.addWidget(btn_save)
+
+        self.selected_file = None
+
+
+    ############################################
+    # Capture Shortcut Logic
+    ############################################
+    def eventFilter(self, obj, event):
+        if obj == self.keybox and event.type() == event.KeyPress:
+            key = event.key()
+            mod = QApplication.keyboardModifiers()
+
+            parts = []
+            if mod & Qt.ControlModifier:
+                parts.append("ctrl")
+            if mod & Qt.AltModifier:
+                parts.append("alt")
+            if mod & Qt.ShiftModifier:
+                parts.append("shift")
+
+            key_text = event.text().lower()
+            if key_text:
+                parts.append(key_text)
+
+            final = "+".join(parts)
+            self.keybox.setText(final)
+            return True
+
+        return False
+
+
+    ############################################
+    # File Picker
+    ############################################
+    def select_file(self):
+        file, _ = QFileDialog.getOpenFileName(self, "Select .macro file",
+                                              DOWNLOAD_DIR,
+                                              "Macro Files (*.macro)")
+        if file:
+            self.selected_file = os.path.basename(file)
+            self.file_display.setText(self.selected_file)
+
+
+    def select_from_library(self):
+        dlg = LibraryDialog(self, select=True)
+        if dlg.exec_() and dlg.selected_file:
+            self.selected_file = dlg.selected_file
+            self.file_display.setText(self.selected_file)
+
+
+    ############################################
+    # Save Validation
+    ############################################
+    def save(self):
+        shortcut = self.keybox.text().strip()
+        file = self.selected_file
+
+        if not shortcut or shortcut.endswith("+"):
+            QMessageBox.warning(self, "Error", "Please press a complete shortcut (e.g. ctrl+alt+1).")
+            return
+
+        if not file:
+            QMessageBox.warning(self, "Error", "Please select a macro file.")
+            return
+
+        entry = {"shortcut": shortcut, "file": file}
+        if self.model is not None:
+            _, problems = plan_hotkeys(self.model.entries + [entry])
+            if problems:
+                QMessageBox.warning(self, "Error", "\n".join(problems))
+                return
+            self.model.append_entry(entry)
+            self.close()
+            return
+
+        new_list = hotkeys.global_shortcuts + [entry]
+
+        try:
+            apply_shortcuts(new_list)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+        hotkeys.global_shortcuts = new_list
+
+        save_shortcut_config()
+        self.close()
+
+
+############################################
+# DIALOG FOR PLAYBACK SETTINGS
+############################################
+class PlaybackOptionsDialog(QDialog):
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowTitle("Playback Settings")
+        self.setFixedSize(320, 260)
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Dialog)
+        self.setModal(True)
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        form = QFormLayout()
+        layout.addLayout(form)
+
+        self.speed = QDoubleSpinBox()
+        self.speed.setRange(PLAYBACK_MIN_SPEED, PLAYBACK_MAX_SPEED)
+        self.speed.setSingleStep(0.25)
+        self.speed.setSuffix(" x")
+        self.speed.setValue(playback_options["speed"])
+        form.addRow("Speed:", self.speed)
+
+        self.max_idle = QSpinBox()
+        self.max_idle.setRange(0, 3_600_000)
+        self.max_idle.setSingleStep(100)
+        self.max_idle.setSuffix(" ms")
+        self.max_idle.setSpecialValueText("Off")
+        self.max_idle.setValue(playback_options["max_idle_ms"])
+        form.addRow("Max idle gap:", self.max_idle)
+
+        self.loops = QSpinBox()
+        self.loops.setRange(0, 1_000_000)
+        self.loops.setSpecialValueText("Until stopped")
+        self.loops.setValue(playback_options["loops"])
+        form.addRow("Loops:", self.loops)
+
+        self.policy = QComboBox()
+        for policy, label in (("queue", "Queue after current"), ("replace", "Replace current"),
+                              ("reject", "Ignore while busy")):
+            self.policy.addItem(label, policy)
+        self.policy.setCurrentIndex(PLAYBACK_POLICIES.index(playback_options["policy"]))
+        form.addRow("While playing:", self.policy)
+
+        self.backend = QComboBox()
+        for backend, label in (("pynput", "pynput"), ("xtest", "XTest (X11, python-xlib)")):
+            self.backend.addItem(label, backend)
+        self.backend.setCurrentIndex(max(0, self.backend.findData(playback_options["backend"])))
+        form.addRow("Input backend:", self.backend)
+
+        btn_save = QPushButton("Save")
+        btn_save.clicked.connect(self.save)
+        layout.addWidget(btn_save)
+
+    def save(self):
+        speed, max_idle, loops = self.speed.value(), self.max_idle.value(), self.loops.value()
+        try:
+            check_playback_options(speed, max_idle, loops)
+        except ValueError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
+
+        playback_options.update(speed=speed, max_idle_ms=max_idle, loops=loops,
+                                policy=self.policy.currentData(), backend=self.backend.currentData())
+        self.close()
+
+
+############################################
+# MACRO LIBRARY UI
+############################################
+
+LIBRARY_ROWS = 1000
+
+class LibraryDialog(QDialog):
+    # lists what the library index knows, so nothing is read from the macro
+    # files; with select=True double-click picks a macro instead of loading it
+    def __init__(self, parent=None, select=False):
+        super().__init__(parent)
+        self.setWindowFlags(Qt.WindowStaysOnTopHint | Qt.Dialog)
+        self.setWindowTitle("Select Macro" if select else "Macro Library")
+        self.resize(760, 420)
+        self.select = select
+        self.selected_file = None
+        self.entries = []
+
+        layout = QVBoxLayout()
+        self.setLayout(layout)
+
+        top = QHBoxLayout()
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search by name...")
+        self.search.textChanged.connect(self.refresh)
+        top.addWidget(self.search)
+        self.sort = QComboBox()
+        self.sort.addItems(list(SORT_KEYS))
+        self.sort.currentIndexChanged.connect(self.refresh)
+        top.addWidget(QLabel("Sort by"))
+        top.addWidget(self.sort)
+        layout.addLayout(top)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["Macro", "Duration", "Events", "Size", "Runs", "Last run"])
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        self.table.cellDoubleClicked.connect(self.open_row)
+        layout.addWidget(self.table)
+
+        bottom = QHBoxLayout()
+        self.status = QLabel()
+        bottom.addWidget(self.status)
+        btn_rescan = QPushButton("Rescan")
+        btn_rescan.clicked.connect(self.rescan)
+        bottom.addWidget(btn_rescan)
+        layout.addLayout(bottom)
+
+        self.refresh()
+
+    def refresh(self):
+        search = self.search.text().strip()
+        try:
+            self.entries = macro_library.query(search, self.sort.currentText(), LIBRARY_ROWS)
+            total = macro_library.count(search)
+        except sqlite3.Error as e:
+            self.entries, total = [], 0
+            self.status.setText(f"Library unavailable: {e}")
+        else:
+            self.status.setText(f"Showing {len(self.entries)} of {total} macro(s)")
+
+        self.table.setRowCount(len(self.entries))
+        for row, entry in enumerate(self.entries):
+            if entry["error"]:
+                cells = [entry["name"], "unreadable", "", "", "", entry["error"]]
+            else:
+                last = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_run"])) if entry["last_run"] else ""
+                if last and entry["last_status"] != "done":
+                    last += f" ({entry['last_status']})"
+                cells = [entry["name"], f"{entry['duration_s']:.1f} s", f"{entry['events']:,}",
+                         f"{entry['size_bytes'] / 1024:,.0f} KB", str(entry["runs"]), last]
+            for column, text in enumerate(cells):
+                self.table.setItem(row, column, QTableWidgetItem(text))
+        self.table.resizeColumnToContents(0)
+
+    def rescan(self):
+        run_file_job(self, FileJob("Indexing library", macro_library.scan, DOWNLOAD_DIR), lambda job: self.refresh())
+
+    def open_row(self, row, column):
+        entry = self.entries[row]
+        if self.select:
+            self.selected_file = entry["name"]
+            self.accept()
+        else:
+            run_file_job(self, FileJob("Loading", load_macro, entry["path"]))
+
+############################################
+# MAIN UI
+############################################
+
+class TinyTaskApp(QMainWindow):
+    def __init__(self):
+        super().__init__()
+
+        self.setWindowTitle("TinyTask Dynamic")
+        self.setFixedSize(540, 220)
+        self.setWindowFlags(Qt.Tool | Qt.WindowStaysOnTopHint)
+
+
+        menubar = self.menuBar()
+
+        # File Menu
+        file_menu = menubar.addMenu("File")
+
+        save_action = QAction("Save Recording", self)
+        save_action.triggered.connect(lambda: save_macro(self))
+        file_menu.addAction(save_action)
+
+        load_action = QAction("Load Recording", self)
+        load_action.triggered.connect(lambda: self.load_macro_dialog())
+        file_menu.addAction(load_action)
+
+        library_action = QAction("Macro Library...", self)
+        library_action.triggered.connect(self.open_library)
+        file_menu.addAction(library_action)
+
+        convert_action = QAction("Convert Old Recordings", self)
+        convert_action.triggered.connect(self.convert_recordings)
+        file_menu.addAction(convert_action)
+
+        exit_action = QAction("Exit", self)
+        exit_action.triggered.connect(self.exit_app)
+        file_menu.addAction(exit_action)
+
+
+        # Options Menu
+        options_menu = menubar.addMenu("Options")
+        filter_menu = options_menu.addMenu("Mouse Move Filter")
+        filter_group = QActionGroup(self)
+        for mode, label in (("none", "Off"), ("time", "Time Decimation"),
+                            ("distance", "Minimum Distance"), ("rdp", "Path Simplification")):
+            action = QAction(label, self, checkable=True)
+            action.setChecked(record_filter["mode"] == mode)
+            action.triggered.connect(lambda checked, mode=mode: record_filter.update(mode=mode))
+            filter_group.addAction(action)
+            filter_menu.addAction(action)
+
+        options_menu.addAction("Playback Settings", self.open_playback_settings)
+        trace_action = QAction("Trace Playback", self, checkable=True)
+        trace_action.setChecked(bool(playback_options["trace"]))
+        trace_action.toggled.connect(lambda checked: playback_options.update(trace=checked))
+        options_menu.addAction(trace_action)
+        options_menu.addAction("Export Last Trace...", self.export_trace)
+        options_menu.addAction("Diagnostics", self.show_diagnostics)
+
+        # Shortcut Manager
+        shortcut_menu = menubar.addMenu("Shortcuts")
+        shortcut_menu.addAction("Manage Shortcuts", self.open_shortcut_manager)
+
+        # Toolbar Buttons
+        widget = QWidget()
+        layout = QVBoxLayout()
+
+        row = QHBoxLayout()
+
+        btn_play = QPushButton("▶ Play")
+        btn_play.clicked.connect(lambda: start_playback())
+        row.addWidget(btn_play)
+
+        btn_start = QPushButton("● Start Recording")
+        btn_start.clicked.connect(start_recording)
+        row.addWidget(btn_start)
+
+        btn_stop = QPushButton("■ Stop Recording")
+        btn_stop.clicked.connect(stop_recording)
+        row.addWidget(btn_stop)
+
+        btn_pause = QPushButton("⏸ Pause")
+        btn_pause.clicked.connect(toggle_pause_playback)
+        row.addWidget(btn_pause)
+
+        btn_stop_play = QPushButton("⏹ Stop Playback")
+        btn_stop_play.clicked.connect(stop_playback)
+        row.addWidget(btn_stop_play)
+
+        layout.addLayout(row)
+        widget.setLayout(layout)
+        self.setCentralWidget(widget)
+
+    def load_macro_dialog(self):
+        file, _ = QFileDialog.getOpenFileName(self, "Load Recording", DOWNLOAD_DIR, "Macro Files (*.macro)")
+        if file:
+            run_file_job(self, FileJob("Loading", load_macro, file))
+
+    def open_library(self):
+        dlg = LibraryDialog(self)
+        dlg.exec_()
+
+    def convert_recordings(self):
+        def converted(job):
+            QMessageBox.information(self, "Converted", f"{job.result} recording(s) converted to the binary format.")
+
+        macro_cache.clear()
+        run_file_job(self, FileJob("Converting", convert_macro_dir, DOWNLOAD_DIR), converted)
+
+    def open_playback_settings(self):
+        dlg = PlaybackOptionsDialog()
+        dlg.exec_()
+
+    def show_diagnostics(self):
+        info = print_diagnostics()
+        QMessageBox.information(self, "Diagnostics",
+                                f"Input hooks: {info['input_hooks']} "
+                                f"({info['pynput_listeners']} pynput, {info['hotkeys']} hotkeys)\n"
+                                f"Threads: {info['threads']}\n"
+                                f"Subscribers: {info['subscribers']}")
+
+    def export_trace(self):
+        if state.last_trace is None:
+            QMessageBox.information(self, "Trace", "No traced playback yet. Turn on Options → Trace Playback first.")
+            return
+        file, _ = QFileDialog.getSaveFileName(self, "Export Trace", os.path.join(DOWNLOAD_DIR, "playback-trace.json"),
+                                              "Chrome Trace (*.json)")
+        if file:
+            state.last_trace.write_chrome(file)
+            print("🔬 Trace written:", file)
+
+    def open_shortcut_manager(self):
+        dlg = ShortcutManager()
+        dlg.show()
+        dlg.activateWindow()
+        dlg.raise_()
+        dlg.exec_()
+
+
+    def exit_app(self):
+        # Stop playback/recording
+        state.recording = False
+        close_recording()
+        playback_control.request_stop()
+
+        # Remove all global hotkeys and input hooks
+        try:
+            import keyboard
+            keyboard.unhook_all()
+        except:
+            pass
+        input_hub.stop()
+
+        # Kill Qt app
+        QApplication.quit()
+
+        # Force kill Python process
+        os._exit(0)
+
+
+############################################
+# APP STARTUP
+############################################
+
+def main():
+    ensure_download_dir()
+    recovered = recover_journals()
+    start_metrics_from_env()
+    hotkeys.load_shortcut_config()
+    register_all_hotkeys()
+    hotkey_problems = register_recording_hotkeys()
+    start_watcher()
+    FileJob("Indexing library", macro_library.scan, DOWNLOAD_DIR).start()
+
+    app = QApplication(sys.argv)
+    window = TinyTaskApp()
+    window.show()
+    if recovered:
+        QMessageBox.information(window, "Recovered",
+                                "Interrupted recordings were recovered to:\n" + "\n".join(recovered))
+    if hotkey_problems:
+        QMessageBox.warning(window, "Hotkeys", "\n".join(hotkey_problems))
+    sys.exit(app.exec_())
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+
+from .cache import warm_macro_cache
+from .config import DOWNLOAD_DIR, SHORTCUT_FILE
+from .metrics import registry
+from .playback import play_macro_file
+from .recorder import add_marker, start_recording, stop_recording
+
+############################################
+# GLOBAL SHORTCUT SYSTEM
+############################################
+
+global_shortcuts = []  # Loaded from JSON
+
+def load_shortcut_config():
+    global global_shortcuts
+    if not os.path.exists(SHORTCUT_FILE):
+        global_shortcuts = []
+        return
+
+    with open(SHORTCUT_FILE, "r") as f:
+        global_shortcuts = json.load(f)
+
+def save_shortcut_config():
+    # replaced in one step, so the file watcher never reads half a file
+    tmp = SHORTCUT_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(global_shortcuts, f, indent=4)
+    os.replace(tmp, SHORTCUT_FILE)
+
+############################################
+# SAFE HOTKEY MANAGER (WORKS WITH PYTHON 3.13)
+############################################
+
+# Hotkeys are keyed by their normalized shortcut, so "Alt+Ctrl+1" and
+# "ctrl+alt+1" are the same hotkey.  A keyboard handle only calls
+# on_hotkey(shortcut), which looks the macro up in `hotkey_targets` when the
+# key is pressed.  Applying a new shortcut list therefore only touches the
+# difference: new shortcuts are registered first (and rolled back if one
+# fails), then the whole target table is swapped in one assignment, then
+# shortcuts that are gone are removed.  A shortcut that stays, even with a
+# new macro, is never unregistered and keeps working throughout.
+
+MODIFIER_ORDER = ("ctrl", "alt", "shift", "windows")
+KEY_ALIASES = {"control": "ctrl", "option": "alt", "win": "windows", "super": "windows",
+               "cmd": "windows", "command": "windows"}
+RECORDING_HOTKEYS = ("ctrl+1", "ctrl+2")
+# The marker hotkey came later than the shortcuts people already saved, so
+# it is only bound when none of them uses it.  TINYTASK_MARKER_HOTKEY picks
+# another key, TINYTASK_MARKER_HOTKEY=off leaves it unbound.
+MARKER_HOTKEY = "ctrl+3"
+MARKER_HOTKEY_ENV = "TINYTASK_MARKER_HOTKEY"
+marker_hotkey = None      # normalized, once it is bound
+
+registered_hotkeys = {}   # normalized shortcut -> keyboard handle
+hotkey_targets = {}       # normalized shortcut -> macro file
+hotkeys_lock = threading.Lock()   # the window and the file watcher both apply lists
+
+registry.gauge_func("tinytask_hotkeys_registered", "Global hotkeys currently registered.",
+                    lambda: len(registered_hotkeys))
+
+def normalize_shortcut(shortcut):
+    # "Alt + Ctrl+A, b" -> "ctrl+alt+a, b"
+    steps = []
+    for step in shortcut.split(","):
+        parts = [KEY_ALIASES.get(part, part) for part in
+                 (" ".join(part.split()).lower() for part in step.split("+"))]
+        if not all(parts):
+            raise ValueError(f"invalid shortcut {shortcut!r}")
+        modifiers = [m for m in MODIFIER_ORDER if m in parts]
+        keys = [part for part in parts if part not in MODIFIER_ORDER]
+        steps.append("+".join(modifiers + keys))
+    return ", ".join(steps)
+
+def plan_hotkeys(shortcuts):
+    # -> (normalized shortcut -> file, problems); nothing is registered
+    planned = {}
+    problems = []
+    reserved = {normalize_shortcut(s) for s in RECORDING_HOTKEYS}
+    if marker_hotkey is not None:
+        reserved.add(marker_hotkey)
+    for entry in shortcuts:
+        if not (isinstance(entry, dict) and isinstance(entry.get("shortcut"), str)
+                and isinstance(entry.get("file"), str)):
+            problems.append(f"invalid entry {entry!r}")
+            continue
+        try:
+            key = normalize_shortcut(entry["shortcut"])
+        except ValueError as e:
+            problems.append(str(e))
+            continue
+        if key in reserved:
+            problems.append(f"'{entry['shortcut']}' is taken by the recording hotkeys")
+        elif key in planned:
+            problems.append(f"'{entry['shortcut']}' is assigned twice")
+        else:
+            planned[key] = os.path.join(DOWNLOAD_DIR, entry["file"])
+    return planned, problems
+
+def on_hotkey(key):
+    file = hotkey_targets.get(key)
+    if file is None:
+        return
+    print(f"🎯 Hotkey pressed → {key} → {file}")
+    play_macro_file(file)
+
+def apply_shortcuts(shortcuts, strict=True):
+    # strict: any conflict or failed registration raises ValueError and
+    # leaves the live hotkeys as they were; otherwise bad entries are
+    # reported and skipped.  Returns (added, removed, retargeted).
+    import keyboard
+
+    with hotkeys_lock:
+        return _apply_shortcuts(keyboard, shortcuts, strict)
+
+def _apply_shortcuts(keyboard, shortcuts, strict):
+    global hotkey_targets
+
+    planned, problems = plan_hotkeys(shortcuts)
+    if problems and strict:
+        raise ValueError("\n".join(problems))
+    for problem in problems:
+        print(f"❌ Skipped hotkey: {problem}")
+
+    added = []
+    for key in list(planned):
+        if key in registered_hotkeys:
+            continue
+        try:
+            registered_hotkeys[key] = keyboard.add_hotkey(key, on_hotkey, args=(key,))
+            added.append(key)
+        except Exception as e:
+            if strict:
+                for done in added:
+                    keyboard.remove_hotkey(registered_hotkeys.pop(done))
+                raise ValueError(f"could not register '{key}': {e}") from None
+            print(f"❌ Failed to register hotkey '{key}': {e}")
+            del planned[key]
+
+    retargeted = [key for key in planned if key in hotkey_targets and hotkey_targets[key] != planned[key]]
+    hotkey_targets = planned
+
+    removed = [key for key in registered_hotkeys if key not in planned]
+    for key in removed:
+        try:
+            keyboard.remove_hotkey(registered_hotkeys.pop(key))
+        except (KeyError, ValueError):
+            pass
+
+    for key in added:
+        print(f"🔗 Registered hotkey: {key} → {planned[key]}")
+    for key in retargeted:
+        print(f"🔀 Hotkey {key} → {planned[key]}")
+    for key in removed:
+        print(f"✂ Removed hotkey: {key}")
+
+    # compile the new targets up front so their first press starts instantly
+    files = [planned[key] for key in added + retargeted]
+    if files:
+        threading.Thread(target=warm_macro_cache, args=(files,), daemon=True).start()
+    return added, removed, retargeted
+
+def clear_all_hotkeys():
+    global hotkey_targets
+    import keyboard
+
+    with hotkeys_lock:
+        for handle in registered_hotkeys.values():
+            try:
+                keyboard.remove_hotkey(handle)
+            except (KeyError, ValueError):
+                pass
+
+        registered_hotkeys.clear()
+        hotkey_targets = {}
+
+def register_all_hotkeys():
+    return apply_shortcuts(global_shortcuts, strict=False)
+
+
+############################################
+# FIXED HOTKEYS FOR RECORDING
+############################################
+
+def register_recording_hotkeys():
+    # -> problems worth telling the user about
+    global marker_hotkey
+    import keyboard
+
+    start_key, stop_key = RECORDING_HOTKEYS
+
+    # Ctrl + 1 → Start Recording
+    keyboard.add_hotkey(start_key, lambda: (
+        print("🎙️ CTRL+1 → Start Recording"),
+        start_recording()
+    ))
+
+    # Ctrl + 2 → Stop Recording
+    keyboard.add_hotkey(stop_key, lambda: (
+        print("⛔ CTRL+2 → Stop Recording"),
+        stop_recording()
+    ))
+
+    # Ctrl + 3 → Marker at this point of the recording
+    problems = []
+    marker = os.environ.get(MARKER_HOTKEY_ENV, MARKER_HOTKEY)
+    if marker != "off":
+        with hotkeys_lock:
+            try:
+                key = normalize_shortcut(marker)
+            except ValueError as e:
+                key = None
+                problems.append(f"Marker hotkey not bound: {e}")
+            if key is not None:
+                planned, _ = plan_hotkeys(global_shortcuts)
+                if key in planned or key in {normalize_shortcut(s) for s in RECORDING_HOTKEYS}:
+                    problems.append(f"Marker hotkey '{key}' not bound, a shortcut already uses it "
+                                    f"(set {MARKER_HOTKEY_ENV} to another key)")
+                else:
+                    keyboard.add_hotkey(key, lambda: add_marker())
+                    marker_hotkey = key
+    for problem in problems:
+        print(f"⚠ {problem}")
+    return problems
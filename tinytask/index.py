@@ -0,0 +1,82 @@
+import re
+from array import array
+from bisect import bisect_left
+from operator import itemgetter
+
+from .decode import OP_PRESS, OP_RELEASE
+
+############################################
+# MACRO INDEX
+############################################
+
+# Lets playback start, resume or loop from any offset or marker without
+# replaying what comes before it.  `offsets` is a sorted array of event
+# offsets, so finding a position is a binary search.  Every
+# CHECKPOINT_INTERVAL events a checkpoint keeps the cursor position and the
+# buttons held at that point; the state at any event is its checkpoint plus
+# at most CHECKPOINT_INTERVAL - 1 ops rolled forward.  Key events are taps
+# (press + release) so no key is ever held across a checkpoint.
+# Built once per CompiledMacro on first use, see CompiledMacro.index().
+
+CHECKPOINT_INTERVAL = 4096
+
+class MacroIndex:
+    def __init__(self, ops, markers=None, interval=CHECKPOINT_INTERVAL):
+        self.ops = ops
+        self.interval = interval
+        self.offsets = array("q", map(itemgetter(0), ops))
+        self.markers = dict(markers or {})   # name -> offset_ns
+        self.checkpoints = []                # (position, held) before op i * interval
+
+        position = None
+        held = set()
+        for i in range(0, len(ops), interval):
+            self.checkpoints.append((position, frozenset(held)))
+            position = self._roll(ops, i, min(i + interval, len(ops)), position, held)
+
+    @staticmethod
+    def _roll(ops, start, stop, position, held):
+        for offset_ns, op, x, y, target in ops[start:stop]:
+            if x is not None:
+                position = (x, y)
+            if op == OP_PRESS:
+                held.add(target)
+            elif op == OP_RELEASE:
+                held.discard(target)
+        return position
+
+    def locate(self, where):
+        # an int is an offset in ns, a str a marker name; returns the index
+        # of the first event at or after that point
+        if isinstance(where, str):
+            if where not in self.markers:
+                raise ValueError(f"no marker named {where!r}")
+            where = self.markers[where]
+        return bisect_left(self.offsets, where)
+
+    def state_at(self, index):
+        # (cursor position, held buttons) just before ops[index] runs
+        if not self.checkpoints:
+            return None, frozenset()
+        cp = min(index // self.interval, len(self.checkpoints) - 1)
+        position, held = self.checkpoints[cp]
+        held = set(held)
+        position = self._roll(self.ops, cp * self.interval, index, position, held)
+        return position, frozenset(held)
+
+POSITION_RE = re.compile(r"^(?:(\d+):)?(?:(\d+):)?(\d+(?:\.\d*)?)$")
+
+def parse_position(text):
+    # "95.5", "1:35.5" or "1:01:35.5" -> offset in ns; anything else is a marker name
+    match = POSITION_RE.match(text.strip())
+    if not match:
+        return text
+    a, b, seconds = match.groups()
+    hours, minutes = (int(a), int(b)) if b is not None else (0, int(a or 0))
+    return round((hours * 3600 + minutes * 60 + float(seconds)) * 1e9)
+
+def format_position(offset_ns):
+    seconds = offset_ns / 1e9
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{seconds:06.3f}" if hours else f"{minutes}:{seconds:06.3f}"
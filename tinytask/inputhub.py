@@ -0,0 +1,96 @@
+import threading
+
+from .metrics import registry
+
+############################################
+# INPUT HUB
+############################################
+
+# One pynput mouse listener and one keyboard listener per process, started on
+# first use and kept alive.  Recording sessions and the playback emergency
+# stop subscribe and unsubscribe instead of starting listeners of their own;
+# every extra listener is another OS hook that sees every input event.
+# Subscriber lists are immutable tuples replaced under the lock, so the hook
+# threads can walk them without locking.
+
+HUB_EVENTS = ("click", "move", "press", "release")
+
+class InputHub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = {kind: () for kind in HUB_EVENTS}
+        self.mouse_listener = None
+        self.key_listener = None
+
+    def subscribe(self, kind, callback):
+        with self.lock:
+            self.subscribers[kind] += (callback,)
+            self._ensure_listeners(kind)
+
+    def unsubscribe(self, kind, callback):
+        with self.lock:
+            self.subscribers[kind] = tuple(cb for cb in self.subscribers[kind] if cb != callback)
+
+    def _ensure_listeners(self, kind):
+        if kind in ("click", "move"):
+            if self.mouse_listener is None or not self.mouse_listener.is_alive():
+                from pynput.mouse import Listener as MouseListener
+                self.mouse_listener = MouseListener(on_click=self._on_click, on_move=self._on_move)
+                self.mouse_listener.start()
+        elif self.key_listener is None or not self.key_listener.is_alive():
+            from pynput.keyboard import Listener as KeyListener
+            self.key_listener = KeyListener(on_press=self._on_press, on_release=self._on_release)
+            self.key_listener.start()
+
+    def _on_click(self, x, y, button, pressed):
+        for callback in self.subscribers["click"]:
+            callback(x, y, button, pressed)
+
+    def _on_move(self, x, y):
+        for callback in self.subscribers["move"]:
+            callback(x, y)
+
+    def _on_press(self, key):
+        for callback in self.subscribers["press"]:
+            callback(key)
+
+    def _on_release(self, key):
+        for callback in self.subscribers["release"]:
+            callback(key)
+
+    def stop(self):
+        with self.lock:
+            for listener in (self.mouse_listener, self.key_listener):
+                if listener is not None:
+                    listener.stop()
+            self.mouse_listener = self.key_listener = None
+            self.subscribers = {kind: () for kind in HUB_EVENTS}
+
+    def live_listeners(self):
+        return [listener for listener in (self.mouse_listener, self.key_listener)
+                if listener is not None and listener.is_alive()]
+
+    def diagnostics(self):
+        from .hotkeys import registered_hotkeys
+        hooks = self.live_listeners()
+        return {
+            "input_hooks": len(hooks) + (1 if registered_hotkeys else 0),
+            "pynput_listeners": len(hooks),
+            "hotkeys": len(registered_hotkeys),
+            "subscribers": {kind: len(cbs) for kind, cbs in self.subscribers.items()},
+            "threads": threading.active_count(),
+            "thread_names": sorted(t.name for t in threading.enumerate()),
+        }
+
+input_hub = InputHub()
+
+registry.gauge_func("tinytask_input_listeners", "Live pynput listener threads (OS input hooks).",
+                    lambda: len(input_hub.live_listeners()))
+registry.gauge_func("tinytask_threads", "Live Python threads in the process.", threading.active_count)
+
+def print_diagnostics():
+    info = input_hub.diagnostics()
+    print(f"🩺 {info['input_hooks']} input hooks "
+          f"({info['pynput_listeners']} pynput, {info['hotkeys']} hotkeys) | "
+          f"{info['threads']} threads | subscribers {info['subscribers']}")
+    return info
@@ -0,0 +1,142 @@
+import os
+import time
+
+from .config import DOWNLOAD_DIR, JOURNAL_DIR
+from .macrofile import MacroWriter, read_macro_prefix, write_macro_file
+from .metrics import registry
+
+############################################
+# RECORDING JOURNAL
+############################################
+
+# A recording is streamed to disk while it runs instead of living in memory
+# until it is saved.  The journal is an ordinary binary .macro file written
+# block by block: the drain thread appends events through a MacroWriter,
+# which keeps at most one CHUNK_EVENTS block in memory, and every
+# JOURNAL_SYNC_INTERVAL the partial block is written out and fsynced.  A
+# crash loses at most that much input, and the file is valid up to its last
+# complete block.
+# A journal is deleted once its recording has been saved or replaced by a
+# new one.  Anything still in JOURNAL_DIR on the next start was interrupted
+# and recover_journals() turns it into a recovered-*.macro in DOWNLOAD_DIR.
+# The process writing a journal holds an exclusive lock on it until it is
+# closed, so recovery skips journals another running instance (a second
+# window, `python -m tinytask record`) is still writing.  Windows locks are
+# mandatory, so there the lock covers one byte far past the data instead.
+
+JOURNAL_SYNC_INTERVAL = 1.0
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_LOCK_OFFSET = 2**31 - 2
+
+JOURNAL_SYNCS = registry.counter("tinytask_journal_syncs_total", "Recording journal flushes to disk.")
+
+def new_journal_path():
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(JOURNAL_DIR, f"recording-{stamp}{JOURNAL_SUFFIX}")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(JOURNAL_DIR, f"recording-{stamp}-{n}{JOURNAL_SUFFIX}")
+    return path
+
+def lock_journal(f):
+    # exclusive and non-blocking; False while another process holds it
+    try:
+        if os.name == "nt":
+            import msvcrt
+            pos = f.tell()
+            f.seek(JOURNAL_LOCK_OFFSET)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            finally:
+                f.seek(pos)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+class RecordingJournal:
+    # only the drain thread writes to it
+
+    def __init__(self, path, base_ns):
+        self.path = path
+        self.f = open(path, "wb")
+        lock_journal(self.f)   # released when the file is closed
+        self.writer = MacroWriter(self.f, base_ns)
+        self.write = self.writer.write
+        self.closed = False
+        self.sync()
+
+    def __len__(self):
+        return self.writer.count
+
+    def add_marker(self, name, t_ns):
+        self.writer.write_markers({name: t_ns})
+
+    def sync(self):
+        self.writer.flush()
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.last_sync = time.monotonic()
+        JOURNAL_SYNCS.inc()
+
+    def maybe_sync(self):
+        if time.monotonic() - self.last_sync >= JOURNAL_SYNC_INTERVAL:
+            self.sync()
+
+    def close(self):
+        if not self.closed:
+            self.sync()
+            self.f.close()
+            self.closed = True
+
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+def recover_journal(path, folder=DOWNLOAD_DIR):
+    # returns (recovered .macro or None, events, whether the journal was
+    # complete), or None if its recording is still running somewhere
+    with open(path, "rb") as f:
+        if not lock_journal(f):
+            return None
+        buf, complete = read_macro_prefix(path)
+        dst = None
+        if len(buf):
+            name = os.path.basename(path)[:-len(JOURNAL_SUFFIX)].replace("recording-", "recovered-", 1)
+            dst = os.path.join(folder, name + ".macro")
+            write_macro_file(dst, buf)
+    os.remove(path)
+    return dst, len(buf), complete
+
+def recover_journals(folder=DOWNLOAD_DIR):
+    # called on startup, before any recording of this process has a journal
+    recovered = []
+    if not os.path.isdir(JOURNAL_DIR):
+        return recovered
+    for name in sorted(os.listdir(JOURNAL_DIR)):
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        path = os.path.join(JOURNAL_DIR, name)
+        try:
+            result = recover_journal(path, folder)
+        except OSError as e:
+            print(f"❌ Could not recover {path}: {e}")
+            continue
+        if result is None:
+            print("⏺ Skipped journal of a recording still running:", path)
+            continue
+        dst, count, complete = result
+        if dst is None:
+            print("🗑 Removed empty recording journal:", path)
+            continue
+        print(f"🩹 Recovered interrupted recording ({count} events"
+              + ("" if complete else ", cut at the last complete block") + "):", dst)
+        recovered.append(dst)
+    return recovered
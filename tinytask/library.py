@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from itertools import compress
+
+from .config import DOWNLOAD_DIR, LIBRARY_FILE
+from .events import REC_KEY
+from .macrofile import is_binary_macro, read_macro_file
+from .mapped import MappedEvents
+
+############################################
+# MACRO LIBRARY
+############################################
+
+# A SQLite index of every .macro in DOWNLOAD_DIR, so macros can be listed,
+# searched and sorted without opening them: duration, event counts, the
+# bounding box of the mouse events, a sha256 of the file, its markers and
+# the outcome of its last playback.  scan() only re-reads files whose mtime
+# or size changed; binary files are counted block by block through the
+# memory map, never loaded whole.
+# Every call opens its own connection, so the window, the file watcher and
+# the playback worker can all use it.  A scan reads the files with no write
+# transaction open and only locks the database to store each batch of
+# SCAN_COMMIT_EVERY results.  Playback only records runs once a library
+# exists; playing a macro never creates one.
+
+SORT_KEYS = {
+    "name": "name COLLATE NOCASE",
+    "duration": "duration_s DESC",
+    "events": "events DESC",
+    "size": "size_bytes DESC",
+    "runs": "runs DESC",
+    "last_run": "last_run DESC",
+}
+SCAN_COMMIT_EVERY = 20
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS macros (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER,
+    size_bytes INTEGER,
+    format TEXT,
+    sha256 TEXT,
+    events INTEGER,
+    moves INTEGER,
+    presses INTEGER,
+    releases INTEGER,
+    keys INTEGER,
+    duration_s REAL,
+    min_x INTEGER,
+    min_y INTEGER,
+    max_x INTEGER,
+    max_y INTEGER,
+    markers TEXT,
+    error TEXT,
+    runs INTEGER NOT NULL DEFAULT 0,
+    last_run REAL,
+    last_status TEXT,
+    last_p99_ms REAL,
+    last_duration_ms REAL
+);
+"""
+
+STAT_COLUMNS = ("name", "mtime_ns", "size_bytes", "format", "sha256", "events", "moves", "presses",
+                "releases", "keys", "duration_s", "min_x", "min_y", "max_x", "max_y", "markers", "error")
+
+def file_sha256(file):
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def macro_stats(file):
+    st = os.stat(file)
+    binary = is_binary_macro(file)
+    buf = MappedEvents(file) if binary else read_macro_file(file)
+    try:
+        counts = [0, 0, 0, 0]
+        bounds = None   # min_x, min_y, max_x, max_y over mouse events
+        for chunk in buf.chunks():
+            codes, xs, ys = chunk[0], chunk[1], chunk[2]
+            for code in range(len(counts)):
+                counts[code] += codes.count(code)
+            keys = codes.count(REC_KEY)
+            if keys == len(codes):
+                continue
+            if keys:
+                mouse = [code != REC_KEY for code in codes]
+                xs, ys = list(compress(xs, mouse)), list(compress(ys, mouse))
+            box = (min(xs), min(ys), max(xs), max(ys))
+            bounds = box if bounds is None else (min(bounds[0], box[0]), min(bounds[1], box[1]),
+                                                 max(bounds[2], box[2]), max(bounds[3], box[3]))
+
+        base_ns = buf[0][4] if len(buf) else 0
+        duration_ns = buf[-1][4] - base_ns if len(buf) else 0
+        markers = {name: (t_ns - base_ns) / 1e9
+                   for name, t_ns in sorted(buf.markers.items(), key=lambda marker: marker[1])}
+    finally:
+        if binary:
+            buf.close()
+
+    min_x, min_y, max_x, max_y = bounds or (None, None, None, None)
+    return {
+        "format": "binary" if binary else "json",
+        "size_bytes": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(file),
+        "events": len(buf),
+        "moves": counts[0],
+        "presses": counts[1],
+        "releases": counts[2],
+        "keys": counts[3],
+        "duration_s": duration_ns / 1e9,
+        "min_x": min_x,
+        "min_y": min_y,
+        "max_x": max_x,
+        "max_y": max_y,
+        "markers": markers,
+    }
+
+def _row(row):
+    entry = dict(row)
+    entry["markers"] = json.loads(entry["markers"]) if entry["markers"] else {}
+    return entry
+
+class MacroLibrary:
+    def __init__(self, file=LIBRARY_FILE):
+        self.file = file
+
+    def connect(self):
+        db = sqlite3.connect(self.file, timeout=10)
+        db.row_factory = sqlite3.Row
+        db.executescript(SCHEMA)
+        return db
+
+    def _upsert(self, db, path, stats):
+        values = [stats.get(column) for column in STAT_COLUMNS]
+        values[STAT_COLUMNS.index("markers")] = json.dumps(stats["markers"]) if stats.get("markers") else None
+        updates = ", ".join(f"{column} = excluded.{column}" for column in STAT_COLUMNS)
+        db.execute(f"INSERT INTO macros (path, {', '.join(STAT_COLUMNS)}) "
+                   f"VALUES (?{', ?' * len(STAT_COLUMNS)}) "
+                   f"ON CONFLICT(path) DO UPDATE SET {updates}", [path] + values)
+
+    def _store(self, db, batch, removed=()):
+        for path, stats in batch:
+            self._upsert(db, path, stats)
+        db.executemany("DELETE FROM macros WHERE path = ?", [(path,) for path in removed])
+        db.commit()
+
+    def scan(self, folder=DOWNLOAD_DIR, progress=None):
+        # -> (updated, removed, unchanged); progress is in files checked
+        folder = os.path.abspath(folder)
+        names = sorted(name for name in os.listdir(folder) if name.endswith(".macro"))
+        updated = unchanged = 0
+        with closing(self.connect()) as db:
+            known = {row["path"]: (row["mtime_ns"], row["size_bytes"])
+                     for row in db.execute("SELECT path, mtime_ns, size_bytes FROM macros")}
+            batch = []   # (path, stats) read but not stored yet
+            for i, name in enumerate(names):
+                path = os.path.join(folder, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(path) == (st.st_mtime_ns, st.st_size):
+                    unchanged += 1
+                else:
+                    try:
+                        stats = macro_stats(path)
+                    except (OSError, ValueError) as e:
+                        stats = {"mtime_ns": st.st_mtime_ns, "size_bytes": st.st_size, "error": str(e)}
+                    stats["name"] = name
+                    batch.append((path, stats))
+                    updated += 1
+                    if len(batch) >= SCAN_COMMIT_EVERY:
+                        self._store(db, batch)
+                        batch = []
+                if progress is not None:
+                    progress(i + 1, len(names))
+
+            present = {os.path.join(folder, name) for name in names}
+            removed = [path for path in known if os.path.dirname(path) == folder and path not in present]
+            self._store(db, batch, removed)
+
+        if updated or removed:
+            print(f"📚 Library: {updated} indexed, {len(removed)} removed, {unchanged} unchanged")
+        return updated, len(removed), unchanged
+
+    @staticmethod
+    def _where(search):
+        if not search:
+            return "", []
+        pattern = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return " WHERE name LIKE ? ESCAPE '\\'", ["%" + pattern + "%"]
+
+    def query(self, search=None, sort="name", limit=None):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"unknown sort {sort!r}, expected one of {', '.join(SORT_KEYS)}")
+        where, params = self._where(search)
+        sql = f"SELECT * FROM macros{where} ORDER BY {SORT_KEYS[sort]}, name COLLATE NOCASE"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with closing(self.connect()) as db:
+            return [_row(row) for row in db.execute(sql, params)]
+
+    def count(self, search=None):
+        where, params = self._where(search)
+        with closing(self.connect()) as db:
+            return db.execute(f"SELECT COUNT(*) FROM macros{where}", params).fetchone()[0]
+
+    def last_runs(self):
+        # path -> time of the last playback, for every macro played so far
+        with closing(self.connect()) as db:
+            return dict(db.execute("SELECT path, last_run FROM macros WHERE last_run IS NOT NULL"))
+
+    def record_run(self, path, status, stats):
+        # macros that are not indexed (yet) are skipped
+        if not os.path.exists(self.file):
+            return
+        stats = stats or {}
+        duration_ms = sum(it["duration_ms"] for it in stats.get("iterations", ()))
+        with closing(self.connect()) as db:
+            db.execute("UPDATE macros SET runs = runs + 1, last_run = ?, last_status = ?, last_p99_ms = ?, "
+                       "last_duration_ms = ? WHERE path = ?",
+                       (time.time(), status, stats.get("p99_ms"), duration_ms, os.path.abspath(path)))
+            db.commit()
+
+macro_library = MacroLibrary()
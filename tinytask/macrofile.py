@@ -0,0 +1,327 @@
+import json
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from itertools import accumulate, islice, repeat
+from operator import mul
+
+from .events import EventBuffer, MacroFormatError, MAX_STRINGS
+
+############################################
+# MACRO FILE FORMAT
+############################################
+
+# Version 1 binary .macro layout (all little endian):
+#
+#   header  MACRO_MAGIC, u16 version, u16 flags, f64 base time, 12 reserved
+#   blocks  4-byte tag, u32 count, u32 payload length, i64 first time (us)
+#
+#   b"STRS" blocks intern `count` new button/key names (NUL separated UTF-8)
+#   b"EVTS" blocks hold `count` events as fixed-width columns:
+#           i8 code | i16 string id | i32 x | i32 y | i32 us since previous
+#   b"MRKS" block, after the events, holds `count` named markers:
+#           i64 us since base time per marker, then the NUL separated names
+#
+# Timestamps are microseconds since the header base time, delta encoded
+# within a block; a block starts over whenever a gap does not fit in an i32.
+# With FLAG_ZLIB every payload is zlib compressed.  Old JSON .macro files
+# are still read transparently and are converted on the next save.
+# Saves are atomic: the file is written and fsynced under a temp name, then
+# moved over the old one, so a crashed or cancelled save never leaves a
+# half-written macro behind.  Every save gets a temp file of its own, so two
+# saves of the same file at once (the window and a convert, two processes)
+# cannot write into each other's; the last one to finish wins.
+# Long reads and writes take a `progress(done, total)` callback, called once
+# per chunk; it may raise to abort, see FILE JOBS.
+
+MACRO_MAGIC = b"TTMACRO\x00"
+MACRO_VERSION = 1
+FLAG_ZLIB = 1
+
+FILE_HEADER = struct.Struct("<8sHHd12x")
+BLOCK_HEADER = struct.Struct("<4sIIq")
+
+CHUNK_EVENTS = 16384
+MAX_DELTA_US = 2**31 - 1
+
+# mkstemp creates files only the owner can read; saved macros get the
+# permissions a plain open() would have given them
+_umask = os.umask(0o022)
+os.umask(_umask)
+FILE_MODE = 0o666 & ~_umask
+
+def _column_bytes(column):
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+def _column_from(typecode, payload, start, count):
+    column = array(typecode)
+    end = start + count * column.itemsize
+    column.frombytes(payload[start:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise MacroFormatError("truncated macro file")
+    return data
+
+class MacroWriter:
+    def __init__(self, f, base_ns, compress=True):
+        self.f = f
+        self.base_ns = base_ns
+        self.flags = FLAG_ZLIB if compress else 0
+        self.strings = {}
+        self.new_strings = []
+        self.count = 0
+        self._reset_chunk()
+        f.write(FILE_HEADER.pack(MACRO_MAGIC, MACRO_VERSION, self.flags, base_ns / 1e9))
+
+    def _reset_chunk(self):
+        self.codes = array("b")
+        self.syms = array("h")
+        self.xs = array("i")
+        self.ys = array("i")
+        self.deltas = array("i")
+        self.first_us = None
+        self.last_us = 0
+
+    def _intern(self, name):
+        sid = self.strings.get(name)
+        if sid is None:
+            sid = len(self.strings)
+            if sid > MAX_STRINGS:
+                raise MacroFormatError("too many distinct buttons and keys")
+            self.strings[name] = sid
+            self.new_strings.append(name)
+        return sid
+
+    def write(self, code, x, y, name, t_ns):
+        t_us = (t_ns - self.base_ns) // 1000
+
+        if self.first_us is not None and abs(t_us - self.last_us) > MAX_DELTA_US:
+            self.flush()
+        if self.first_us is None:
+            self.first_us = self.last_us = t_us
+
+        self.codes.append(code)
+        self.syms.append(-1 if name is None else self._intern(name))
+        self.xs.append(x)
+        self.ys.append(y)
+        self.deltas.append(t_us - self.last_us)
+        self.last_us = t_us
+        self.count += 1
+
+        if len(self.codes) >= CHUNK_EVENTS:
+            self.flush()
+
+    def write_buffer(self, buf, progress=None):
+        names = buf.names
+        write = self.write
+        total, done = len(buf), 0
+        for chunk in buf.chunks():
+            for code, x, y, sid, t_ns in zip(*chunk):
+                write(code, x, y, names[sid] if sid >= 0 else None, t_ns)
+            done += len(chunk[0])
+            if progress is not None:
+                progress(done, total)
+
+    def flush(self):
+        if self.new_strings:
+            payload = "\0".join(self.new_strings).encode("utf-8")
+            self._write_block(b"STRS", len(self.new_strings), payload, 0)
+            self.new_strings = []
+
+        if self.codes:
+            payload = b"".join(_column_bytes(c) for c in
+                               (self.codes, self.syms, self.xs, self.ys, self.deltas))
+            self._write_block(b"EVTS", len(self.codes), payload, self.first_us)
+
+        self._reset_chunk()
+
+    def write_markers(self, markers):
+        if not markers:
+            return
+        self.flush()
+        times = array("q", ((t_ns - self.base_ns) // 1000 for t_ns in markers.values()))
+        payload = _column_bytes(times) + "\0".join(markers).encode("utf-8")
+        self._write_block(b"MRKS", len(markers), payload, 0)
+
+    def _write_block(self, tag, count, payload, first_us):
+        if self.flags & FLAG_ZLIB:
+            payload = zlib.compress(payload, 1)
+        self.f.write(BLOCK_HEADER.pack(tag, count, len(payload), first_us))
+        self.f.write(payload)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def unpack_file_header(data):
+    # returns (flags, base_ns)
+    magic, version, flags, base_time = FILE_HEADER.unpack(data)
+    if magic != MACRO_MAGIC:
+        raise MacroFormatError("not a binary macro file")
+    if version != MACRO_VERSION:
+        raise MacroFormatError(f"unsupported macro version {version}")
+    return flags, round(base_time * 1e9)
+
+def block_payload(tag, payload, flags):
+    if flags & FLAG_ZLIB:
+        try:
+            return zlib.decompress(payload)
+        except zlib.error as e:
+            raise MacroFormatError(f"corrupt {tag!r} block: {e}") from None
+    return payload
+
+def decode_strings(payload, count):
+    names = payload.decode("utf-8").split("\0")
+    if len(names) != count:
+        raise MacroFormatError("corrupt string table")
+    return names
+
+def decode_event_block(payload, count, base_ns, first_us):
+    # -> (codes, syms, xs, ys, times_ns)
+    if len(payload) != count * 15:
+        raise MacroFormatError("corrupt event block")
+    codes, pos = _column_from("b", payload, 0, count)
+    syms, pos = _column_from("h", payload, pos, count)
+    xs, pos = _column_from("i", payload, pos, count)
+    ys, pos = _column_from("i", payload, pos, count)
+    deltas, pos = _column_from("i", payload, pos, count)
+    # running sum of the us deltas, scaled to absolute ns, all in C
+    start_ns = base_ns + first_us * 1000
+    times_ns = array("q", islice(accumulate(map(mul, deltas, repeat(1000)),
+                                            initial=start_ns), 1, None))
+    return codes, syms, xs, ys, times_ns
+
+def decode_markers(payload, count, base_ns, markers):
+    times, pos = _column_from("q", payload, 0, count)
+    names = payload[pos:].decode("utf-8").split("\0")
+    if len(names) != count:
+        raise MacroFormatError("corrupt marker block")
+    for name, t_us in zip(names, times):
+        markers[name] = base_ns + t_us * 1000
+
+def iter_macro_chunks(f, markers=None):
+    # yields (strings, codes, syms, xs, ys, times_ns) per EVTS block; `strings`
+    # is the interned name table so far and keeps growing between chunks.
+    # Markers are added to the `markers` dict when one is passed.
+    flags, base_ns = unpack_file_header(_read_exact(f, FILE_HEADER.size))
+    strings = []
+    while True:
+        head = f.read(BLOCK_HEADER.size)
+        if not head:
+            return
+        if len(head) != BLOCK_HEADER.size:
+            raise MacroFormatError("truncated macro file")
+
+        tag, count, length, first_us = BLOCK_HEADER.unpack(head)
+        payload = block_payload(tag, _read_exact(f, length), flags)
+
+        if tag == b"STRS":
+            strings.extend(decode_strings(payload, count))
+
+        elif tag == b"EVTS":
+            yield (strings,) + decode_event_block(payload, count, base_ns, first_us)
+
+        elif tag == b"MRKS" and markers is not None:
+            decode_markers(payload, count, base_ns, markers)
+
+        # unknown block tags are skipped so newer writers stay readable
+
+def is_binary_macro(file):
+    with open(file, "rb") as f:
+        return f.read(len(MACRO_MAGIC)) == MACRO_MAGIC
+
+def _read_chunks_into(buf, f, progress=None):
+    size = os.fstat(f.fileno()).st_size
+    for strings, codes, syms, xs, ys, times_ns in iter_macro_chunks(f, buf.markers):
+        for name in strings[len(buf.names):]:
+            buf.intern(name)
+        buf.append_columns(codes, xs, ys, syms, times_ns)
+        if progress is not None:
+            progress(f.tell(), size)
+
+def read_macro_file(file, progress=None):
+    # progress is in bytes read; a legacy JSON file is parsed in one go
+    with open(file, "rb") as f:
+        if f.read(len(MACRO_MAGIC)) == MACRO_MAGIC:
+            f.seek(0)
+            buf = EventBuffer()
+            _read_chunks_into(buf, f, progress)
+            return buf
+
+        # legacy JSON list of 6-element lists
+        f.seek(0)
+        try:
+            data = json.load(f)
+        except ValueError as e:
+            raise MacroFormatError(f"not a macro file: {e}") from None
+    if not isinstance(data, list):
+        raise MacroFormatError("not a macro file: expected a list of events")
+    return EventBuffer.from_events(data)
+
+def read_macro_prefix(file):
+    # everything up to the first truncated or corrupt block of a binary
+    # macro, e.g. a recording journal cut off by a crash; returns
+    # (buf, whether the whole file was readable)
+    buf = EventBuffer()
+    with open(file, "rb") as f:
+        try:
+            _read_chunks_into(buf, f)
+        except MacroFormatError:
+            return buf, False
+    return buf, True
+
+def write_macro_file(file, buf, compress=True, progress=None):
+    # progress is in events written
+    base_ns = buf[0][4] if len(buf) else 0
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(file) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(file)))
+    try:
+        with open(fd, "wb") as f:
+            with MacroWriter(f, base_ns, compress) as writer:
+                writer.write_buffer(buf, progress)
+                writer.write_markers(buf.markers)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, FILE_MODE)
+        os.replace(tmp, file)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def convert_macro(src, dst=None, progress=None):
+    events = read_macro_file(src)
+    write_macro_file(dst or src, events, progress=progress)
+    return len(events)
+
+def convert_macro_dir(folder, progress=None):
+    # progress is in files checked
+    names = [name for name in os.listdir(folder) if name.endswith(".macro")]
+    converted = 0
+    for i, name in enumerate(names):
+        file = os.path.join(folder, name)
+        if os.path.isfile(file) and not is_binary_macro(file):
+            convert_macro(file)
+            converted += 1
+            print("🔁 Converted macro:", file)
+        if progress is not None:
+            progress(i + 1, len(names))
+    return converted
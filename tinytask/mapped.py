@@ -0,0 +1,333 @@
+import copy
+import mmap
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from operator import itemgetter
+
+from .decode import decode_rows, resolve_button
+from .events import MacroFormatError, REC_MOVE, REC_PRESS, REC_RELEASE
+from .index import MacroIndex
+from .macrofile import (BLOCK_HEADER, CHUNK_EVENTS, FILE_HEADER, block_payload, decode_event_block,
+                        decode_markers, decode_strings, unpack_file_header)
+
+############################################
+# MEMORY MAPPED MACROS
+############################################
+
+# Big binary macros are not read and decoded up front.  Big is counted in
+# events, summed from the block headers: a file stores about 3 bytes per
+# event but a decoded op costs well over 100, so a few MB on disk can be
+# hundreds in memory.  From MAPPED_MIN_EVENTS up the file is mapped
+# read-only and opening it only walks the block headers (plus the small
+# STRS and MRKS blocks); EVTS blocks are decompressed and decoded when
+# playback reaches them and only the last MAPPED_CACHE_BLOCKS decoded blocks
+# are kept.  Playback can start as soon as the first block is decoded, the
+# rest of the file pages in as it is needed, and every process replaying
+# the same file shares its pages through the OS page cache.
+# A bad button or key name in a mapped macro is only found when its block
+# is decoded, so it fails the playback instead of the load.
+# A mapped file must be replaced (temp file + os.replace), not rewritten in
+# place, while anything still plays from it.  Windows cannot replace or
+# delete a file while it is mapped, so the cache closes a MappedMacro as soon
+# as it is evicted or its file changes; a playback still using it keeps the
+# mapping open until it ends (retain/release).
+
+MAPPED_MIN_EVENTS = 500_000
+MAPPED_CACHE_BLOCKS = 4
+DECODE_STEP = 2048
+
+PRESS_OR_RELEASE = re.compile(b"[" + bytes((REC_PRESS, REC_RELEASE)) + b"]")
+
+def count_events(path):
+    # events in a binary macro, from its block headers alone
+    count = 0
+    with open(path, "rb") as f:
+        if len(f.read(FILE_HEADER.size)) != FILE_HEADER.size:
+            raise MacroFormatError("truncated macro file")
+        while True:
+            data = f.read(BLOCK_HEADER.size)
+            if not data:
+                return count
+            if len(data) != BLOCK_HEADER.size:
+                raise MacroFormatError("truncated macro file")
+            tag, n, length, first_us = BLOCK_HEADER.unpack(data)
+            if tag == b"EVTS":
+                count += n
+            f.seek(length, os.SEEK_CUR)
+
+class MappedEvents:
+    # read-only EventBuffer look-alike: len(), iteration, indexing, chunks(),
+    # names and markers, so it can be saved, inspected or decoded like one
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read(FILE_HEADER.size)
+            if len(data) != FILE_HEADER.size:
+                raise MacroFormatError("truncated macro file")
+            self.flags, self.base_ns = unpack_file_header(data)
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.names = []
+        self.markers = {}
+        self.blocks = []           # (payload offset, payload length, count, first_us) per EVTS block
+        self.starts = array("q")   # index of each block's first event
+        self.count = 0
+        try:
+            self._scan()
+        except BaseException:
+            # nothing else will close it, and on Windows an open mapping
+            # keeps the bad file from being replaced or deleted
+            self.map.close()
+            raise
+        self._last = (None, None)
+
+    def _scan(self):
+        data, pos, end = self.map, FILE_HEADER.size, len(self.map)
+        while pos < end:
+            if pos + BLOCK_HEADER.size > end:
+                raise MacroFormatError("truncated macro file")
+            tag, count, length, first_us = BLOCK_HEADER.unpack_from(data, pos)
+            pos += BLOCK_HEADER.size
+            if pos + length > end:
+                raise MacroFormatError("truncated macro file")
+
+            if tag == b"EVTS" and count:
+                self.blocks.append((pos, length, count, first_us))
+                self.starts.append(self.count)
+                self.count += count
+            elif tag == b"STRS":
+                self.names.extend(decode_strings(block_payload(tag, data[pos:pos + length], self.flags), count))
+            elif tag == b"MRKS":
+                decode_markers(block_payload(tag, data[pos:pos + length], self.flags), count,
+                               self.base_ns, self.markers)
+            pos += length
+
+    def __len__(self):
+        return self.count
+
+    def name(self, sid):
+        return self.names[sid] if sid >= 0 else None
+
+    def block_of(self, index):
+        return bisect_right(self.starts, index) - 1
+
+    def first_ns(self, block):
+        return self.base_ns + self.blocks[block][3] * 1000
+
+    def columns(self, block):
+        # (codes, xs, ys, sids, times_ns) like an EventBuffer chunk
+        b, columns = self._last
+        if b == block:
+            return columns
+        pos, length, count, first_us = self.blocks[block]
+        payload = block_payload(b"EVTS", self.map[pos:pos + length], self.flags)
+        codes, syms, xs, ys, times = decode_event_block(payload, count, self.base_ns, first_us)
+        columns = (codes, xs, ys, syms, times)
+        self._last = (block, columns)
+        return columns
+
+    def chunks(self):
+        for block in range(len(self.blocks)):
+            yield self.columns(block)
+
+    def __iter__(self):
+        for chunk in self.chunks():
+            yield from zip(*chunk)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("event index out of range")
+        block = self.block_of(index)
+        i = index - self.starts[block]
+        return tuple(column[i] for column in self.columns(block))
+
+    def close(self):
+        self.map.close()
+
+class MappedOps:
+    # lazy sequence of decoded ops; slices are views sharing the block cache
+
+    def __init__(self, events, cache_blocks=MAPPED_CACHE_BLOCKS):
+        self.events = events
+        self.start = 0
+        self.stop = len(events)
+        self.base_ns = events.first_ns(0) if events.blocks else 0
+        self.resolved = {}
+        self.cache = OrderedDict()   # block -> decoded ops
+        self.cache_blocks = cache_blocks
+        self.lock = threading.Lock()
+
+    def block(self, block):
+        with self.lock:
+            ops = self.cache.get(block)
+            if ops is not None:
+                self.cache.move_to_end(block)
+                return ops
+
+        events = self.events
+        ops = decode_rows(zip(*events.columns(block)), events.names, self.base_ns, self.resolved,
+                          events.starts[block])
+        with self.lock:
+            self.cache[block] = ops
+            while len(self.cache) > self.cache_blocks:
+                self.cache.popitem(last=False)
+        return ops
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("MappedOps slices must be contiguous")
+            view = copy.copy(self)
+            view.start, view.stop = self.start + start, self.start + max(start, stop)
+            return view
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("op index out of range")
+        index += self.start
+        block = self.events.block_of(index)
+        return self.block(block)[index - self.events.starts[block]]
+
+    def __iter__(self):
+        # playing straight through decodes DECODE_STEP rows at a time instead
+        # of whole blocks, so reaching the next block only stalls playback for
+        # its decompression; nothing read this way is cached
+        events = self.events
+        index = self.start
+        while index < self.stop:
+            block = events.block_of(index)
+            columns = events.columns(block)
+            first = events.starts[block]
+            end = min(first + len(columns[0]), self.stop)
+            while index < end:
+                lo, hi = index - first, min(index + DECODE_STEP, end) - first
+                yield from decode_rows(zip(*(column[lo:hi] for column in columns)), events.names,
+                                       self.base_ns, self.resolved, index)
+                index = first + hi
+
+class BlockIndex:
+    # MacroIndex for a mapped macro.  Each block's first offset comes from
+    # its header; the cursor and held buttons at each block start are rolled
+    # forward from the raw columns, and only as far as a seek has needed.
+
+    def __init__(self, ops, markers=None):
+        events = ops.events
+        self.ops = ops
+        self.markers = dict(markers or {})
+        self.firsts = array("q", (events.first_ns(b) - ops.base_ns for b in range(len(events.blocks))))
+        self.checkpoints = [(None, frozenset())]
+        self.buttons = {}
+        self.lock = threading.Lock()
+
+    def locate(self, where):
+        if isinstance(where, str):
+            if where not in self.markers:
+                raise ValueError(f"no marker named {where!r}")
+            where = self.markers[where]
+        if not self.firsts:
+            return 0
+        # the last block starting before `where`; equal offsets can run on
+        # from the end of it into the next one
+        block = max(bisect_left(self.firsts, where) - 1, 0)
+        ops = self.ops.block(block)
+        return self.ops.events.starts[block] + bisect_left(ops, where, key=itemgetter(0))
+
+    def state_at(self, index):
+        events = self.ops.events
+        if not events.blocks:
+            return None, frozenset()
+        block = events.block_of(index)
+        position, held = self._checkpoint(block)
+        held = set(held)
+        position = MacroIndex._roll(self.ops.block(block), 0, index - events.starts[block], position, held)
+        return position, frozenset(held)
+
+    def _checkpoint(self, block):
+        with self.lock:
+            while len(self.checkpoints) <= block:
+                b = len(self.checkpoints) - 1
+                position, held = self.checkpoints[b]
+                held = set(held)
+                position = self._roll_columns(self.ops.events.columns(b), position, held)
+                self.checkpoints.append((position, frozenset(held)))
+            return self.checkpoints[block]
+
+    def _roll_columns(self, columns, position, held):
+        # what MacroIndex._roll does over a whole block, without decoding it
+        codes, xs, ys, sids, times = columns
+        raw = codes.tobytes()
+        last = max(raw.rfind(bytes((code,))) for code in (REC_MOVE, REC_PRESS, REC_RELEASE))
+        if last >= 0:
+            position = (xs[last], ys[last])
+        for match in PRESS_OR_RELEASE.finditer(raw):
+            i = match.start()
+            button = self._button(sids[i])
+            if raw[i] == REC_PRESS:
+                held.add(button)
+            else:
+                held.discard(button)
+        return position
+
+    def _button(self, sid):
+        button = self.buttons.get(sid)
+        if button is None:
+            button = self.buttons[sid] = resolve_button(self.ops.events.names[sid])
+        return button
+
+class MappedMacro:
+    # stands in for CompiledMacro: events, ops, markers, index()
+
+    def __init__(self, path):
+        self.path = path
+        self.events = MappedEvents(path)
+        self.count = len(self.events)
+        self.ops = MappedOps(self.events)
+        # decoded blocks are all it keeps in memory
+        self.resident_events = MAPPED_CACHE_BLOCKS * CHUNK_EVENTS
+        base_ns = self.ops.base_ns
+        self.markers = {name: t_ns - base_ns for name, t_ns in self.events.markers.items()}
+        self._index = None
+        self._index_lock = threading.Lock()
+        self.users = 0
+        self.closing = False
+
+    def __len__(self):
+        return self.count
+
+    def index(self):
+        with self._index_lock:
+            if self._index is None:
+                self._index = BlockIndex(self.ops, self.markers)
+            return self._index
+
+    def retain(self):
+        # False once closed; the caller has to open the file again
+        with self._index_lock:
+            if self.closing:
+                return False
+            self.users += 1
+            return True
+
+    def release(self):
+        with self._index_lock:
+            self.users -= 1
+            if self.closing and not self.users:
+                self.events.close()
+
+    def close(self):
+        with self._index_lock:
+            self.closing = True
+            if not self.users:
+                self.events.close()
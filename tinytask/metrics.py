@@ -0,0 +1,227 @@
+import math
+import os
+import stat
+import threading
+from bisect import bisect_left
+
+############################################
+# METRICS REGISTRY
+############################################
+
+# Counters, gauges and histograms for the long running hotkey daemon,
+# rendered in the Prometheus text exposition format.  Each module registers
+# its own metrics at import; that only adds an entry to `registry`, nothing
+# is started until start_metrics_server() is called.
+# Hot loops never touch a metric per event: playback observes a whole pass
+# of lateness samples at once and recording counts per drain.
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+START_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        yield self.name, self.value
+
+class FuncMetric:
+    # a counter or gauge whose value is read from somewhere else on scrape
+    def __init__(self, kind, name, help, func):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def samples(self):
+        yield self.name, self.func()
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def observe_many(self, values, scale=1.0):
+        # values * scale are in the histogram's unit, e.g. ns samples with scale=1e-9
+        buckets = self.buckets
+        counts = [0] * len(self.counts)
+        total = 0.0
+        for value in values:
+            value *= scale
+            counts[bisect_left(buckets, value)] += 1
+            total += value
+        with self.lock:
+            for i, n in enumerate(counts):
+                self.counts[i] += n
+            self.sum += total
+            self.count += len(values)
+
+    def samples(self):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, n in zip(self.buckets + (math.inf,), counts):
+            cumulative += n
+            yield f'{self.name}_bucket{{le="{_format_value(float(bound))}"}}', cumulative
+        yield f"{self.name}_sum", total
+        yield f"{self.name}_count", count
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _add(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"metric {metric.name!r} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help):
+        return self._add(Counter(name, help))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help, buckets))
+
+    def gauge_func(self, name, help, func):
+        return self._add(FuncMetric("gauge", name, help, func))
+
+    def counter_func(self, name, help, func):
+        return self._add(FuncMetric("counter", name, help, func))
+
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, value in metric.samples():
+                    lines.append(f"{name} {_format_value(value)}")
+            except Exception as e:
+                lines.append(f"# {metric.name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+############################################
+# METRICS ENDPOINT
+############################################
+
+# GET /metrics over HTTP on a local TCP port ("127.0.0.1:9464") or a Unix
+# socket ("unix:/run/user/1000/tinytask.sock").  The daemon starts it when
+# TINYTASK_METRICS is set to one of those.
+
+METRICS_ENV = "TINYTASK_METRICS"
+
+def _make_server(address):
+    # http.server costs more to import than the rest of the CLI, so it is
+    # only loaded once an endpoint is actually wanted
+    import socket
+    import socketserver
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def address_string(self):
+            # Unix socket peers have no host
+            return self.client_address[0] if self.client_address else "unix"
+
+        def log_message(self, format, *args):
+            pass
+
+    if address.startswith("unix:"):
+        if not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix sockets are not available on this platform")
+
+        class UnixMetricsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        path = address[len("unix:"):]
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            # only a socket left behind by a previous run is removed, never
+            # a file a mistyped address happens to point at
+            if not stat.S_ISSOCK(mode):
+                raise ValueError(f"{path} exists and is not a socket")
+            os.remove(path)
+        return UnixMetricsServer(path, MetricsHandler)
+
+    host, _, port = address.rpartition(":")
+    server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), MetricsHandler)
+    server.daemon_threads = True
+    return server
+
+metrics_server = None
+
+def start_metrics_server(address):
+    global metrics_server
+    if metrics_server is not None:
+        return metrics_server
+
+    server = _make_server(address)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    metrics_server = server
+    print(f"📈 Metrics on {address}")
+    return server
+
+def start_metrics_from_env():
+    address = os.environ.get(METRICS_ENV)
+    if not address:
+        return None
+    try:
+        return start_metrics_server(address)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not start metrics endpoint on {address}: {e}")
+        return None
+
+def stop_metrics_server():
+    global metrics_server
+    if metrics_server is not None:
+        metrics_server.shutdown()
+        metrics_server.server_close()
+        metrics_server = None
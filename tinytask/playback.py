@@ -0,0 +1,470 @@
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+from . import state
+from .backends import check_backend, get_backend
+from .cache import current_macro, macro_cache, retain_macro
+from .index import format_position
+from .inputhub import input_hub
+from .metrics import START_BUCKETS, registry
+from .scheduler import playback_control, lateness_stats, print_lateness_stats
+from .tracing import PlaybackTrace, print_trace_summary
+
+############################################
+# PLAYBACK FUNCTIONS
+############################################
+
+def emergency_stop_listener(key):
+    from pynput.keyboard import Key
+    from .recorder import stop_recording
+
+    if key == Key.esc:
+        print("⚠ ESC → Emergency STOP")
+        playback_control.request_stop()
+        playback_executor.cancel_all()
+        if state.recording:
+            # closing the session joins the drain thread and syncs the
+            # journal, which must not hold up the OS keyboard hook
+            state.recording = False
+            threading.Thread(target=stop_recording, name="stop-recording", daemon=True).start()
+
+# speed scales every gap, max_idle_ms (0 = off) clamps long pauses before
+# scaling, loops is the number of passes over the same decoded ops (0 = until
+# stopped).  Deadlines stay absolute, so clamping and looping never drift.
+# backend is a name from BACKENDS or a Backend instance, see INPUT BACKENDS.
+# trace records per-event spans and GC pauses, see PLAYBACK TRACING; True
+# starts a new PlaybackTrace, kept in state.last_trace afterwards.
+# start/end pick a segment: an offset in ns or a marker name, found through
+# the macro's index (see MACRO INDEX).  A segment that does not start at the
+# first event begins every pass by restoring the cursor and held buttons.
+# transform is a Transform applied to the ops while they play, see PLAYBACK
+# TRANSFORMS.
+PLAYBACK_MIN_SPEED = 0.1
+PLAYBACK_MAX_SPEED = 100.0
+LOOP_STATS_KEEP = 1000
+
+playback_options = {
+    "speed": 1.0,
+    "max_idle_ms": 0,
+    "loops": 1,
+    "policy": "queue",   # see PLAYBACK EXECUTOR
+    "backend": "pynput",
+    "trace": False,
+    "transform": None,
+}
+
+PLAYBACKS_STARTED = registry.counter("tinytask_playbacks_started_total", "Playbacks that began injecting events.")
+PLAYBACKS_COMPLETED = registry.counter("tinytask_playbacks_completed_total", "Playbacks that ran every loop to the end.")
+PLAYBACKS_ABORTED = registry.counter("tinytask_playbacks_aborted_total", "Playbacks stopped early by ESC, stop or cancel.")
+PLAYBACKS_FAILED = registry.counter("tinytask_playbacks_failed_total", "Playbacks that raised an error.")
+EVENT_LATENESS = registry.histogram("tinytask_playback_event_lateness_seconds",
+                                    "How late each event was injected relative to its deadline.")
+HOTKEY_TO_FIRST_EVENT = registry.histogram("tinytask_hotkey_to_first_event_seconds",
+                                           "From a hotkey press to the first injected event of its macro.",
+                                           START_BUCKETS)
+
+def check_playback_options(speed, max_idle_ms, loops):
+    if not PLAYBACK_MIN_SPEED <= speed <= PLAYBACK_MAX_SPEED:
+        raise ValueError(f"speed must be between {PLAYBACK_MIN_SPEED}x and {PLAYBACK_MAX_SPEED}x")
+    if max_idle_ms < 0:
+        raise ValueError("max idle gap cannot be negative")
+    if loops < 0:
+        raise ValueError("loop count cannot be negative")
+
+def resolve_segment(macro, start=None, end=None):
+    if start is None and end is None:
+        return 0, len(macro.ops)
+    index = macro.index()
+    lo = 0 if start is None else index.locate(start)
+    hi = len(macro.ops) if end is None else index.locate(end)
+    if lo >= hi:
+        raise ValueError(f"nothing to play between {start!r} and {end!r}")
+    return lo, hi
+
+def playback(macro=None, speed=None, max_idle_ms=None, loops=None, job=None, backend=None, trace=None,
+             start=None, end=None, transform=None):
+    speed = playback_options["speed"] if speed is None else speed
+    max_idle_ms = playback_options["max_idle_ms"] if max_idle_ms is None else max_idle_ms
+    loops = playback_options["loops"] if loops is None else loops
+    backend = playback_options["backend"] if backend is None else backend
+    trace = playback_options["trace"] if trace is None else trace
+    transform = playback_options["transform"] if transform is None else transform
+    try:
+        check_playback_options(speed, max_idle_ms, loops)
+    except ValueError as e:
+        print(f"⚠ {e}")
+        return None
+
+    if macro is None:
+        macro = current_macro()
+
+    if macro is None or not macro.ops:
+        print("⚠ No events to play!")
+        state.playing = False
+        return None
+
+    try:
+        lo, hi = resolve_segment(macro, start, end)
+    except ValueError as e:
+        print(f"⚠ {e}")
+        return None
+
+    backend = get_backend(backend)
+    if trace is True:
+        trace = PlaybackTrace()
+    elif trace is False:
+        trace = None
+    control = playback_control
+    control.reset()
+    # a job cancelled after the executor dequeued it, but before the reset
+    # above, must not run; cancel() sets its flag before requesting the stop
+    if job is not None and job.cancel_requested:
+        control.request_stop()
+    print("▶ Playback started")
+    PLAYBACKS_STARTED.inc()
+
+    ops = macro.ops
+    resume = None
+    if lo > 0 or hi < len(ops):
+        if lo > 0:
+            resume = macro.index().state_at(lo)
+            print(f"⏩ Starting at {format_position(ops[lo][0])}")
+        ops = ops[lo:hi]
+    base = ops[0][0]
+    if transform and resume is not None:
+        resume = transform.restore_state(*resume)
+    dispatch = backend.dispatch()
+    max_idle_ns = max_idle_ms * 1_000_000 or None
+    passes = itertools.count() if loops == 0 else range(loops)
+    iterations = deque(maxlen=LOOP_STATS_KEEP)
+    stopped_at = None
+
+    # whatever the backend raises, the finally below undoes all of this
+    state.playing = True
+    if backend.emergency_stop:
+        input_hub.subscribe("press", emergency_stop_listener)
+    iter_start = time.perf_counter_ns()
+    if trace is not None:
+        state.last_trace = trace
+        trace.start()
+    try:
+        for iteration in passes:
+            if resume is not None:
+                backend.restore(*resume)
+            lateness = []
+            shift = 0
+            prev = base
+
+            # a fresh chain every pass; generators only run once
+            for offset_ns, op, x, y, target in (transform(ops, base, iteration) if transform else ops):
+                if max_idle_ns is not None and offset_ns - prev > max_idle_ns:
+                    shift += offset_ns - prev - max_idle_ns
+                prev = offset_ns
+
+                if trace is not None:
+                    wait_start = time.perf_counter_ns()
+                deadline = control.wait_until(iter_start + control.pause_shift_ns
+                                              + int((offset_ns - base - shift) / speed))
+                if deadline is None:
+                    stopped_at = transform.source_offset(offset_ns, base) if transform else offset_ns
+                    break
+                now = time.perf_counter_ns()
+                lateness.append(now - deadline)
+
+                if trace is None:
+                    dispatch[op](x, y, target)
+                else:
+                    call_start = time.perf_counter_ns()
+                    dispatch[op](x, y, target)
+                    trace.event(op, deadline, wait_start, now, call_start, time.perf_counter_ns())
+
+            EVENT_LATENESS.observe_many(lateness, 1e-9)
+            if iteration == 0 and lateness and job is not None and job.requested_ns is not None:
+                # the first op is at `base`, so it was due at iter_start
+                HOTKEY_TO_FIRST_EVENT.observe((iter_start + lateness[0] - job.requested_ns) / 1e9)
+
+            stats = lateness_stats(lateness)
+            stats["iteration"] = iteration + 1
+            stats["duration_ms"] = (time.perf_counter_ns() - iter_start) / 1e6
+            iterations.append(stats)
+            if loops != 1:
+                print(f"🔁 Loop {iteration + 1}{'' if loops == 0 else f'/{loops}'} | "
+                      f"{stats['duration_ms']:.1f} ms | p99 {stats['p99_ms']:.3f} ms")
+
+            if control.stop_requested:
+                break
+            if not lateness:
+                print("⚠ The transform left nothing to play")
+                break
+            # the next pass starts where this one was scheduled to end
+            iter_start += int((prev - base - shift) / speed)
+    finally:
+        state.playing = False
+        if trace is not None:
+            trace.stop()
+        backend.release_held()
+        if backend.emergency_stop:
+            input_hub.unsubscribe("press", emergency_stop_listener)
+        if control.stop_requested:
+            control.halted()
+
+    print("⏹ Playback finished")
+    stats = summarize_iterations(list(iterations))
+    stats["completed"] = not control.stop_requested
+    (PLAYBACKS_ABORTED if control.stop_requested else PLAYBACKS_COMPLETED).inc()
+    stats["stop_latency_ms"] = control.last_stop_latency_ms if control.stop_requested else None
+    stats["stopped_at_ns"] = stopped_at
+    print_lateness_stats(stats)
+    if stopped_at is not None:
+        at = format_position(stopped_at)
+        print(f"⏯ Stopped at {at}, resume with --start {at}")
+    if trace is not None:
+        stats["trace"] = trace.summary()
+        print_trace_summary(stats["trace"])
+    state.last_playback_stats = stats
+    return stats
+
+def summarize_iterations(iterations):
+    # p50 is the median of the per-pass medians and p99/max the worst pass,
+    # so endless loops do not have to keep every lateness sample around
+    p50s = sorted(it["p50_ms"] for it in iterations)
+    return {
+        "events": sum(it["events"] for it in iterations),
+        "p50_ms": p50s[len(p50s) // 2] if p50s else 0.0,
+        "p99_ms": max((it["p99_ms"] for it in iterations), default=0.0),
+        "max_ms": max((it["max_ms"] for it in iterations), default=0.0),
+        "iterations": iterations,
+    }
+
+def start_playback(macro=None, policy=None, requested_ns=None, **options):
+    if macro is None:
+        macro = current_macro()
+    try:
+        return playback_executor.submit(macro, policy, requested_ns, **options)
+    except ValueError as e:
+        print(f"⚠ {e}")
+        return None
+
+def stop_playback():
+    playback_executor.cancel_all()
+    print("⛔ Playback force stopped")
+
+def toggle_pause_playback():
+    if playback_control.paused:
+        playback_control.resume()
+        print("▶ Playback resumed")
+    else:
+        playback_control.pause()
+        print("⏸ Playback paused")
+
+
+############################################
+# PLAYBACK EXECUTOR
+############################################
+
+# All playback goes through one long-lived worker thread and a bounded queue,
+# so two hotkey presses can never run two playback loops over the same cursor.
+# What happens when a job arrives while another one is playing is up to the
+# policy:
+#   "queue"    wait behind the current job (rejected once the queue is full)
+#   "replace"  cancel the current and queued jobs and play this one next
+#   "reject"   refuse the job if anything is playing or queued
+
+PLAYBACK_POLICIES = ("queue", "replace", "reject")
+PLAYBACK_QUEUE_SIZE = 8
+
+class PlaybackJob:
+    def __init__(self, macro, options, requested_ns=None):
+        self.macro = macro
+        self.options = options
+        self.requested_ns = requested_ns   # perf_counter_ns of the hotkey press, if any
+        self.status = "pending"   # -> running -> done | cancelled | failed, or rejected
+        self.stats = None
+        self.error = None
+        self.cancel_requested = False
+        self.finished = threading.Event()
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        playback_executor.cancel(self)
+
+    def add_done_callback(self, callback):
+        with self.lock:
+            if not self.finished.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout=None):
+        return self.finished.wait(timeout)
+
+    def _finish(self, status):
+        with self.lock:
+            self.status = status
+            self.finished.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"❌ Playback callback failed: {e}")
+
+class PlaybackExecutor:
+    def __init__(self, max_queue=PLAYBACK_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.current = None
+        self.cond = threading.Condition()
+        self.worker = None
+
+    def submit(self, macro, policy=None, requested_ns=None, **options):
+        policy = policy or playback_options["policy"]
+        if macro is None or not macro.ops:
+            raise ValueError("No events to play!")
+        if policy not in PLAYBACK_POLICIES:
+            raise ValueError(f"unknown playback policy {policy!r}")
+        merged = {key: playback_options[key]
+                  for key in ("speed", "max_idle_ms", "loops", "backend", "trace", "transform")}
+        merged.update(options)
+        check_playback_options(merged["speed"], merged["max_idle_ms"], merged["loops"])
+        check_backend(merged["backend"])
+        macro = retain_macro(macro)
+        try:
+            resolve_segment(macro, merged.get("start"), merged.get("end"))
+        finally:
+            macro.release()
+
+        job = PlaybackJob(macro, merged, requested_ns)
+        dropped = []
+        with self.cond:
+            busy = self.current is not None or bool(self.queue)
+            if policy == "reject" and busy:
+                reject = True
+            else:
+                if policy == "replace":
+                    dropped = self._cancel_all_locked()
+                reject = len(self.queue) >= self.max_queue
+
+            if not reject:
+                self.queue.append(job)
+                self._ensure_worker()
+                self.cond.notify()
+
+        for old in dropped:
+            old._finish("cancelled")
+        if reject:
+            print("⚠ Playback busy, job rejected")
+            job._finish("rejected")
+        return job
+
+    def cancel(self, job):
+        with self.cond:
+            if job in self.queue:
+                self.queue.remove(job)
+                queued = True
+            else:
+                queued = False
+                if job is self.current:
+                    self._stop_current_locked()
+        if queued:
+            job._finish("cancelled")
+
+    def cancel_all(self):
+        with self.cond:
+            dropped = self._cancel_all_locked()
+        for job in dropped:
+            job._finish("cancelled")
+
+    def _cancel_all_locked(self):
+        # callers finish the returned jobs once the lock is released
+        dropped = list(self.queue)
+        self.queue.clear()
+        self._stop_current_locked()
+        return dropped
+
+    def _stop_current_locked(self):
+        if self.current is not None:
+            self.current.cancel_requested = True
+            playback_control.request_stop()
+
+    def _ensure_worker(self):
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._run, name="playback-worker", daemon=True)
+            self.worker.start()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                job = self.queue.popleft()
+                self.current = job
+                job.status = "running"
+
+            try:
+                job.macro = retain_macro(job.macro)
+                try:
+                    job.stats = playback(job.macro, job=job, **job.options)
+                finally:
+                    job.macro.release()
+            except Exception as e:
+                job.error = e
+                print(f"❌ Playback failed: {e}")
+                PLAYBACKS_FAILED.inc()
+
+            with self.cond:
+                self.current = None
+
+            if job.error is not None:
+                status = "failed"
+            elif job.cancel_requested or not (job.stats and job.stats["completed"]):
+                status = "cancelled"
+            else:
+                status = "done"
+            if job.macro.path is not None:
+                run_recorder.put(job.macro.path, status, job.stats)
+            job._finish(status)
+
+class RunRecorder:
+    # fills the last-run columns of the macro library on its own thread, so
+    # a library that is busy (a rescan, another process) never holds up the
+    # next queued playback; sqlite is only loaded once something was played
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def put(self, path, status, stats):
+        self.queue.put((path, status, stats))
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="library-writer", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        import sqlite3
+        from .library import macro_library
+
+        while True:
+            path, status, stats = self.queue.get()
+            try:
+                macro_library.record_run(path, status, stats)
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠ Could not record the run in the library: {e}")
+
+run_recorder = RunRecorder()
+
+playback_executor = PlaybackExecutor()
+
+def play_macro_file(file):
+    requested_ns = time.perf_counter_ns()
+    try:
+        macro = macro_cache.get(file)
+    except (OSError, ValueError) as e:
+        print(f"❌ Cannot play {file}: {e}")
+        return
+    start_playback(macro, requested_ns=requested_ns)
@@ -0,0 +1,256 @@
+import heapq
+import threading
+import time
+from bisect import bisect_right
+
+from . import state
+from .events import EventBuffer, REC_MOVE, REC_PRESS, REC_RELEASE, REC_KEY
+from .cache import load_macro
+from .filejobs import FileJob
+from .filters import apply_record_filter, record_filter
+from .inputhub import input_hub
+from .journal import RecordingJournal, new_journal_path
+from .macrofile import read_macro_file
+from .mapped import MAPPED_MIN_EVENTS, MappedMacro, count_events
+from .metrics import registry
+
+############################################
+# MACRO RECORDING FUNCTIONS
+############################################
+
+# The pynput callbacks run on the OS input hook threads, so they only stamp
+# the event and push it into a single-producer ring owned by their listener;
+# a slow callback would make the cursor stutter.  A drain thread empties the
+# rings every DRAIN_INTERVAL, merges them in timestamp order and appends to
+# the session's journal on disk (see journal.py), so memory stays flat
+# however long the recording runs.  Events younger than DRAIN_HOLDBACK_NS are held
+# back in case the other ring still has something older in flight; an event
+# that still arrives after newer ones were committed is clamped to the last
+# committed timestamp so the journal stays ordered.
+# stop_recording() only closes the journal, it is called on the hotkey
+# thread or the Qt thread.  A FileJob then reads it back and runs the move
+# filter; a journal of MAPPED_MIN_EVENTS or more is not read at all but
+# handed over memory mapped (unfiltered), so even a day long recording
+# never has to fit in memory.
+# Timestamps come from perf_counter_ns, which is monotonic and, unlike
+# monotonic_ns on Windows, finer than the 15.6 ms system tick.
+# Every recording gets its own session, subscribed to the input hub while it
+# runs, so starting a new one never races callbacks still writing the old one.
+
+RING_CAPACITY = 1 << 16
+DRAIN_INTERVAL = 0.01
+DRAIN_HOLDBACK_NS = 20_000_000
+
+EVENTS_RECORDED = registry.counter("tinytask_events_recorded_total", "Input events committed to a recording.")
+EVENTS_DROPPED = registry.counter("tinytask_events_dropped_total", "Input events lost because a recording ring was full.")
+registry.gauge_func("tinytask_recording", "1 while a recording is running.", lambda: int(state.recording))
+
+class EventRing:
+    # one producer thread calls push(), one consumer thread calls drain_into();
+    # each index is written by one side only, so no lock is needed
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.slots = [None] * capacity
+        self.mask = capacity - 1
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def push(self, item):
+        head = self.head
+        if head - self.tail > self.mask:
+            self.dropped += 1
+            return
+        self.slots[head & self.mask] = item
+        self.head = head + 1
+
+    def drain_into(self, out):
+        tail, head = self.tail, self.head
+        slots, mask = self.slots, self.mask
+        while tail < head:
+            out.append(slots[tail & mask])
+            slots[tail & mask] = None
+            tail += 1
+        self.tail = tail
+
+def _event_time(item):
+    return item[4]
+
+class RecordingSession:
+    def __init__(self, journal_path=None):
+        self.journal = RecordingJournal(journal_path or new_journal_path(), time.perf_counter_ns())
+        self.markers = {}
+        self.pending_markers = []   # added by the hotkey thread, written by the drain thread
+        self.mouse_ring = EventRing()
+        self.key_ring = EventRing()
+        self.pending = ([], [])
+        self.last_ns = 0
+        self.stopped = threading.Event()
+        self.subscriptions = (
+            ("click", self.on_mouse_click),
+            ("move", self.on_mouse_move),
+            ("press", self.on_key_press),
+        )
+        self.drainer = threading.Thread(target=self._drain_loop, daemon=True)
+
+    # ---- listener threads ----
+
+    def on_mouse_click(self, x, y, button, pressed):
+        self.mouse_ring.push((REC_PRESS if pressed else REC_RELEASE, x, y, button, time.perf_counter_ns()))
+
+    def on_mouse_move(self, x, y):
+        self.mouse_ring.push((REC_MOVE, x, y, None, time.perf_counter_ns()))
+
+    def on_key_press(self, key):
+        self.key_ring.push((REC_KEY, 0, 0, key, time.perf_counter_ns()))
+
+    # ---- control ----
+
+    def start(self):
+        self.drainer.start()
+        for kind, callback in self.subscriptions:
+            input_hub.subscribe(kind, callback)
+
+    def add_marker(self, name, t_ns):
+        self.markers[name] = t_ns
+        self.pending_markers.append((name, t_ns))
+
+    def close(self):
+        # stops listening and leaves a complete journal behind
+        for kind, callback in self.subscriptions:
+            input_hub.unsubscribe(kind, callback)
+        self.stopped.set()
+        if self.drainer.is_alive():
+            self.drainer.join()
+        if self.journal.closed:
+            return
+        self._drain(final=True)
+        self.journal.close()
+
+        dropped = self.mouse_ring.dropped + self.key_ring.dropped
+        if dropped:
+            print(f"⚠ {dropped} events dropped, recording buffer was full")
+            EVENTS_DROPPED.inc(dropped)
+
+    # ---- drain thread ----
+
+    def _drain_loop(self):
+        while not self.stopped.wait(DRAIN_INTERVAL):
+            self._drain()
+            self.journal.maybe_sync()
+
+    def _drain(self, final=False):
+        while self.pending_markers:
+            self.journal.add_marker(*self.pending_markers.pop(0))
+
+        mouse_pending, key_pending = self.pending
+        self.mouse_ring.drain_into(mouse_pending)
+        self.key_ring.drain_into(key_pending)
+        if not mouse_pending and not key_pending:
+            return
+
+        if final:
+            cut_mouse, cut_key = len(mouse_pending), len(key_pending)
+        else:
+            cutoff = time.perf_counter_ns() - DRAIN_HOLDBACK_NS
+            cut_mouse = bisect_right(mouse_pending, cutoff, key=_event_time)
+            cut_key = bisect_right(key_pending, cutoff, key=_event_time)
+
+        write = self.journal.write
+        last_ns = self.last_ns
+        for code, x, y, obj, t_ns in heapq.merge(mouse_pending[:cut_mouse], key_pending[:cut_key],
+                                                 key=_event_time):
+            if t_ns < last_ns:
+                t_ns = last_ns
+            write(code, int(x), int(y), None if obj is None else str(obj), t_ns)
+            last_ns = t_ns
+        self.last_ns = last_ns
+
+        del mouse_pending[:cut_mouse]
+        del key_pending[:cut_key]
+        EVENTS_RECORDED.inc(cut_mouse + cut_key)
+
+session = None
+last_journal = None   # journal of the last stopped recording, kept until it is saved
+loading_job = None    # FileJob reading last_journal back
+
+def discard_journal(saved_to=None):
+    # the recording it holds was saved (to `saved_to`) or is being replaced
+    global last_journal
+    if last_journal is None:
+        return
+    macro = state.loaded_macro
+    if isinstance(macro, MappedMacro) and macro.path == last_journal.path:
+        # still played straight from the journal: switch to the saved copy
+        macro.close()
+        state.loaded_macro, state.events = None, EventBuffer()
+        if saved_to is not None:
+            load_macro(saved_to)
+    last_journal.discard()
+    last_journal = None
+
+def load_recording(path, progress=None):
+    # -> (MappedMacro or None, events)
+    if count_events(path) >= MAPPED_MIN_EVENTS:
+        macro = MappedMacro(path)
+        if record_filter["mode"] != "none":
+            print(f"⚠ Move filter skipped, {len(macro)} events are played straight from the journal")
+        return macro, macro.events
+    return None, apply_record_filter(read_macro_file(path, progress))
+
+def recording_loading():
+    return loading_job is not None and not loading_job.finished.is_set()
+
+def start_recording():
+    global session
+    if session is not None:
+        session.close()
+        session.journal.discard()
+    discard_journal()
+    session = RecordingSession()
+    state.events = EventBuffer()
+    state.recording = True
+    print("🔴 Recording started")
+    session.start()
+
+def add_marker(name=None):
+    if session is None or not state.recording:
+        print("⚠ Markers can only be added while recording")
+        return None
+    name = name or f"marker {len(session.markers) + 1}"
+    session.add_marker(name, time.perf_counter_ns())
+    print(f"📍 Marker '{name}'")
+    return name
+
+def close_recording():
+    # on exit: a recording still running is left as a complete journal and
+    # recovered on the next start
+    if session is not None:
+        session.close()
+
+def stop_recording():
+    # -> the FileJob loading the recording, or None if none was running
+    global session, last_journal, loading_job
+    state.recording = False
+    if session is None:
+        return None
+    session.close()
+    journal = last_journal = session.journal
+    session = None
+    print(f"⛔ Recording stopped | {len(journal)} events")
+
+    def loaded(job):
+        if job.status != "done":
+            return
+        macro, events = job.result
+        if last_journal is not journal:
+            # saved or replaced before it finished loading
+            if macro is not None:
+                macro.close()
+            return
+        state.loaded_macro, state.events = macro, events
+        print(f"🎞 Recording ready | {len(events)} events")
+
+    loading_job = FileJob("Loading recording", load_recording, journal.path)
+    loading_job.add_done_callback(loaded)
+    return loading_job.start()
@@ -0,0 +1,109 @@
+import threading
+import time
+
+############################################
+# PLAYBACK SCHEDULER
+############################################
+
+# Every event gets an absolute deadline measured from the start of playback on
+# the perf_counter clock, so sleep overshoot and slow input calls never
+# accumulate.  The last SPIN_THRESHOLD_NS before a deadline are busy-waited
+# because sleeping alone is only accurate to a few milliseconds.
+SPIN_THRESHOLD_NS = 2_000_000
+
+# Waiting happens on a condition variable rather than in time.sleep(), so a
+# stop or pause wakes the playback thread immediately even in the middle of
+# a long idle gap; during the final spin the flags are polled directly.  Any
+# stop therefore takes effect within one spin slice plus the input call that
+# is in progress.  Time spent paused is added to every later deadline.
+
+class PlaybackControl:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.stop_requested = False
+        self.paused = False
+        self.pause_shift_ns = 0
+        self.stop_requested_ns = None
+        self.last_stop_latency_ms = None
+
+    def reset(self):
+        with self.cond:
+            self.stop_requested = False
+            self.paused = False
+            self.pause_shift_ns = 0
+            self.stop_requested_ns = None
+
+    def request_stop(self):
+        with self.cond:
+            if not self.stop_requested:
+                self.stop_requested_ns = time.perf_counter_ns()
+            self.stop_requested = True
+            self.cond.notify_all()
+
+    def pause(self):
+        with self.cond:
+            self.paused = True
+            self.cond.notify_all()
+
+    def resume(self):
+        with self.cond:
+            self.paused = False
+            self.cond.notify_all()
+
+    def halted(self):
+        # called by the playback thread once it has stopped emitting input
+        if self.stop_requested_ns is not None:
+            self.last_stop_latency_ms = (time.perf_counter_ns() - self.stop_requested_ns) / 1e6
+            print(f"⏱ Stop took effect after {self.last_stop_latency_ms:.3f} ms")
+
+    def wait_until(self, deadline_ns):
+        # returns the (pause adjusted) deadline, or None once a stop is requested
+        while True:
+            if deadline_ns - time.perf_counter_ns() > SPIN_THRESHOLD_NS or self.paused:
+                with self.cond:
+                    while not self.stop_requested:
+                        if self.paused:
+                            paused_at = time.perf_counter_ns()
+                            while self.paused and not self.stop_requested:
+                                self.cond.wait()
+                            paused_for = time.perf_counter_ns() - paused_at
+                            self.pause_shift_ns += paused_for
+                            deadline_ns += paused_for
+                            continue
+                        remaining = deadline_ns - time.perf_counter_ns() - SPIN_THRESHOLD_NS
+                        if remaining <= 0:
+                            break
+                        self.cond.wait(remaining / 1e9)
+
+            while time.perf_counter_ns() < deadline_ns:
+                if self.stop_requested or self.paused:
+                    break
+
+            if self.stop_requested:
+                return None
+            if not self.paused:
+                return deadline_ns
+
+playback_control = PlaybackControl()
+
+def lateness_stats(lateness_ns):
+    if not lateness_ns:
+        return {"events": 0, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    ordered = sorted(lateness_ns)
+    n = len(ordered)
+
+    def percentile(p):
+        return ordered[min(n - 1, int(p * n))] / 1e6
+
+    return {
+        "events": n,
+        "p50_ms": percentile(0.50),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] / 1e6,
+    }
+
+def print_lateness_stats(stats):
+    print(f"📊 Lateness over {stats['events']} events | "
+          f"p50 {stats['p50_ms']:.3f} ms | p99 {stats['p99_ms']:.3f} ms | "
+          f"max {stats['max_ms']:.3f} ms")
@@ -0,0 +1,15 @@
+from .events import EventBuffer
+
+############################################
+# SHARED STATE
+############################################
+
+# What the app is working on right now.  Other modules read and rebind these
+# through the module (state.events = ...), never with `from state import`.
+
+events = EventBuffer()      # current recording or loaded macro
+recording = False
+playing = False
+loaded_macro = None         # CompiledMacro for `events`, see cache.py
+last_playback_stats = None
+last_trace = None           # PlaybackTrace of the last traced playback
@@ -0,0 +1,148 @@
+import gc
+import json
+import time
+from array import array
+
+from .scheduler import lateness_stats
+
+############################################
+# PLAYBACK TRACING
+############################################
+
+# Off by default.  When a playback runs with a PlaybackTrace, every event
+# records four timestamps: wait started, woke up, backend call started and
+# backend call returned, plus the deadline it was scheduled for.  That gives
+# three spans per event: wait, dispatch (our own work between waking and the
+# call) and the backend call.  GC pauses during the run are captured through
+# gc.callbacks.  With tracing off the playback loop only pays one `is None`
+# check per event.
+# Timestamps are perf_counter_ns, kept in typed arrays so a long trace costs
+# 41 bytes per event; past TRACE_MAX_EVENTS events are counted, not stored.
+
+TRACE_MAX_EVENTS = 2_000_000
+OP_NAMES = ("move", "press", "release", "key", "type")
+
+class PlaybackTrace:
+    def __init__(self, max_events=TRACE_MAX_EVENTS):
+        self.max_events = max_events
+        self.ops = array("b")
+        self.scheduled = array("q")
+        self.wait_start = array("q")
+        self.woke = array("q")
+        self.call_start = array("q")
+        self.call_end = array("q")
+        self.gc_pauses = []   # (start_ns, end_ns, generation, collected)
+        self.dropped = 0
+        self.start_ns = None
+        self.end_ns = None
+        self._gc_start = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    def start(self):
+        self.start_ns = time.perf_counter_ns()
+        gc.callbacks.append(self._on_gc)
+
+    def stop(self):
+        self.end_ns = time.perf_counter_ns()
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        now = time.perf_counter_ns()
+        if phase == "start":
+            self._gc_start = now
+        elif self._gc_start is not None:
+            self.gc_pauses.append((self._gc_start, now, info["generation"], info["collected"]))
+            self._gc_start = None
+
+    def event(self, op, scheduled, wait_start, woke, call_start, call_end):
+        if len(self.ops) >= self.max_events:
+            self.dropped += 1
+            return
+        self.ops.append(op)
+        self.scheduled.append(scheduled)
+        self.wait_start.append(wait_start)
+        self.woke.append(woke)
+        self.call_start.append(call_start)
+        self.call_end.append(call_end)
+
+    # ---- reports ----
+
+    def summary(self):
+        def spans(ends, starts):
+            stats = lateness_stats([end - start for end, start in zip(ends, starts)])
+            stats["total_ms"] = (sum(ends) - sum(starts)) / 1e6
+            return stats
+
+        backend_by_op = {}
+        for op, name in enumerate(OP_NAMES):
+            durations = [end - start for code, start, end in zip(self.ops, self.call_start, self.call_end)
+                         if code == op]
+            if durations:
+                backend_by_op[name] = lateness_stats(durations)
+
+        pauses = [end - start for start, end, _, _ in self.gc_pauses]
+        return {
+            "events": len(self.ops),
+            "dropped": self.dropped,
+            "duration_ms": ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e6,
+            "lateness": spans(self.woke, self.scheduled),
+            "wait": spans(self.woke, self.wait_start),
+            "dispatch": spans(self.call_start, self.woke),
+            "backend": spans(self.call_end, self.call_start),
+            "backend_by_op": backend_by_op,
+            "gc": {
+                "pauses": len(pauses),
+                "total_ms": sum(pauses) / 1e6,
+                "max_ms": max(pauses, default=0) / 1e6,
+            },
+        }
+
+    def chrome_events(self):
+        # Chrome/Perfetto trace-event format: complete ("X") events, ts and
+        # dur in microseconds from the start of the trace
+        base = self.start_ns
+        yield {"ph": "M", "pid": 1, "tid": 1, "name": "thread_name", "args": {"name": "playback"}}
+        yield {"ph": "M", "pid": 1, "tid": 2, "name": "thread_name", "args": {"name": "gc"}}
+
+        for i, (op, scheduled, wait_start, woke, call_start, call_end) in enumerate(zip(
+                self.ops, self.scheduled, self.wait_start, self.woke, self.call_start, self.call_end)):
+            name = OP_NAMES[op]
+            yield {"ph": "X", "pid": 1, "tid": 1, "name": "wait", "cat": "wait",
+                   "ts": (wait_start - base) / 1e3, "dur": (woke - wait_start) / 1e3,
+                   "args": {"index": i, "scheduled_us": (scheduled - base) / 1e3,
+                            "late_us": (woke - scheduled) / 1e3}}
+            yield {"ph": "X", "pid": 1, "tid": 1, "name": "dispatch", "cat": "dispatch",
+                   "ts": (woke - base) / 1e3, "dur": (call_start - woke) / 1e3, "args": {"index": i}}
+            yield {"ph": "X", "pid": 1, "tid": 1, "name": name, "cat": "backend",
+                   "ts": (call_start - base) / 1e3, "dur": (call_end - call_start) / 1e3, "args": {"index": i}}
+
+        for start, end, generation, collected in self.gc_pauses:
+            yield {"ph": "X", "pid": 1, "tid": 2, "name": f"gc gen{generation}", "cat": "gc",
+                   "ts": (start - base) / 1e3, "dur": (end - start) / 1e3, "args": {"collected": collected}}
+
+    def write_chrome(self, file):
+        # streamed so a long trace is never held as one big list of dicts
+        with open(file, "w") as f:
+            f.write('{"displayTimeUnit": "ms", "otherData": ')
+            json.dump(self.summary(), f)
+            f.write(', "traceEvents": [\n')
+            for i, event in enumerate(self.chrome_events()):
+                if i:
+                    f.write(",\n")
+                json.dump(event, f)
+            f.write("\n]}\n")
+
+def print_trace_summary(summary):
+    print(f"🔬 Trace | {summary['events']} events"
+          + (f" ({summary['dropped']} not stored)" if summary["dropped"] else "")
+          + f" | {summary['duration_ms']:.1f} ms")
+    for span in ("lateness", "wait", "dispatch", "backend"):
+        s = summary[span]
+        print(f"   {span:<9} p50 {s['p50_ms']:.3f} ms | p99 {s['p99_ms']:.3f} ms | "
+              f"max {s['max_ms']:.3f} ms | total {s['total_ms']:.1f} ms")
+    gc_stats = summary["gc"]
+    print(f"   gc        {gc_stats['pauses']} pauses | total {gc_stats['total_ms']:.3f} ms | "
+          f"max {gc_stats['max_ms']:.3f} ms")
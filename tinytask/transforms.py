@@ -0,0 +1,176 @@
+import random
+
+from .decode import OP_KEY, OP_MOVE, OP_PRESS, OP_RELEASE, OP_TYPE
+
+############################################
+# PLAYBACK TRANSFORMS
+############################################
+
+# A Transform adapts a macro while it plays instead of rewriting the file:
+# replaying on another resolution, inside a smaller window or with some
+# randomness.  Each stage is a generator over (offset_ns, op, x, y, target)
+# ops, so a pass pulls one op at a time through the whole chain and nothing
+# is copied; on a mapped macro the ops are still decoded as playback
+# reaches them.  Stages run in the order they were added:
+#   only(kinds)          keep "moves", "clicks" and/or "keys"
+#   map_screen(src, dst) scale coordinates from one screen size to another
+#   offset(dx, dy)       shift coordinates
+#   clip(x0, y0, x1, y1) clamp coordinates into a region
+#   time_scale(factor)   stretch (> 1) or compress (< 1) the timeline
+#   jitter(px, ms, seed) random move offsets and timing noise
+# No stage moves an op before the first op of the segment (`base`), so
+# playback's deadlines, idle clamping and loops work unchanged.  Playback
+# passes the pass number along; with a seed, every pass jitters differently
+# but repeatably, so a check can rebuild the passes with timeline().
+
+OP_KINDS = {
+    "moves": (OP_MOVE,),
+    "clicks": (OP_PRESS, OP_RELEASE),
+    "keys": (OP_KEY, OP_TYPE),
+}
+
+def keep_ops(ops, base, codes):
+    for item in ops:
+        if item[1] in codes:
+            yield item
+
+def scale_ops(ops, base, sx, sy):
+    for offset_ns, op, x, y, target in ops:
+        if x is not None:
+            x, y = round(x * sx), round(y * sy)
+        yield offset_ns, op, x, y, target
+
+def offset_ops(ops, base, dx, dy):
+    for offset_ns, op, x, y, target in ops:
+        if x is not None:
+            x, y = x + dx, y + dy
+        yield offset_ns, op, x, y, target
+
+def clip_ops(ops, base, x0, y0, x1, y1):
+    for offset_ns, op, x, y, target in ops:
+        if x is not None:
+            x, y = min(max(x, x0), x1), min(max(y, y0), y1)
+        yield offset_ns, op, x, y, target
+
+def time_scale_ops(ops, base, factor):
+    for offset_ns, op, x, y, target in ops:
+        yield base + int((offset_ns - base) * factor), op, x, y, target
+
+def pass_seed(seed, pass_index):
+    # a seed of its own for every pass; None stays None (fresh noise)
+    return None if seed is None else f"{seed}/{pass_index}"
+
+def jitter_ops(ops, base, px, ms, seed):
+    # clicks keep their exact position so they still hit what they aimed at;
+    # timing noise never reorders ops.  The same seed gives the same jitter.
+    # (random() is a lot cheaper per op than randint())
+    noise = random.Random(seed).random
+    span_px, span_ns = 2 * px, 2 * ms * 1_000_000
+    prev = base
+    for offset_ns, op, x, y, target in ops:
+        if px and op == OP_MOVE:
+            x, y = x + round(noise() * span_px) - px, y + round(noise() * span_px) - px
+        if span_ns:
+            offset_ns = max(offset_ns + int(noise() * span_ns) - span_ns // 2, prev)
+            prev = offset_ns
+        yield offset_ns, op, x, y, target
+
+class Transform:
+    def __init__(self):
+        self.stages = []        # (generator function, extra arguments)
+        self.time_factor = 1.0
+        self.kinds = set(OP_KINDS)
+
+    def __bool__(self):
+        return bool(self.stages)
+
+    def only(self, kinds):
+        kinds = set(kinds)
+        unknown = kinds - set(OP_KINDS)
+        if unknown or not kinds:
+            raise ValueError(f"event kinds must be some of {', '.join(OP_KINDS)}")
+        self.kinds &= kinds
+        codes = frozenset(code for kind in kinds for code in OP_KINDS[kind])
+        self.stages.append((keep_ops, (codes,)))
+        return self
+
+    def map_screen(self, src, dst):
+        (src_w, src_h), (dst_w, dst_h) = src, dst
+        if min(src_w, src_h, dst_w, dst_h) <= 0:
+            raise ValueError("screen sizes must be positive")
+        self.stages.append((scale_ops, (dst_w / src_w, dst_h / src_h)))
+        return self
+
+    def offset(self, dx, dy):
+        self.stages.append((offset_ops, (dx, dy)))
+        return self
+
+    def clip(self, x0, y0, x1, y1):
+        if x0 > x1 or y0 > y1:
+            raise ValueError("clip region must be x0,y0,x1,y1 with x0 <= x1 and y0 <= y1")
+        self.stages.append((clip_ops, (x0, y0, x1, y1)))
+        return self
+
+    def time_scale(self, factor):
+        if factor <= 0:
+            raise ValueError("time scale must be positive")
+        self.time_factor *= factor
+        self.stages.append((time_scale_ops, (factor,)))
+        return self
+
+    def jitter(self, px=0, ms=0, seed=None):
+        if px < 0 or ms < 0:
+            raise ValueError("jitter cannot be negative")
+        self.stages.append((jitter_ops, (px, ms, seed)))
+        return self
+
+    def __call__(self, ops, base, pass_index=0):
+        for func, args in self.stages:
+            if func is jitter_ops:
+                px, ms, seed = args
+                args = (px, ms, pass_seed(seed, pass_index))
+            ops = func(ops, base, *args)
+        return ops
+
+    def timeline(self, ops, base, passes):
+        # `passes` transformed passes laid end to end the way playback runs
+        # them, each starting where the previous one was scheduled to end
+        out = []
+        shift = 0
+        for pass_index in range(passes):
+            played = list(self(ops, base, pass_index))
+            out.extend((offset_ns + shift, op, x, y, target) for offset_ns, op, x, y, target in played)
+            if played:
+                shift += played[-1][0] - base
+        return out
+
+    def restore_state(self, position, held):
+        # the cursor and buttons to restore before a segment, as they would
+        # be after the transformed ops that were skipped
+        if "clicks" not in self.kinds:
+            held = frozenset()
+        if position is not None:
+            moved = next(self([(0, OP_MOVE, position[0], position[1], None)], 0), None)
+            position = None if moved is None else (moved[2], moved[3])
+        return position, held
+
+    def source_offset(self, offset_ns, base):
+        # a transformed offset back on the macro's own timeline
+        return base + int((offset_ns - base) / self.time_factor)
+
+def parse_size(text):
+    # "1920x1080" -> (1920, 1080)
+    try:
+        w, h = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"invalid screen size {text!r}, expected WIDTHxHEIGHT") from None
+    return w, h
+
+def parse_ints(text, count, what):
+    try:
+        values = tuple(int(part) for part in text.split(","))
+    except ValueError:
+        values = ()
+    if len(values) != count:
+        raise ValueError(f"invalid {what} {text!r}")
+    return values
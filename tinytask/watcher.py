@@ -0,0 +1,198 @@
+import os
+import select
+import sqlite3
+import struct
+import sys
+import threading
+
+from . import hotkeys
+from .cache import macro_cache, warm_macro_cache
+from .config import DOWNLOAD_DIR, SHORTCUT_FILE
+from .library import macro_library
+from .metrics import registry
+
+############################################
+# FILE WATCHER
+############################################
+
+# Watches DOWNLOAD_DIR so shortcuts.json edits and macros pushed by a
+# deployment script take effect without a restart.  On Linux the folder is
+# watched through inotify (straight through libc, no extra package); anywhere
+# else, or if inotify cannot be set up, it is polled every
+# WATCH_POLL_INTERVAL.  Changes are batched until the folder has been quiet
+# for WATCH_DEBOUNCE (polling: for one interval), so a file copied in
+# several writes is handled once.
+# A changed shortcuts.json is applied as a diff, see SAFE HOTKEY MANAGER.  A
+# changed macro is dropped from the compiled cache and, when a hotkey plays
+# it, compiled again right away so the next press starts instantly; the
+# macro library picks up the change as well.
+# TINYTASK_WATCH=poll forces polling, TINYTASK_WATCH=off disables the watcher.
+
+WATCH_ENV = "TINYTASK_WATCH"
+WATCH_DEBOUNCE = 0.3
+WATCH_POLL_INTERVAL = 1.0
+
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+INOTIFY_EVENT = struct.Struct("iIII")   # wd, mask, cookie, name length
+
+WATCH_CHANGES = registry.counter("tinytask_watch_changes_total", "Changed files picked up by the file watcher.")
+
+def _inotify_watch(folder):
+    import ctypes
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    fd = libc.inotify_init1(os.O_CLOEXEC)
+    if fd < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+    if libc.inotify_add_watch(fd, os.fsencode(folder), mask) < 0:
+        errno = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(errno, os.strerror(errno))
+    return fd
+
+def _read_inotify(fd):
+    data = os.read(fd, 65536)
+    names = set()
+    pos = 0
+    while pos < len(data):
+        wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, pos)
+        pos += INOTIFY_EVENT.size
+        name = data[pos:pos + length].rstrip(b"\0")
+        pos += length
+        if name:
+            names.add(os.fsdecode(name))
+    return names
+
+def is_watched(name):
+    return name.endswith(".macro") or name == os.path.basename(SHORTCUT_FILE)
+
+class FolderWatcher:
+    def __init__(self, folder, on_change, match=is_watched, use_inotify=True):
+        self.folder = folder
+        self.on_change = on_change   # called on the watcher thread with a set of file names
+        self.match = match
+        self.use_inotify = use_inotify
+        self.mode = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        fd = None
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                fd = _inotify_watch(self.folder)
+            except (OSError, AttributeError) as e:
+                print(f"⚠ inotify unavailable ({e}), polling {self.folder}")
+        self.mode = "poll" if fd is None else "inotify"
+        target, args = (self._run_poll, ()) if fd is None else (self._run_inotify, (fd,))
+        self.thread = threading.Thread(target=target, args=args, name="file-watcher", daemon=True)
+        self.thread.start()
+        print(f"👀 Watching {self.folder} ({self.mode})")
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _dispatch(self, names):
+        names = {name for name in names if self.match(name)}
+        if not names:
+            return
+        try:
+            self.on_change(names)
+        except Exception as e:
+            print(f"❌ Applying changed files failed: {e}")
+
+    def _run_inotify(self, fd):
+        pending = set()
+        try:
+            while not self.stopped.is_set():
+                ready, _, _ = select.select([fd], [], [], WATCH_DEBOUNCE if pending else WATCH_POLL_INTERVAL)
+                if ready:
+                    pending |= _read_inotify(fd)
+                elif pending:
+                    self._dispatch(pending)
+                    pending = set()
+        finally:
+            os.close(fd)
+
+    def _snapshot(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.folder) as entries:
+                for entry in entries:
+                    if self.match(entry.name) and entry.is_file():
+                        st = entry.stat()
+                        snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            pass
+        return snapshot
+
+    def _run_poll(self):
+        seen = self._snapshot()
+        pending = set()
+        while not self.stopped.wait(WATCH_POLL_INTERVAL):
+            current = self._snapshot()
+            changed = {name for name in current.keys() | seen.keys() if current.get(name) != seen.get(name)}
+            seen = current
+            if changed:
+                pending |= changed
+            elif pending:
+                self._dispatch(pending)
+                pending = set()
+
+def apply_changed_files(names, folder=DOWNLOAD_DIR):
+    WATCH_CHANGES.inc(len(names))
+
+    if os.path.basename(SHORTCUT_FILE) in names:
+        try:
+            hotkeys.load_shortcut_config()
+        except (OSError, ValueError) as e:
+            print(f"⚠ {SHORTCUT_FILE} not reloaded: {e}")
+        else:
+            print("🔄 Shortcuts reloaded")
+            if isinstance(hotkeys.global_shortcuts, list):
+                hotkeys.register_all_hotkeys()
+            else:
+                print(f"❌ {SHORTCUT_FILE} must hold a list of shortcuts")
+
+    targets = {os.path.abspath(file) for file in hotkeys.hotkey_targets.values()}
+    warm = []
+    for name in sorted(names):
+        if not name.endswith(".macro"):
+            continue
+        path = os.path.abspath(os.path.join(folder, name))
+        macro_cache.invalidate(path)
+        print("🔄 Macro changed:", path)
+        if path in targets and os.path.isfile(path):
+            warm.append(path)
+    if warm:
+        warm_macro_cache(warm)
+    if any(name.endswith(".macro") for name in names):
+        try:
+            macro_library.scan(folder)
+        except (OSError, sqlite3.Error) as e:
+            print(f"⚠ Library not updated: {e}")
+
+watcher = None
+
+def start_watcher(folder=DOWNLOAD_DIR):
+    global watcher
+    mode = os.environ.get(WATCH_ENV, "")
+    if watcher is not None or mode == "off":
+        return watcher
+    watcher = FolderWatcher(folder, lambda names: apply_changed_files(names, folder), use_inotify=mode != "poll")
+    watcher.start()
+    return watcher
+
+def stop_watcher():
+    global watcher
+    if watcher is not None:
+        watcher.stop()
+        watcher = None
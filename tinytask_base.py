@@ -61,6 +61,29 @@ def stop_recording():
 ### ============================
 ### PLAYBACK
 ### ============================
+
+# Absolute deadlines from playback start on the perf_counter clock, so sleep
+# overshoot and slow input calls never accumulate.  The last 2 ms before each
+# deadline are busy-waited for sub-millisecond accuracy.
+SPIN_THRESHOLD_NS = 2_000_000
+
+def wait_until(deadline_ns):
+    while True:
+        remaining = deadline_ns - time.perf_counter_ns()
+        if remaining <= 0:
+            return
+        if remaining > SPIN_THRESHOLD_NS:
+            time.sleep((remaining - SPIN_THRESHOLD_NS) / 1e9)
+
+def print_lateness_stats(lateness_ns):
+    if not lateness_ns:
+        return
+    ordered = sorted(lateness_ns)
+    n = len(ordered)
+    p50 = ordered[min(n - 1, int(0.50 * n))] / 1e6
+    p99 = ordered[min(n - 1, int(0.99 * n))] / 1e6
+    print(f"📊 Lateness p50 {p50:.3f} ms | p99 {p99:.3f} ms | max {ordered[-1] / 1e6:.3f} ms")
+
 def playback():
     global playing
 
@@ -75,14 +98,19 @@ def playback():
     KeyListener(on_press=emergency_stop_listener).start()
 
     base = events[0][5]
+    start_ns = time.perf_counter_ns()
+    lateness = []
 
     for event in events:
         if not playing:
             break
 
         action, x, y, a, b, t = event
-        time.sleep(t - base)
-        base = t
+
+        # wait for this event's absolute deadline, not the gap since the last one
+        deadline = start_ns + int((t - base) * 1e9)
+        wait_until(deadline)
+        lateness.append(time.perf_counter_ns() - deadline)
 
         if action == "move":
             mouse.position = (x, y)
@@ -107,6 +135,7 @@ def playback():
                 pass
 
     print("⏹ Playback finished")
+    print_lateness_stats(lateness)
     playing = False
 
 def start_playback():